@@ -0,0 +1,80 @@
+# Compare the SHA1 hex-string keys HashLife.Life.hash_life used previously with
+#  the structural keys in life.keys, over every window update_grid visits in
+#  one uncached generation of a random board.
+#
+# Usage: python benchmarks/bench_keys.py [pow2]
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from life.keys import KEY_BYTES, WindowKeys
+
+
+# Windows visited by HashLife.Life.update_grid, as (x, y, pow2)
+def windows ( x, y, pow2, out ):
+  out.append((x, y, pow2))
+  if pow2 > 2:
+    fourths = 2**pow2//4
+    for i in range(0, 3*fourths, fourths):
+      for j in range(0, 3*fourths, fourths):
+        windows(x+i, y+j, pow2-1, out)
+  return out
+
+def sha1_key ( life, x, y, pow2 ):
+  size = 2**pow2
+  return hashlib.sha1(life[x:x+size, y:y+size].tobytes()).hexdigest()
+
+# Bytes still allocated after build() returns, and its result
+def traced ( build ):
+  tracemalloc.start()
+  result = build()
+  held = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  return held, result
+
+def main ( pow2=6 ):
+  size = 2**pow2
+  rng = np.random.default_rng(0)
+  life = rng.random((size, size)) < 0.5
+  visits = windows(0, 0, pow2, [])
+
+  t = time.perf_counter()
+  oldKeys = [sha1_key(life, x, y, p) for x, y, p in visits]
+  oldTime = time.perf_counter() - t
+
+  keys = WindowKeys()
+  t = time.perf_counter()
+  keys.reset(life)
+  newKeys = [keys.key(x, y, p) for x, y, p in visits]
+  newTime = time.perf_counter() - t
+
+  # Both schemes must tell exactly the same windows apart
+  distinct = len(set(newKeys))
+  assert len(set(oldKeys)) == distinct
+
+  # Bytes held per distinct key by a pattern cache keyed on it, measured with
+  #  tracemalloc: the dict slot and the key object, and for structural keys
+  #  the intern table as well, with its tuples, int objects and slots.  The
+  #  leaf codes and the keys by position are left out, as they are freed
+  #  with the generation.
+  oldBytes, _ = traced(lambda: OrderedDict((sha1_key(life, x, y, p), None) for x, y, p in visits))
+  fresh = WindowKeys()
+  fresh.reset(life)
+  def structural ():
+    cache = OrderedDict((fresh.key(x, y, p), None) for x, y, p in visits)
+    fresh.memo = {}
+    return cache
+  newBytes, _ = traced(structural)
+
+  print('board            %dx%d, %d window keys, %d distinct' % (size, size, len(visits), distinct))
+  print('sha1 hex keys    %10.0f keys/s  %6.1f bytes/entry' % (len(visits)/oldTime, oldBytes/distinct))
+  print('structural keys  %10.0f keys/s  %6.1f bytes/entry, %d budgeted (keys.KEY_BYTES)' % (len(visits)/newTime, newBytes/distinct, KEY_BYTES))
+
+if __name__ == '__main__':
+  main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,45 @@
+# Scaling of life.parallel.ParallelBoard from 1 to N worker processes.
+#
+# Usage: python benchmarks/bench_parallel.py [size] [workers] [generations]
+#  size - Side length of the random soup (default 8192)
+#  workers - Largest number of workers tried (default: number of CPUs)
+#  generations - Generations timed per worker count (default 10)
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from life import vector
+from life.parallel import ParallelBoard
+
+
+def main ( size=8192, workers=None, generations=10 ):
+  workers = workers or mp.cpu_count()
+  rng = np.random.default_rng(0)
+  soup = rng.random((size-2, size-2)) < 0.5
+
+  board = vector.Board(size)
+  board.place_pattern(soup, 1, 1)
+  t = time.perf_counter()
+  for _ in range(generations):
+    board.step()
+  base = generations / (time.perf_counter() - t)
+  print('board %dx%d, %d CPUs' % (size, size, mp.cpu_count()))
+  print('in-process   %6.2f gens/s  %8.1f Mcells/s' % (base, base*size*size/1e6))
+
+  for n in range(1, workers+1):
+    board = ParallelBoard(size, workers=n)
+    board.place_pattern(soup, 1, 1)
+    board.step()
+    t = time.perf_counter()
+    for _ in range(generations):
+      board.step()
+    rate = generations / (time.perf_counter() - t)
+    board.close()
+    print('%2d workers   %6.2f gens/s  %8.1f Mcells/s  %5.2fx' % (n, rate, rate*size*size/1e6, rate/base))
+
+if __name__ == '__main__':
+  main(*[int(a) for a in sys.argv[1:]])
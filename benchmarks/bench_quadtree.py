@@ -0,0 +1,29 @@
+# Jump the Gosper glider gun from life.patterns far into the future with the
+#  quadtree engine in life.quadtree.
+#
+# Usage: python benchmarks/bench_quadtree.py [generations]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from life import quadtree
+from life.patterns import gliderGunPattern
+
+
+def main ( generations=10**9 ):
+  universe = quadtree.Universe()
+  universe.place_pattern(gliderGunPattern, 0, 0)
+
+  t = time.perf_counter()
+  universe.step(generations)
+  elapsed = time.perf_counter() - t
+
+  print('generations      %d' % universe.generation)
+  print('population       %d' % universe.population)
+  print('root level       %d' % universe.root.level)
+  print('interned nodes   %d' % len(universe.nodes))
+  print('time             %.3f s' % elapsed)
+
+if __name__ == '__main__':
+  main(*[int(float(a)) for a in sys.argv[1:]])
@@ -0,0 +1,178 @@
+# Run every engine headlessly over a fixed matrix of patterns and board sizes
+#  and print the results as JSON, for tracking performance across commits.
+#
+# Each case runs in a fresh process so its peak memory and caches are its own.
+# Per case: generations/s, cells/s (generations times the 2^pow2 x 2^pow2
+# board area, also for the unbounded engines, so rates compare), peak
+# resident memory above the process's starting point, and the memo size of
+# the engines that have one.
+#
+# Import times are measured too, each module in a fresh interpreter with
+# numpy already imported, so the figure is the package's own startup cost;
+# the report also notes any module that pulled in tkinter.  The best of
+# IMPORT_REPEATS runs is kept.
+#
+# --compare reads an earlier report and prints the change in generations/s of
+# every case the two have in common, and in import time of every module.
+#
+# Usage: python benchmarks/bench_suite.py [--engines ...] [--patterns ...] [--sizes ...]
+#                                         [--generations N] [--seed N] [--out results.json]
+#                                         [--imports ...] [--compare baseline.json]
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from life.patterns import PATTERNS
+from life.sim import ENGINES, Simulation, make_engine
+
+
+# The fixed matrix
+PATTERN_NAMES = ('glider_gun', 'pulsar', 'die_hard', 'soup')
+SIZES = (6, 8)
+GENERATIONS = 200
+
+# Modules timed on import, and the runs of each
+IMPORTS = ('life.sim', 'life.vector', 'life.bitboard', 'life.sparse', 'life.quadtree', 'life.hashgrid',
+           'life.parallel', 'life.viewer', 'life.cli', 'ConwayLife', 'HashLife')
+IMPORT_REPEATS = 5
+
+# Run in a fresh interpreter: prints the seconds to import numpy, then the
+#  module, and whether tkinter was imported
+IMPORT_SCRIPT = '''import sys, time
+t0 = time.perf_counter()
+import numpy
+t1 = time.perf_counter()
+import %s
+t2 = time.perf_counter()
+print(t1-t0, t2-t1, 'tkinter' in sys.modules)'''
+
+# Peak resident set size of this process in bytes
+def peak_rss ():
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return rss if sys.platform == 'darwin' else rss*1024
+
+# Memo size of an engine, or None if it has no memo
+def cache_stats ( engine ):
+  if hasattr(engine, 'lifePatterns'):
+    return {'entries': len(engine.lifePatterns), 'bytes': engine.lifePatterns.bytes}
+  if hasattr(engine, 'stats'):
+    stats = engine.stats()
+    return {'entries': stats['nodes'], 'bytes': stats['bytes']}
+  return None
+
+# Run one case, putting its result on queue
+def case ( queue, engine, pattern, pow2, generations, seed ):
+  before = peak_rss()
+  board = make_engine(engine, pow2, workers=1)
+  sim = Simulation(board)
+  try:
+    if pattern == 'soup':
+      pat = np.random.default_rng(seed).random((2**pow2-2, 2**pow2-2)) < 0.5
+    else:
+      pat = PATTERNS[pattern]
+    x = (2**pow2 - pat.shape[0])//2
+    y = (2**pow2 - pat.shape[1])//2
+    board.place_pattern(pat, x, y)
+
+    t = time.perf_counter()
+    sim.run(generations)
+    elapsed = time.perf_counter() - t
+    queue.put({'engine': engine, 'pattern': pattern, 'pow2': pow2, 'generations': generations,
+               'seconds': elapsed, 'gens_per_s': generations/elapsed,
+               'cells_per_s': generations*4**pow2/elapsed, 'population': int(board.population),
+               'peak_bytes': max(0, peak_rss()-before), 'cache': cache_stats(board)})
+  finally:
+    sim.close()
+
+# Import time of a module on its own, with numpy already loaded
+def import_time ( module ):
+  root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+  runs = []
+  for _ in range(IMPORT_REPEATS):
+    out = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT % module], cwd=root,
+                         capture_output=True, text=True, check=True).stdout.split()
+    runs.append((float(out[1]), float(out[0]), out[2] == 'True'))
+  seconds, numpySeconds, tk = min(runs)
+  return {'module': module, 'seconds': seconds, 'numpy_seconds': numpySeconds, 'tkinter': tk}
+
+def run_case ( *args ):
+  queue = mp.Queue()
+  proc = mp.Process(target=case, args=(queue,) + args)
+  proc.start()
+  result = queue.get()
+  proc.join()
+  return result
+
+# Commit the suite ran against, if this is a git checkout
+def commit ():
+  try:
+    return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+# Print the ratio of generations/s between matching cases of two reports, and
+#  of import times between matching modules
+def compare ( baseline, results, imports ):
+  old = {(r['engine'], r['pattern'], r['pow2'], r['generations']): r for r in baseline['results']}
+  print('against %s' % baseline.get('commit'), file=sys.stderr)
+  for r in results:
+    base = old.get((r['engine'], r['pattern'], r['pow2'], r['generations']))
+    if base is not None:
+      print('%-9s %-11s 2^%-2d %6.2fx' % (r['engine'], r['pattern'], r['pow2'], r['gens_per_s']/base['gens_per_s']), file=sys.stderr)
+  old = {r['module']: r for r in baseline.get('imports', [])}
+  for r in imports:
+    base = old.get(r['module'])
+    if base is not None:
+      print('import %-16s %6.2fx time' % (r['module'], r['seconds']/base['seconds']), file=sys.stderr)
+
+def main ( argv=None ):
+  p = argparse.ArgumentParser(description='Benchmark every engine over a fixed matrix of patterns and sizes')
+  p.add_argument('--engines', nargs='+', default=list(ENGINES), choices=ENGINES)
+  p.add_argument('--patterns', nargs='+', default=list(PATTERN_NAMES), choices=sorted(PATTERNS) + ['soup'])
+  p.add_argument('--sizes', nargs='+', type=int, default=list(SIZES), help='Board sizes as powers of 2')
+  p.add_argument('--generations', type=int, default=GENERATIONS)
+  p.add_argument('--seed', type=int, default=0, help='Seed for the random soups')
+  p.add_argument('--out', default=None, help='Write the JSON here instead of stdout')
+  p.add_argument('--imports', nargs='*', default=list(IMPORTS), help='Modules to time on import, none to skip')
+  p.add_argument('--compare', default=None, help='Earlier report to compare against')
+  args = p.parse_args(argv)
+
+  results = []
+  for engine in args.engines:
+    for pattern in args.patterns:
+      for pow2 in args.sizes:
+        results.append(run_case(engine, pattern, pow2, args.generations, args.seed))
+        print('%-9s %-11s 2^%-2d %10.1f gens/s' % (engine, pattern, pow2, results[-1]['gens_per_s']), file=sys.stderr)
+
+  imports = []
+  for module in args.imports:
+    imports.append(import_time(module))
+    print('import %-16s %8.1f ms%s' % (module, 1000*imports[-1]['seconds'], ', tkinter' if imports[-1]['tkinter'] else ''),
+          file=sys.stderr)
+
+  report = {'commit': commit(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpus': mp.cpu_count(), 'results': results, 'imports': imports}
+  if args.compare:
+    with open(args.compare) as f:
+      compare(json.load(f), results, imports)
+
+  text = json.dumps(report, indent=1)
+  if args.out:
+    with open(args.out, 'w') as f:
+      f.write(text + '\n')
+  else:
+    print(text)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,63 @@
+# Compare the vectorised stepper in life.vector with the per-cell update loop
+#  that ConwayLife.Life.update_grid/update_cell used previously.
+#
+# Usage: python benchmarks/bench_vector.py [size] [rows]
+#  size - Side length of the random soup (default 2048)
+#  rows - Number of interior rows timed with the per-cell loop (default 64);
+#         its cost per cell is scaled up to the full board.
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from life import vector
+
+
+# The original update_cell rule applied to one interior cell
+def update_cell ( life, tlife, x, y ):
+  liveNeighbors = np.sum(life[x-1:x+2,y-1:y+2])-life[x][y]
+  if life[x][y]:
+    if liveNeighbors < 2 or liveNeighbors > 3:
+      tlife[x][y] = False
+  else:
+    if liveNeighbors == 3:
+      tlife[x][y] = True
+
+# The original update_grid loop, restricted to interior rows [1, rows]
+def update_rows ( life, rows ):
+  tlife = life.copy()
+  for i in range(1, rows+1):
+    for j in range(1, life.shape[1]-1):
+      update_cell(life, tlife, i, j)
+  return tlife
+
+def main ( size=2048, rows=64 ):
+  rng = np.random.default_rng(0)
+  life = rng.random((size, size)) < 0.5
+  life[0, :] = life[-1, :] = life[:, 0] = life[:, -1] = False
+
+  # Both implementations must agree on the timed band
+  ref = update_rows(life, rows)
+  new, _ = vector.step(life)
+  assert (ref[1:rows+1] == new[1:rows+1]).all()
+
+  t = time.perf_counter()
+  update_rows(life, rows)
+  loopTime = (time.perf_counter() - t) * (size-2) / rows
+
+  gens = 20
+  out = np.zeros_like(life)
+  t = time.perf_counter()
+  for _ in range(gens):
+    vector.step(life, out)
+  vecTime = (time.perf_counter() - t) / gens
+
+  print('board            %dx%d' % (size, size))
+  print('per-cell loop    %.3f s/gen (extrapolated from %d rows)' % (loopTime, rows))
+  print('vectorised       %.5f s/gen' % vecTime)
+  print('speedup          %.0fx' % (loopTime / vecTime))
+
+if __name__ == '__main__':
+  main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,4 @@
+# Headless simulation engines for Conway's Game of Life.
+#  The Tk front ends in ConwayLife.py and HashLife.py are built on top of these.
+#  The engines need only numpy; Tk, the pattern library and optional features
+#  are imported where they are first used, so workers start quickly.
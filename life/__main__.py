@@ -0,0 +1,3 @@
+from life.cli import main
+
+main()
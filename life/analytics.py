@@ -0,0 +1,330 @@
+import numpy as np
+
+from life.bitboard import WORD
+from life.sparse import decode
+
+
+#### Board Analytics ####
+#
+# Population, bounding box, births and deaths, and the live cells of any
+# region, answered from what the engines already keep rather than by
+# rescanning the board:
+#
+#  hashlife - The root's population, bounding boxes cached per node (see
+#             Universe.bounding_box) and region counts from the populations
+#             of the nodes inside the region.  Births and deaths compare the
+#             roots before and after the last step; interned subtrees that
+#             did not change are skipped without being opened.
+#  sparse - The live cells are already a short sorted list: the population
+#           is its length and the changed keys give births and deaths.
+#  bounded boards - Populations per 2^tileLevel square tile, updated after
+#                   each generation from the cells it changed, or rebuilt
+#                   from the engine's density() after edits or
+#                   multi-generation steps.  Regions add up whole tiles from a
+#                   summed-area table and only read cells along their edges;
+#                   the bounding box only reads the tiles at the edges of the
+#                   live ones.
+#
+# After each step the simulation's subscriber publishes a snapshot of the
+# board: the HashLife root, the sparse keys or the tile counts, none of which
+# are changed in place afterwards.  Queries answer for the last snapshot
+# without taking the simulation's lock, so they never wait for a step or hold
+# one up, and each answer is kept until the next snapshot.  Only answers that
+# read cells take the lock, briefly: the edges of regions and bounding boxes
+# of bounded boards that are not whole tiles, and HashLife's bounding boxes
+# and region counts, whose per-node caches belong to the stepping thread.
+# After an edit the snapshot is taken again under the lock on the next query.
+#
+# Births and deaths are those of the last step: one generation on every
+# engine but HashLife, where they are the net change over the whole jump.
+# They are None if the board has been edited since.
+
+# Side of the tiles of the bounded boards, as a power of 2
+TILE_LEVEL = 6
+
+# Number of trailing zero bits of n, None for 0
+def trailing_zeros ( n ):
+  return (n & -n).bit_length() - 1 if n else None
+
+# Live cells born and died between two nodes covering the same square,
+#  skipping pairs that are the same interned node
+def node_changes ( a, b, memo ):
+  if a is b:
+    return 0, 0
+  if a.pop == 0:
+    return b.pop, 0
+  if b.pop == 0:
+    return 0, a.pop
+  key = (a, b)
+  found = memo.get(key)
+  if found is None:
+    born = died = 0
+    for ca, cb in ((a.nw, b.nw), (a.ne, b.ne), (a.sw, b.sw), (a.se, b.se)):
+      db, dd = node_changes(ca, cb, memo)
+      born += db
+      died += dd
+    found = memo[key] = (born, died)
+  return found
+
+# Non-empty nodes of the given level under node, whose corner is at x, y,
+#  as {(x, y): node}
+def nodes_at ( node, x, y, level ):
+  found = {}
+  stack = [(node, x, y)]
+  while stack:
+    node, x, y = stack.pop()
+    if node.pop == 0:
+      continue
+    if node.level == level:
+      found[(x, y)] = node
+      continue
+    h = 2**(node.level-1)
+    stack.extend(((node.nw, x, y), (node.ne, x+h, y), (node.sw, x, y+h), (node.se, x+h, y+h)))
+  return found
+
+# (births, deaths) between two HashLife roots, each given as (root, originX, originY).
+#  Both trees are cut at the highest level at which their node grids line
+#  up and the nodes at each position compared.
+def tree_changes ( before, after ):
+  (a, ax, ay), (b, bx, by) = before, after
+  level = min(a.level, b.level)
+  for shift in (trailing_zeros(ax-bx), trailing_zeros(ay-by)):
+    if shift is not None:
+      level = min(level, shift)
+  old = nodes_at(a, ax, ay, level)
+  new = nodes_at(b, bx, by, level)
+  born = died = 0
+  memo = {}
+  for corner, node in new.items():
+    other = old.pop(corner, None)
+    if other is None:
+      born += node.pop
+    else:
+      db, dd = node_changes(other, node, memo)
+      born += db
+      died += dd
+  died += sum(node.pop for node in old.values())
+  return born, died
+
+class Analytics():
+
+  # sim - life.sim.Simulation to follow
+  # tileLevel - Tiles of the bounded boards are 2^tileLevel cells per side
+  def __init__ ( self, sim, tileLevel=TILE_LEVEL ):
+    self.sim = sim
+    self.engine = sim.engine
+    self.tileLevel = tileLevel
+    name = type(self.engine).__name__
+    self.kind = 'tree' if name == 'Universe' else 'sparse' if name == 'SparseLife' else 'grid'
+
+    # Snapshot of the board after the last step, as (state, board, changes)
+    #  where state is (generation, edits) and changes (births, deaths) of the
+    #  step, None after edits; for HashLife changes is the board before the
+    #  step, compared on request.  board is per kind:
+    #   tree - (root, originX, originY)
+    #   sparse - Sorted keys of the live cells
+    #   grid - (tile populations, their summed-area table)
+    self.snapshot = None
+    # Answers for a state, as (state, {name: value}), swapped whole
+    self.answers = (None, {})
+    with sim.lock:
+      self.snapshot = self.capture(False)
+    sim.subscribe(self.stepped)
+
+  def close ( self ):
+    self.sim.unsubscribe(self.stepped)
+
+  # Called by the simulation after each step
+  def stepped ( self, sim ):
+    self.snapshot = self.capture(True)
+
+  # Snapshot of the board as it is, called under the simulation's lock.
+  #  stepped - Whether a step just ended, so its changes can be counted
+  def capture ( self, stepped ):
+    engine = self.engine
+    edits = self.sim.edits
+    state = (engine.generation, edits)
+    last = self.snapshot
+    changes = None
+    if self.kind == 'tree':
+      board = (engine.root, engine.originX, engine.originY)
+      if stepped and last is not None and last[0][1] == edits:
+        changes = last[1]
+    elif self.kind == 'sparse':
+      board = engine.keys
+      if stepped:
+        changed = engine.changed
+        born = int(np.count_nonzero(np.isin(changed, board, assume_unique=True)))
+        changes = (born, len(changed) - born)
+    else:
+      level = self.tileLevel
+      if stepped:
+        born, died = self.changed_cells()
+        changes = (len(born), len(died))
+      if stepped and last is not None and last[0] == (engine.generation-1, edits):
+        # One generation on: apply its births and deaths to new counts
+        n = last[1][0].shape[0]
+        delta = (np.bincount((born[:, 0] >> level)*n + (born[:, 1] >> level), minlength=n*n) -
+                 np.bincount((died[:, 0] >> level)*n + (died[:, 1] >> level), minlength=n*n))
+        tiles = last[1][0] + delta.reshape(n, n)
+      else:
+        n = -(-engine.gridSize >> level)
+        tiles = np.rint(engine.density(0, 0, n, n, level) * 4**level).astype(np.int64)
+      table = np.zeros((n+1, n+1), dtype=np.int64)
+      np.cumsum(np.cumsum(tiles, axis=0), axis=1, out=table[1:, 1:])
+      board = (tiles, table)
+    return (state, board, changes)
+
+  # Snapshot to answer from, taken again if the board was edited since
+  def current ( self ):
+    snapshot = self.snapshot
+    if snapshot[0][1] == self.sim.edits:
+      return snapshot
+    with self.sim.lock:
+      if self.snapshot[0] != (self.engine.generation, self.sim.edits):
+        self.snapshot = self.capture(False)
+      return self.snapshot
+
+  # Value of compute(snapshot), worked out once per snapshot.
+  #  locked - Whether compute reads the engine, so needs the lock and the
+  #  snapshot of the board as it is under it
+  def cached ( self, name, compute, locked=False ):
+    if locked:
+      with self.sim.lock:
+        return self.remember(self.current(), name, compute)
+    return self.remember(self.current(), name, compute)
+
+  def remember ( self, snapshot, name, compute ):
+    answers = self.answers
+    if answers[0] != snapshot[0]:
+      answers = (snapshot[0], {})
+      self.answers = answers
+    values = answers[1]
+    if name not in values:
+      values[name] = compute(snapshot)
+    return values[name]
+
+
+  #### Queries ####
+
+  @property
+  def population ( self ):
+    return self.cached('population', self.count_population)
+
+  # (xmin, ymin, xmax, ymax) enclosing every live cell, None if there are none
+  def bounding_box ( self ):
+    return self.cached('box', self.find_box, self.kind != 'sparse')
+
+  # (births, deaths) of the last step, None if the board was edited since
+  def changes ( self ):
+    if self.kind == 'tree':
+      return self.cached('changes', self.count_changes)
+    return self.current()[2]
+
+  @property
+  def births ( self ):
+    changes = self.changes()
+    return None if changes is None else changes[0]
+
+  @property
+  def deaths ( self ):
+    changes = self.changes()
+    return None if changes is None else changes[1]
+
+  # Number of live cells in the rectangle [x, x+w) x [y, y+h)
+  def count ( self, x, y, w, h ):
+    t = 2**self.tileLevel
+    # Regions of whole tiles are read from the tile counts alone
+    locked = self.kind == 'tree' or (self.kind == 'grid' and (x % t or y % t or w % t or h % t or w <= 0 or h <= 0))
+    return self.cached(('count', x, y, w, h), lambda snapshot: self.count_region(snapshot, x, y, w, h), locked)
+
+  # Live fraction of the rectangle [x, x+w) x [y, y+h)
+  def density ( self, x, y, w, h ):
+    return self.count(x, y, w, h) / float(w*h) if w > 0 and h > 0 else 0.
+
+  # Everything a dashboard polls, as a dict
+  def summary ( self ):
+    snapshot = self.current()
+    changes = self.changes()
+    return {'generation': snapshot[0][0], 'population': self.population,
+            'births': None if changes is None else changes[0],
+            'deaths': None if changes is None else changes[1],
+            'bounding_box': self.bounding_box()}
+
+
+  #### Computation ####
+  #
+  # From a snapshot; those that read the engine are called under the
+  # simulation's lock, with the snapshot of the board as it is.
+
+  def count_population ( self, snapshot ):
+    board = snapshot[1]
+    if self.kind == 'tree':
+      return int(board[0].pop)
+    if self.kind == 'sparse':
+      return len(board)
+    return int(board[1][-1, -1])
+
+  def find_box ( self, snapshot ):
+    if self.kind == 'tree':
+      return self.engine.bounding_box()
+    if self.kind == 'sparse':
+      if len(snapshot[1]) == 0:
+        return None
+      cells = decode(snapshot[1])
+      (xmin, ymin), (xmax, ymax) = cells.min(axis=0), cells.max(axis=0)
+      return (int(xmin), int(ymin), int(xmax)+1, int(ymax)+1)
+    tiles = snapshot[1][0]
+    xs = np.flatnonzero(tiles.any(axis=1))
+    ys = np.flatnonzero(tiles.any(axis=0))
+    if len(xs) == 0:
+      return None
+    # Only the edge tiles of the live ones are read, as four strips
+    t = 2**self.tileLevel
+    x0, x1, y0, y1 = xs[0]*t, (xs[-1]+1)*t, ys[0]*t, (ys[-1]+1)*t
+    window = self.engine.window
+    xmin = x0 + np.flatnonzero(window(x0, y0, t, y1-y0).any(axis=1))[0]
+    xmax = x1-t + np.flatnonzero(window(x1-t, y0, t, y1-y0).any(axis=1))[-1] + 1
+    ymin = y0 + np.flatnonzero(window(x0, y0, x1-x0, t).any(axis=0))[0]
+    ymax = y1-t + np.flatnonzero(window(x0, y1-t, x1-x0, t).any(axis=0))[-1] + 1
+    return (int(xmin), int(ymin), int(xmax), int(ymax))
+
+  def count_changes ( self, snapshot ):
+    before = snapshot[2]
+    return None if before is None else tree_changes(before, snapshot[1])
+
+  def count_region ( self, snapshot, x, y, w, h ):
+    if self.kind == 'tree':
+      return self.engine.count(x, y, w, h)
+    if self.kind == 'sparse':
+      cells = decode(snapshot[1])
+      return int(np.count_nonzero((cells[:, 0] >= x) & (cells[:, 0] < x+w) & (cells[:, 1] >= y) & (cells[:, 1] < y+h)))
+
+    # Whole tiles from the summed-area table, cells only along the edges
+    tiles, table = snapshot[1]
+    t = 2**self.tileLevel
+    tx0, ty0 = -(-x // t), -(-y // t)
+    tx1, ty1 = (x+w) // t, (y+h) // t
+    window = self.engine.window
+    if tx1 <= tx0 or ty1 <= ty0:
+      return int(np.count_nonzero(window(x, y, w, h)))
+    n = tiles.shape[0]
+    cx0, cy0, cx1, cy1 = min(max(tx0, 0), n), min(max(ty0, 0), n), min(max(tx1, 0), n), min(max(ty1, 0), n)
+    total = int(table[cx1, cy1] - table[cx0, cy1] - table[cx1, cy0] + table[cx0, cy0])
+    for sx, sy, sw, sh in ((x, y, tx0*t-x, h), (tx1*t, y, x+w-tx1*t, h),
+                           (tx0*t, y, (tx1-tx0)*t, ty0*t-y), (tx0*t, ty1*t, (tx1-tx0)*t, y+h-ty1*t)):
+      if sw > 0 and sh > 0:
+        total += int(np.count_nonzero(window(sx, sy, sw, sh)))
+    return total
+
+  # Coordinates of the cells born and died in the last generation of a
+  #  bounded board, from the changes its step recorded
+  def changed_cells ( self ):
+    cells = self.engine.changed_cells()
+    engine = self.engine
+    if hasattr(engine, 'life'):
+      alive = engine.life[cells[:, 0], cells[:, 1]]
+    else:
+      words = engine.words[cells[:, 0], cells[:, 1] // WORD]
+      alive = ((words >> (cells[:, 1] % WORD).astype(np.uint64)) & np.uint64(1)) == 1
+    return cells[alive], cells[~alive]
@@ -0,0 +1,134 @@
+import numpy as np
+
+from life import rules, vector
+from life.bitboard import pack, step_words
+
+
+#### Batched Soup Search ####
+#
+# Many independent random soups stepped in lockstep.  The boards are one
+# (count, gridSize, words) array of bit-packed cells, so a generation of the
+# whole batch is a single step_words call.  Each board has the usual dead
+# border, or wrapped or mirrored edges, and its soup seeded in the centre.
+#
+# A soup has stabilised once its board repeats.  Every generation a 64-bit
+# hash of each board is compared against the last `window` generations of
+# hashes; the first repeat gives the generation the soup settled at and its
+# period.  Settled soups are dropped from the stack as they accumulate, so the
+# batch gets cheaper as it settles.
+
+# Per-soup population of a stack of packed boards
+def populations ( words ):
+  if hasattr(np, 'bitwise_count'):
+    return np.bitwise_count(words).sum(axis=(-2, -1), dtype=np.int64)
+  bits = np.unpackbits(words.view(np.uint8), axis=-1)
+  return bits.sum(axis=(-2, -1), dtype=np.int64)
+
+class SoupBatch():
+
+  # count - Number of soups
+  # gridSize - Side of each board, including any dead border
+  # soupSize - Side of the random square seeded in the centre of each board
+  # density - Probability of each soup cell being alive
+  # seed - Seed for the random soups, so a batch can be reproduced
+  # rule - life.rules.Rule or B/S string, Conway's Life by default
+  # boundary - 'dead', 'torus' or 'reflect', see life.vector
+  def __init__ ( self, count, gridSize=64, soupSize=16, density=0.5, seed=None, rule=None, boundary='dead' ):
+    margin = vector.margin(boundary)
+    if soupSize > gridSize-2*margin:
+      raise ValueError('Soups of side %d do not fit boards of side %d' % (soupSize, gridSize))
+    self.count = count
+    self.gridSize = gridSize
+    self.rule = rules.rule_of(rule)
+    self.boundary = boundary
+    self.generation = 0
+
+    # All soups are drawn in one call, then placed in the centre of their boards
+    rng = np.random.default_rng(seed)
+    soups = rng.random((count, soupSize, soupSize)) < density
+    cells = np.zeros((count, gridSize, gridSize), dtype=bool)
+    x = (gridSize - soupSize)//2
+    cells[:, x:x+soupSize, x:x+soupSize] = soups
+    self.initial = soups
+    self.words = pack(cells.reshape(-1, gridSize)).reshape(count, gridSize, -1)
+
+    rowMask = np.zeros(gridSize, dtype=bool)
+    rowMask[margin:gridSize-margin] = True
+    self.interior = pack(rowMask[np.newaxis, :])[0]
+
+    # Fixed random keys for hashing each word position
+    self.salt = np.random.default_rng(0).integers(0, 2**63, size=self.words.shape[1:], dtype=np.uint64)
+
+  def step ( self ):
+    self.words = step_words(self.words, self.interior, self.rule, self.boundary)
+    self.generation += 1
+
+  # 64-bit hash of each board: every word, keyed by its position, goes
+  #  through the splitmix64 finaliser and the results are summed.  Mixing
+  #  first matters, a plain weighted sum lets changes in high bits cancel.
+  def hashes ( self, words ):
+    z = words ^ self.salt
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(0xbf58476d1ce4e5b9)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(0x94d049bb133111eb)
+    z ^= z >> np.uint64(31)
+    return z.sum(axis=(-2, -1), dtype=np.uint64)
+
+  # Run every soup, from the current boards, until it stabilises or for the
+  #  given number of generations.  The boards themselves are left as they are.
+  #  Returns a dict of arrays indexed by soup:
+  #   populations - (count, generations+1) population curves; settled soups
+  #                 are filled in from their cycle
+  #   settled - Generation each soup first entered its cycle, -1 if it did not
+  #             within the run
+  #   periods - Period of each settled soup, 0 if not settled
+  # window - Generations of hashes remembered, the longest period detected
+  def run ( self, generations, window=64 ):
+    generations = int(generations)
+    count = self.count
+    curves = np.zeros((count, generations+1), dtype=np.int64)
+    settled = np.full(count, -1, dtype=np.int64)
+    periods = np.zeros(count, dtype=np.int64)
+
+    # Soups still being stepped, and the slots of their boards in words
+    active = np.arange(count)
+    words = self.words
+    history = np.zeros((window, count), dtype=np.uint64)
+    historyGen = np.full(window, -1, dtype=np.int64)
+    done = np.zeros(count, dtype=bool)
+
+    for g in range(generations+1):
+      if g:
+        words = step_words(words, self.interior, self.rule, self.boundary)
+      curves[active, g] = populations(words)
+
+      h = self.hashes(words)
+      seen = (history == h) & (historyGen >= 0)[:, np.newaxis]
+      new = seen.any(axis=0) & ~done
+      if new.any():
+        # The most recent match gives the period
+        slots = np.where(seen[:, new], historyGen[:, np.newaxis], -1).max(axis=0)
+        settled[active[new]] = slots
+        periods[active[new]] = g - slots
+        done |= new
+      history[g % window] = h
+      historyGen[g % window] = g
+
+      # Drop settled soups once enough have accumulated to be worth the copy
+      if done.sum() * 8 >= len(active) and done.any():
+        keep = ~done
+        active = active[keep]
+        words = words[keep]
+        history = history[:, keep]
+        done = done[keep]
+        if len(active) == 0:
+          break
+
+    # Fill in the curves of settled soups from the cycle they settled into
+    for i in np.flatnonzero(settled >= 0):
+      start, period = settled[i], periods[i]
+      g = np.arange(start+period, generations+1)
+      curves[i, start+period:] = curves[i, start + (g - start) % period]
+
+    return {'populations': curves, 'settled': settled, 'periods': periods}
@@ -0,0 +1,284 @@
+import numpy as np
+
+from life import rules, vector
+
+
+#### Bit-Packed Board ####
+#
+# Cells are packed 64 to a uint64 word along the y axis: cell [x, y] is bit
+# y % 64 of words[x, y // 64].  The next generation is computed with bitwise
+# adder logic on whole words, so every operation processes 64 cells and the
+# board takes one bit per cell instead of one byte.
+#
+# The board has the same boundaries as the dense boards: by default a
+# permanently dead one-cell border, or wrapped or mirrored edges.  The
+# stepping functions also accept a stack of boards, (..., x, words).
+
+WORD = 64
+
+# Number of set bits in an array of words
+def popcount ( words ):
+  if hasattr(np, 'bitwise_count'):
+    return int(np.bitwise_count(words).sum())
+  return int(np.unpackbits(words.view(np.uint8)).sum())
+
+# Pack a 2D array of bools into words along its second axis
+def pack ( arr ):
+  nx, ny = arr.shape
+  nw = -(-ny // WORD)
+  padded = np.zeros((nx, nw*WORD), dtype=bool)
+  padded[:, :ny] = arr
+  bytes8 = np.packbits(padded.reshape(nx, nw*8, 8), axis=-1, bitorder='little')
+  return bytes8.reshape(nx, nw*8).view('<u8').astype(np.uint64)
+
+# Unpack words into a 2D array of bools with ny cells per row
+def unpack ( words, ny ):
+  bits = np.unpackbits(words.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+  return bits[:, :ny].astype(bool)
+
+# Coordinates of the set bits of packed words as an (n, 2) array,
+#  unpacking only the non-zero words
+def set_bits ( words ):
+  xs, ws = np.nonzero(words)
+  if len(xs) == 0:
+    return np.zeros((0, 2), dtype=np.int64)
+  bits = unpack(words[xs, ws][:, np.newaxis], WORD)
+  rows, offs = np.nonzero(bits)
+  return np.stack((xs[rows], ws[rows]*WORD + offs), axis=1)
+
+# Shift every row of words so bit b holds what bit b-1 (cell y-1) held
+def shift_up ( words ):
+  out = words << np.uint64(1)
+  out[..., 1:] |= words[..., :-1] >> np.uint64(WORD-1)
+  return out
+
+# Shift every row of words so bit b holds what bit b+1 (cell y+1) held
+def shift_down ( words ):
+  out = words >> np.uint64(1)
+  out[..., :-1] |= words[..., 1:] << np.uint64(WORD-1)
+  return out
+
+# Box sums, the cell and its 8 neighbours, at which a cell lives under a rule,
+#  split into (either state, dead only, alive only), for each life.rules.Rule
+WORD_RULES = {}
+
+def word_rule ( rule ):
+  compiled = WORD_RULES.get(rule)
+  if compiled is None:
+    born = set(rule.birth)
+    kept = {n+1 for n in rule.survive}
+    compiled = (sorted(born & kept), sorted(born - kept), sorted(kept - born))
+    WORD_RULES[rule] = compiled
+  return compiled
+
+# Words where the 4-bit box sums bits equal any of values
+def sum_equals ( values, bits, inverted ):
+  out = None
+  for v in values:
+    term = bits[0] if v & 1 else inverted[0]
+    for i in range(1, 4):
+      term = term & (bits[i] if v >> i & 1 else inverted[i])
+    out = term if out is None else out | term
+  return out
+
+# Next words of rows whose 2-bit row sums (see step_words) are b, with a the
+#  row sums above and c below.  The three are added with full adders into
+#  the 3x3 box sum s including the cell itself.  Under Conway's rules
+#  (B3/S23) a cell lives when s == 3, or when it is alive and s == 4, which
+#  only needs s mod 8; other rules match the full 4-bit sum against the
+#  values word_rule() compiles them to.
+def next_words ( a0, a1, b0, b1, c0, c1, alive, rule ):
+  s0 = a0 ^ b0 ^ c0
+  carry = (a0 & b0) | (c0 & (a0 ^ b0))
+  t = a1 ^ b1 ^ c1
+  s1 = t ^ carry
+  m = (a1 & b1) | (c1 & (a1 ^ b1))
+  s2 = m ^ (t & carry)
+
+  if rule is None or rule.conway:
+    return (s0 & s1 & ~s2) | (alive & ~s0 & ~s1 & s2)
+  s3 = m & t & carry
+  bits = (s0, s1, s2, s3)
+  inverted = (~s0, ~s1, ~s2, ~s3)
+  either, dead, kept = word_rule(rule)
+  new = np.zeros_like(alive)
+  for values, state in ((either, None), (dead, ~alive), (kept, alive)):
+    match = sum_equals(values, bits, inverted)
+    if match is not None:
+      new |= match if state is None else match & state
+  return new
+
+# Advance packed words one generation.  Each row's cell is summed with its y
+#  neighbours into a 2-bit value, then three rows of those go to next_words.
+#  Boards must be square.
+# interior - Mask of one row of words with the cells that evolve, excluding
+#            the border cells of a dead boundary
+# rule - life.rules.Rule, None for B3/S23
+# boundary - 'dead', 'torus' or 'reflect', see life.vector.  The cells past
+#  the ends of rows are patched in from the far end or the end itself, and
+#  the row sums get a ghost row either side holding the first and last rows'
+#  neighbours, rather than padding the board.
+def step_words ( words, interior, rule=None, boundary='dead' ):
+  left = shift_up(words)
+  right = shift_down(words)
+  n = words.shape[-2]
+  torus = boundary == 'torus'
+
+  if boundary == 'dead':
+    # Row sums: h1 h0 = left + centre + right
+    h0 = left ^ words ^ right
+    h1 = (left & words) | (right & (left ^ words))
+    out = np.zeros_like(words)
+    out[..., 1:-1, :] = next_words(h0[..., :-2, :], h1[..., :-2, :], h0[..., 1:-1, :], h1[..., 1:-1, :],
+                                   h0[..., 2:, :], h1[..., 2:, :], words[..., 1:-1, :], rule)
+    out[..., 1:-1, :] &= interior
+    return out
+
+  last = (n-1) // WORD
+  bit = np.uint64((n-1) % WORD)
+  one = np.uint64(1)
+  if torus:
+    left[..., 0] |= (words[..., last] >> bit) & one
+    right[..., last] |= (words[..., 0] & one) << bit
+  else:
+    left[..., 0] |= words[..., 0] & one
+    right[..., last] |= words[..., last] & (one << bit)
+
+  # Row sums for rows -1 to n, the ghost rows copied from the far or the same edge
+  shape = words.shape[:-2] + (n+2, words.shape[-1])
+  h0 = np.empty(shape, dtype=words.dtype)
+  h1 = np.empty(shape, dtype=words.dtype)
+  lr = left ^ words
+  np.bitwise_xor(lr, right, out=h0[..., 1:-1, :])
+  np.bitwise_and(right, lr, out=h1[..., 1:-1, :])
+  h1[..., 1:-1, :] |= left & words
+  above, below = (n, 1) if torus else (1, n)
+  for h in (h0, h1):
+    h[..., 0, :] = h[..., above, :]
+    h[..., -1, :] = h[..., below, :]
+
+  out = next_words(h0[..., :-2, :], h1[..., :-2, :], h0[..., 1:-1, :], h1[..., 1:-1, :],
+                   h0[..., 2:, :], h1[..., 2:, :], words, rule)
+  out &= interior
+  return out
+
+class BitBoard():
+
+  # rule - life.rules.Rule or B/S string, Conway's Life by default
+  # boundary - 'dead', 'torus' or 'reflect', see life.vector
+  def __init__ ( self, gridSize, rule=None, boundary='dead' ):
+    self.gridSize = gridSize
+    self.rule = rules.rule_of(rule)
+    self.boundary = boundary
+    self.margin = vector.margin(boundary)
+    self.words = np.zeros((gridSize, -(-gridSize // WORD)), dtype=np.uint64)
+    self.changed = np.zeros_like(self.words)
+    self.generation = 0
+
+    # Bits of the evolving cells in one row
+    rowMask = np.zeros(gridSize, dtype=bool)
+    rowMask[self.margin:gridSize-self.margin] = True
+    self.interior = pack(rowMask[np.newaxis, :])[0]
+
+  #### Game Logic ####
+
+  # Switch to another rule, given as a life.rules.Rule or B/S string
+  def set_rule ( self, rule ):
+    self.rule = rules.rule_of(rule)
+
+  # Advance one generation, returning the packed mask of changed cells
+  def step ( self ):
+    new = step_words(self.words, self.interior, self.rule, self.boundary)
+    np.bitwise_xor(self.words, new, out=self.changed)
+    self.words = new
+    self.generation += 1
+    return self.changed
+
+  # Coordinates of the cells changed by the last step as an (n, 2) array
+  def changed_cells ( self ):
+    return set_bits(self.changed)
+
+  #### Cell Access ####
+
+  @property
+  def population ( self ):
+    return popcount(self.words)
+
+  def get_cell ( self, x, y ):
+    return bool((int(self.words[x, y // WORD]) >> (y % WORD)) & 1)
+
+  def set_cell ( self, x, y, alive ):
+    bit = np.uint64(1 << (y % WORD))
+    if alive:
+      self.words[x, y // WORD] |= bit
+    else:
+      self.words[x, y // WORD] &= ~bit
+
+  # Place a pattern with its upper left corner at x, y, as draw_pattern does.
+  #  Returns False without changing the board if it would touch a dead
+  #  border or leave the board.
+  # pat - 2D Numpy array of bools specifying pattern
+  def place_pattern ( self, pat, x, y ):
+    xmax = x + pat.shape[0]
+    ymax = y + pat.shape[1]
+    m = self.margin
+    if x < m or y < m or xmax > self.gridSize-m or ymax > self.gridSize-m:
+      return False
+
+    # Rewrite only the words the pattern overlaps
+    w0 = y // WORD
+    w1 = -(-ymax // WORD)
+    rows = unpack(self.words[x:xmax, w0:w1], (w1-w0)*WORD)
+    rows[:, y-w0*WORD:ymax-w0*WORD] = pat
+    self.words[x:xmax, w0:w1] = pack(rows)
+    return True
+
+  # Turn on the cells at coordinates cells ((n, 2) array of x, y).
+  #  Returns False without changing the board if any would touch a dead
+  #  border or lie outside the board.
+  def add_cells ( self, cells ):
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    if len(cells) and (cells.min() < self.margin or cells.max() > self.gridSize-1-self.margin):
+      return False
+    bits = np.left_shift(np.uint64(1), (cells[:, 1] % WORD).astype(np.uint64))
+    np.bitwise_or.at(self.words, (cells[:, 0], cells[:, 1] // WORD), bits)
+    return True
+
+  # Toggle a cell as a click does, returning its new state, or None if the
+  #  cell is on a dead border or outside the board
+  def toggle ( self, x, y ):
+    m = self.margin
+    if x < self.gridSize-m and y < self.gridSize-m and x >= m and y >= m:
+      alive = not self.get_cell(x, y)
+      self.set_cell(x, y, alive)
+      return alive
+    return None
+
+  def clear ( self ):
+    self.words[:, :] = 0
+
+  # Coordinates of every live cell as an (n, 2) array
+  def cells ( self ):
+    return set_bits(self.words)
+
+  # Return the cells in the rectangle [x, x+w) x [y, y+h) as an array of bools
+  def window ( self, x, y, w, h ):
+    x0, x1 = max(x, 0), min(x+w, self.gridSize)
+    w0, w1 = max(y, 0) // WORD, -(-min(y+h, self.gridSize) // WORD)
+    if x1 <= x0 or w1 <= w0:
+      return np.zeros((w, h), dtype=bool)
+    rows = unpack(self.words[x0:x1, w0:w1], (w1-w0)*WORD)
+    return vector.window(rows, x-x0, y-w0*WORD, w, h)
+
+  # Live fraction of each 2^level x 2^level block in the w x h blocks from
+  #  block x, y.  Only the rows in view are unpacked.
+  def density ( self, x, y, w, h, level ):
+    s = 2**level
+    x0, x1 = max(x*s, 0), min((x+w)*s, self.gridSize)
+    if x1 <= x0:
+      return np.zeros((w, h), dtype=np.float32)
+    rows = unpack(self.words[x0:x1], self.gridSize)
+    return vector.density(rows, x - x0//s, y, w, h, level)
+
+  def to_array ( self ):
+    return unpack(self.words, self.gridSize)
@@ -0,0 +1,85 @@
+import sys
+from collections import OrderedDict
+
+
+#### Bounded Memo Cache ####
+
+# Estimate of the bytes an entry holds: the key, the value (numpy arrays by
+#  their buffer) and a fixed allowance for the dict slot and ordering links
+ENTRY_OVERHEAD = 100
+
+def entry_bytes ( key, value ):
+  nbytes = getattr(value, 'nbytes', None)
+  if nbytes is None:
+    nbytes = sys.getsizeof(value)
+  return sys.getsizeof(key) + nbytes + ENTRY_OVERHEAD
+
+# Least recently used cache with an entry and/or byte budget.
+#  get() returns None on a miss, so None cannot be stored as a value.
+class MemoCache():
+
+  def __init__ ( self, maxEntries=None, maxBytes=None ):
+    self.maxEntries = maxEntries
+    self.maxBytes = maxBytes
+    self.entries = OrderedDict()
+    self.sizes = {}
+
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.bytes = 0
+
+  def __len__ ( self ):
+    return len(self.entries)
+
+  def __contains__ ( self, key ):
+    return key in self.entries
+
+  # Return the value stored for key, or None, and count the hit or miss
+  def get ( self, key ):
+    value = self.entries.get(key)
+    if value is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+      self.entries.move_to_end(key)
+    return value
+
+  # Store a value, evicting the least recently used entries to stay within budget
+  def put ( self, key, value ):
+    if key in self.entries:
+      self.bytes -= self.sizes[key]
+    size = entry_bytes(key, value)
+    self.entries[key] = value
+    self.entries.move_to_end(key)
+    self.sizes[key] = size
+    self.bytes += size
+
+    while len(self.entries) > 1 and self.over_budget():
+      self.evict()
+
+  # Drop the least recently used entry
+  def evict ( self ):
+    old, _ = self.entries.popitem(last=False)
+    self.bytes -= self.sizes.pop(old)
+    self.evictions += 1
+
+  # Set the byte budget, evicting entries until it is met
+  def set_max_bytes ( self, maxBytes ):
+    self.maxBytes = maxBytes
+    while self.entries and self.bytes > maxBytes:
+      self.evict()
+
+  def over_budget ( self ):
+    return ((self.maxEntries is not None and len(self.entries) > self.maxEntries) or
+            (self.maxBytes is not None and self.bytes > self.maxBytes))
+
+  def clear ( self ):
+    self.entries.clear()
+    self.sizes.clear()
+    self.bytes = 0
+
+  # Counters as a dict, for printing or logging
+  def stats ( self ):
+    return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'bytes': self.bytes}
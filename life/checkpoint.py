@@ -0,0 +1,288 @@
+import json
+import os
+import queue
+import shutil
+import threading
+
+import numpy as np
+
+from life.sim import engine_name, make_engine
+
+
+#### Checkpoints ####
+#
+# A checkpoint is a directory holding meta.json, with the engine, generation,
+# rule and boundary, and one .npy file per array.  Memo tables are the
+# current rule's.  Arrays are opened memory-mapped on restore, so a large
+# board or memo is paged in as it is used rather than read up front.
+#
+#  dense, parallel - board.npy, the cells
+#  packed - words.npy, the bit-packed cells
+#  sparse - keys.npy, the live cell keys
+#  hashgrid - board.npy; with the memo, ids.npy and idKeys.npy for the window
+#             key table and patterns<s>.npy, patternKeys<s>.npy and
+#             patternOrder<s>.npy for the s x s patterns in lifePatterns
+#  hashlife - children.npy, the quadtree as rows of child indices (0 and 1
+#             are the dead and live cells, row i is node i+2, children before
+#             parents); with the memo every interned node is kept along with
+#             results.npy and steps.npy, the cached successors
+#
+# Saving is split in two: capture() takes a consistent copy of what is needed
+# and is cheap enough to call between generations; write() turns that into
+# files and can run on another thread while the simulation carries on.
+
+#### Capture ####
+
+# Capture the state of an engine for writing
+# memo - Include the HashLife memo tables
+def capture ( engine, memo=True ):
+  name = engine_name(engine)
+  meta = {'engine': name, 'generation': engine.generation, 'rule': str(engine.rule), 'memo': False}
+  arrays = {}
+  if name in ('dense', 'parallel', 'hashgrid'):
+    meta['pow2'] = engine.gridSize.bit_length()-1
+    meta['boundary'] = engine.boundary
+    arrays['board'] = engine.life.copy()
+    if name == 'hashgrid' and memo:
+      meta['memo'] = True
+      meta['nextId'] = engine.keys.nextId
+      # Values are never written after they are cached, so references are enough
+      arrays['ids'] = list(engine.keys.ids.entries.items())
+      arrays['patterns'] = list(engine.lifePatterns.entries.items())
+  elif name == 'packed':
+    meta['pow2'] = engine.gridSize.bit_length()-1
+    meta['boundary'] = engine.boundary
+    arrays['words'] = engine.words.copy()
+  elif name == 'sparse':
+    # The keys array is replaced, not modified, by each step
+    arrays['keys'] = engine.keys
+  else:
+    meta['originX'] = engine.originX
+    meta['originY'] = engine.originY
+    # Nodes are immutable, so the root and a list of the table is a snapshot
+    arrays['root'] = engine.root
+    if memo:
+      meta['memo'] = True
+      arrays['nodes'] = nodes = list(engine.nodes.values())
+      # Results are set on the nodes, so they are read now rather than when
+      #  written, in case the rule changes in between
+      arrays['results'] = [node.result for node in nodes]
+      arrays['steps'] = list(engine.steps.items())
+  return engine, meta, arrays
+
+#### Writing ####
+
+# Write a capture to the checkpoint directory path, replacing any previous
+#  checkpoint there only once the new one is complete
+def write ( path, captured ):
+  engine, meta, arrays = captured
+  if meta['engine'] == 'hashgrid' and meta['memo']:
+    arrays = grid_memo_arrays(arrays)
+  elif meta['engine'] == 'hashlife':
+    arrays = tree_arrays(engine, meta, arrays)
+
+  tmp = path + '.tmp'
+  if os.path.exists(tmp):
+    shutil.rmtree(tmp)
+  os.makedirs(tmp)
+  for name, arr in arrays.items():
+    np.save(os.path.join(tmp, name + '.npy'), arr)
+  with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+    json.dump(meta, f)
+
+  old = path + '.old'
+  if os.path.exists(path):
+    os.replace(path, old)
+  os.replace(tmp, path)
+  if os.path.exists(old):
+    shutil.rmtree(old)
+
+# Save a checkpoint of an engine
+def save ( path, engine, memo=True ):
+  write(path, capture(engine, memo))
+
+# HashGrid memo tables as arrays.  Window keys are stored as rows of their
+#  four quadrant keys; patterns are grouped by size and keep their
+#  position in the LRU order.
+def grid_memo_arrays ( arrays ):
+  out = {'board': arrays['board']}
+  ids = arrays['ids']
+  out['idKeys'] = np.array([q for q, _ in ids], dtype=np.uint64).reshape(-1, 4)
+  out['ids'] = np.array([i for _, i in ids], dtype=np.int64)
+
+  sizes = {}
+  for order, (key, pattern) in enumerate(arrays['patterns']):
+    sizes.setdefault(pattern.shape[0], []).append((order, key, pattern))
+  for s, entries in sizes.items():
+    out['patternOrder%d' % s] = np.array([e[0] for e in entries], dtype=np.int64)
+    out['patternKeys%d' % s] = np.array([e[1] for e in entries], dtype=np.int64)
+    out['patterns%d' % s] = np.stack([e[2] for e in entries])
+  return out
+
+# Quadtree nodes as arrays of child indices, children before parents
+def tree_arrays ( universe, meta, arrays ):
+  root = arrays['root']
+  if 'nodes' in arrays:
+    nodes = set(arrays['nodes'])
+    nodes.add(root)
+  else:
+    nodes = set()
+    stack = [root]
+    while stack:
+      node = stack.pop()
+      if node.level == 0 or node in nodes:
+        continue
+      nodes.add(node)
+      stack.extend((node.nw, node.ne, node.sw, node.se))
+
+  order = sorted(nodes, key=lambda node: node.level)
+  index = {universe.off: 0, universe.on: 1}
+  for i, node in enumerate(order):
+    index[node] = i+2
+  meta['root'] = index[root]
+
+  out = {'children': np.array([(index[n.nw], index[n.ne], index[n.sw], index[n.se]) for n in order],
+                              dtype=np.int64).reshape(-1, 4)}
+  if 'nodes' in arrays:
+    results = dict(zip(arrays['nodes'], arrays['results']))
+    out['results'] = np.array([index.get(results.get(n), -1) for n in order], dtype=np.int64)
+    out['steps'] = np.array([(index[node], j, index[result]) for (node, j), result in arrays['steps']
+                             if node in index and result in index], dtype=np.int64).reshape(-1, 3)
+  return out
+
+#### Restoring ####
+
+# Restore a checkpoint into engine, or into a new engine of the saved kind.
+#  Returns the engine.
+# memo - Restore the memo tables if the checkpoint has them
+def restore ( path, engine=None, memo=True ):
+  with open(os.path.join(path, 'meta.json')) as f:
+    meta = json.load(f)
+  name = meta['engine']
+  rule = meta.get('rule', 'B3/S23')
+  boundary = meta.get('boundary', 'dead')
+  if engine is None:
+    engine = make_engine(name, meta.get('pow2', 8), rule=rule, boundary=boundary)
+  elif engine_name(engine) != name:
+    raise ValueError('Checkpoint is for a %s engine, not %s' % (name, engine_name(engine)))
+  elif getattr(engine, 'boundary', 'dead') != boundary:
+    raise ValueError('Checkpoint is for a %s boundary, not %s' % (boundary, engine.boundary))
+  else:
+    engine.set_rule(rule)
+
+  def array ( name ):
+    return np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+
+  if name in ('dense', 'parallel', 'hashgrid'):
+    board = array('board')
+    if board.shape != engine.life.shape:
+      raise ValueError('Checkpoint board is %dx%d' % board.shape)
+    engine.life[:, :] = board
+    if name == 'hashgrid':
+      engine.tlife[:, :] = board
+      if memo and meta['memo']:
+        restore_grid_memo(engine, meta, path, array)
+  elif name == 'packed':
+    words = array('words')
+    if words.shape != engine.words.shape:
+      raise ValueError('Checkpoint board does not match')
+    engine.words[:, :] = words
+  elif name == 'sparse':
+    engine.keys = np.array(array('keys'))
+  else:
+    restore_tree(engine, meta, array, memo and meta['memo'])
+  engine.generation = meta['generation']
+  return engine
+
+# The saved window keys replace the engine's, so every pattern memoised under
+#  the old ones, for any rule, is forgotten first
+def restore_grid_memo ( grid, meta, path, array ):
+  grid.keys.ids.clear()
+  grid.keys.memo = {}
+  grid.memos = {}
+  grid.set_rule(grid.rule)
+  quads = array('idKeys').tolist()
+  for q, i in zip(quads, array('ids').tolist()):
+    grid.keys.ids.put(tuple(q), i)
+  grid.keys.nextId = meta['nextId']
+
+  # Patterns stay memory-mapped; each cache value is a view of its file
+  entries = []
+  for name in sorted(os.listdir(path)):
+    if name.startswith('patternOrder'):
+      s = name[len('patternOrder'):-len('.npy')]
+      patterns = array('patterns' + s)
+      entries.extend(zip(array('patternOrder' + s).tolist(), array('patternKeys' + s).tolist(), patterns))
+  entries.sort(key=lambda e: e[0])
+  for _, key, pattern in entries:
+    grid.lifePatterns.put(key, pattern)
+
+def restore_tree ( universe, meta, array, memo ):
+  universe.reset_nodes()
+
+  nodes = [universe.off, universe.on]
+  for nw, ne, sw, se in array('children').tolist():
+    nodes.append(universe.join(nodes[nw], nodes[ne], nodes[sw], nodes[se]))
+
+  if memo:
+    for node, result in zip(nodes[2:], array('results').tolist()):
+      if result >= 0:
+        node.result = nodes[result]
+    for node, j, result in array('steps').tolist():
+      universe.steps[(nodes[node], j)] = nodes[result]
+
+  universe.root = nodes[meta['root']]
+  universe.originX = meta['originX']
+  universe.originY = meta['originY']
+
+#### Periodic Checkpoints ####
+
+# Checkpoints a Simulation every `every` generations.  The state is captured
+#  between steps and written by a background thread; if the previous
+#  checkpoint is still being written when the next is due, that one is
+#  skipped rather than holding up the simulation.
+class Checkpointer():
+
+  def __init__ ( self, sim, path, every, memo=True ):
+    self.sim = sim
+    self.path = path
+    self.every = every
+    self.memo = memo
+    self.due = sim.generation + every
+
+    # Checkpoints written and skipped
+    self.written = 0
+    self.skipped = 0
+
+    self.pending = queue.Queue()
+    # Clear while a checkpoint is being captured or written
+    self.idle = threading.Event()
+    self.idle.set()
+    self.thread = threading.Thread(target=self.loop, name='life-checkpoint', daemon=True)
+    self.thread.start()
+    sim.subscribe(self.check)
+
+  def check ( self, sim ):
+    if sim.generation < self.due:
+      return
+    self.due = sim.generation + self.every
+    if not self.idle.is_set():
+      self.skipped += 1
+      return
+    self.idle.clear()
+    self.pending.put(capture(sim.engine, self.memo))
+
+  def loop ( self ):
+    while True:
+      captured = self.pending.get()
+      if captured is None:
+        return
+      write(self.path, captured)
+      self.written += 1
+      self.idle.set()
+
+  # Wait for any queued checkpoint to be written, then stop the thread
+  def close ( self ):
+    self.sim.unsubscribe(self.check)
+    self.pending.put(None)
+    self.thread.join()
@@ -0,0 +1,267 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from life import checkpoint, formats, rules
+from life.patterns import PATTERNS
+from life.sim import ENGINES, Simulation, engine_name, make_engine
+from life.vector import BOUNDARIES
+
+
+#### Command Line ####
+#
+#  python -m life run --engine hashlife --pattern glider_gun --generations 1e6 --out final.rle
+#
+# Runs a simulation without a display, then prints a summary and optionally
+# writes the final live cells.  --view opens the Tk viewer on the result.
+# Patterns and outputs may be RLE, plaintext (.cells) or Macrocell (.mc) files.
+# --checkpoint saves the engine, memo included, at the end of the run and
+# every --checkpoint-every generations; --resume carries on from one.
+# --rule runs another Life-like rule, e.g. B36/S23 (HighLife); pattern files
+# bring their own rule otherwise.  --boundary torus or reflect wraps or
+# mirrors the edges of the dense, packed and parallel boards.
+# --cycles stop ends the run once the board repeats, --cycles skip jumps
+# the remaining whole periods.  --profile prints where the run's time went,
+# phase by phase, and shows the same in the viewer.  --export writes a frame
+# every --export-every generations to an animated .gif, a .npy stack or a
+# directory of PNGs, downsampled to --export-size pixels.
+#
+#  python -m life soups --count 1000 --generations 2000 --seed 1 --out census.npz
+#
+# Runs a batch of random soups in lockstep and reports how fast and when
+# they stabilise.
+#
+#  python -m life serve --engine hashlife --socket /tmp/life.sock
+#
+# Serves one engine to local tools through life.server.Client, on a Unix
+# socket or, without --socket, a localhost port.
+
+# Boxes per side of the viewer's viewport
+VIEW_BOXES = 192
+
+def parser ():
+  p = argparse.ArgumentParser(prog='python -m life', description="Conway's Game of Life")
+  commands = p.add_subparsers(dest='command', required=True)
+
+  run = commands.add_parser('run', help='Advance a pattern headlessly')
+  run.add_argument('--engine', choices=ENGINES, default='hashlife')
+  run.add_argument('--pattern', default='glider_gun', help='One of %s, random, or a pattern file' % ', '.join(sorted(PATTERNS)))
+  run.add_argument('--rule', default=None, help='Rule in B/S notation, e.g. B36/S23, or a name: %s. '
+                   'Defaults to the pattern file\'s rule, else B3/S23' % ', '.join(sorted(rules.NAMED)))
+  run.add_argument('--generations', type=float, default=1000, help='Generations to advance, e.g. 1e6')
+  run.add_argument('--pow2', type=int, default=8, help='Bounded engines are 2^pow2 cells per side')
+  run.add_argument('--boundary', choices=BOUNDARIES, default='dead',
+                   help='Edges of the dense, packed and parallel boards: a dead border, wrapped or mirrored')
+  run.add_argument('--workers', type=int, default=None, help='Worker processes for the parallel engine')
+  run.add_argument('--seed', type=int, default=None, help='Seed for --pattern random')
+  run.add_argument('--out', default=None, help='Write the final live cells to this .rle, .cells or .mc file')
+  run.add_argument('--view', action='store_true', help='Open the Tk viewer on the final state')
+  run.add_argument('--checkpoint', default=None, help='Checkpoint directory to write')
+  run.add_argument('--checkpoint-every', type=float, default=None, help='Generations between background checkpoints')
+  run.add_argument('--cycles', choices=('report', 'stop', 'skip'), default=None,
+                   help='Watch for the board repeating and report, stop or fast-forward')
+  run.add_argument('--profile', action='store_true', help='Print the time spent in each phase of the engine')
+  run.add_argument('--export', default=None, help='Write frames to this .gif or .npy file, or directory of PNGs')
+  run.add_argument('--export-every', type=float, default=1, help='Generations between exported frames')
+  run.add_argument('--export-size', type=int, default=512, help='Longest side of the exported frames, in pixels')
+  run.add_argument('--resume', default=None, help='Checkpoint directory to continue from, instead of --engine and --pattern')
+
+  soups = commands.add_parser('soups', help='Run a batch of random soups until they stabilise')
+  soups.add_argument('--count', type=int, default=1000, help='Number of soups')
+  soups.add_argument('--pow2', type=int, default=6, help='Each board is 2^pow2 cells per side')
+  soups.add_argument('--soup', type=int, default=16, help='Side of the random square seeded on each board')
+  soups.add_argument('--density', type=float, default=0.5)
+  soups.add_argument('--rule', default=None, help='Rule in B/S notation or by name, B3/S23 by default')
+  soups.add_argument('--boundary', choices=BOUNDARIES, default='dead')
+  soups.add_argument('--generations', type=float, default=2000, help='Longest run per soup')
+  soups.add_argument('--window', type=int, default=64, help='Longest period detected')
+  soups.add_argument('--seed', type=int, default=None)
+  soups.add_argument('--out', default=None, help='Save population curves, settle times and periods to this .npz file')
+
+  serve = commands.add_parser('serve', help='Share one engine with local clients')
+  serve.add_argument('--engine', choices=ENGINES, default='hashlife')
+  serve.add_argument('--pow2', type=int, default=8, help='Bounded engines are 2^pow2 cells per side')
+  serve.add_argument('--rule', default=None, help='Rule in B/S notation or by name, B3/S23 by default')
+  serve.add_argument('--boundary', choices=BOUNDARIES, default='dead')
+  serve.add_argument('--workers', type=int, default=None, help='Worker processes for the parallel engine')
+  serve.add_argument('--socket', default=None, help='Unix socket to listen on')
+  serve.add_argument('--port', type=int, default=0, help='Localhost port to listen on without --socket, 0 for any free one')
+  return p
+
+# Pattern array for a name, 'random' filling half the board
+# margin - Width of the board's dead border
+def load_pattern ( name, pow2, seed=None, margin=1 ):
+  if name == 'random':
+    side = 2**pow2 - 2*margin
+    return np.random.default_rng(seed).random((side, side)) < 0.5
+  if name not in PATTERNS:
+    raise SystemExit('Unknown pattern %r, expected one of %s or random' % (name, ', '.join(sorted(PATTERNS))))
+  return PATTERNS[name]
+
+# Load a pattern file, just inside any border of a bounded board
+#  (Macrocell files are centred on it)
+def load_file ( path, engine, size ):
+  bounded = hasattr(engine, 'gridSize')
+  if formats.file_format(path) == 'macrocell':
+    x = y = size//2 if bounded else 0
+  else:
+    x = y = engine.margin if bounded else 0
+  try:
+    formats.load(path, engine, x, y)
+  except ValueError as e:
+    raise SystemExit('%s: %s' % (path, e))
+
+def run ( args ):
+  if args.resume:
+    engine = checkpoint.restore(args.resume)
+    args.engine = engine_name(engine)
+    args.pow2 = getattr(engine, 'gridSize', 2**args.pow2).bit_length()-1
+  else:
+    try:
+      engine = make_engine(args.engine, args.pow2, args.workers, boundary=args.boundary)
+    except ValueError as e:
+      raise SystemExit(str(e))
+  sim = Simulation(engine)
+  saver = None
+  exporter = None
+  try:
+    size = 2**args.pow2
+    if args.resume:
+      pass
+    elif os.path.exists(args.pattern):
+      load_file(args.pattern, engine, size)
+    else:
+      margin = getattr(engine, 'margin', 1)
+      pat = load_pattern(args.pattern, args.pow2, args.seed, margin)
+      # Centre the pattern on the board, inside any dead border
+      x = max(margin, (size - pat.shape[0])//2)
+      y = max(margin, (size - pat.shape[1])//2)
+      if not engine.place_pattern(pat, x, y):
+        raise SystemExit('Pattern %s does not fit a 2^%d board' % (args.pattern, args.pow2))
+    if args.rule:
+      try:
+        engine.set_rule(args.rule)
+      except ValueError as e:
+        raise SystemExit(str(e))
+
+    chunk = None
+    if args.checkpoint and args.checkpoint_every:
+      chunk = int(args.checkpoint_every)
+      saver = checkpoint.Checkpointer(sim, args.checkpoint, chunk)
+
+    if args.export:
+      from life.export import Exporter
+      every = max(1, int(args.export_every))
+      # Headless, every frame is worth waiting for
+      exporter = Exporter(sim, args.export, every, args.export_size, wait=True)
+      chunk = every if chunk is None else min(chunk, every)
+
+    watch = None
+    if args.cycles:
+      from life.cycles import CycleWatch
+      watch = CycleWatch(sim, action=None if args.cycles == 'report' else args.cycles)
+
+    profiler = None
+    if args.profile:
+      from life.profile import Profiler
+      profiler = Profiler()
+      profiler.attach_engine(engine)
+
+    # A resumed checkpoint or a Macrocell #G line may start past generation 0
+    start = sim.generation
+    ttime = time.time()
+    sim.run(args.generations, chunk)
+    elapsed = time.time() - ttime
+    print('%s %s: %d generations in %.3f s, population %d' % (args.engine, engine.rule, sim.generation - start, elapsed, engine.population))
+    if profiler is not None:
+      profiler.detach()
+      print_profile(profiler)
+    if watch is not None and watch.period is not None:
+      print('Repeats every %d generations from generation %d, now at phase %d'
+            % (watch.period, watch.detector.start, watch.detector.phase(sim.generation)))
+
+    if exporter is not None:
+      exporter.close()
+      print('Exported %d frames to %s' % (exporter.written, args.export))
+      exporter = None
+
+    if args.checkpoint:
+      if saver is not None:
+        saver.close()
+        saver = None
+      checkpoint.save(args.checkpoint, engine)
+      print('Checkpointed %s' % args.checkpoint)
+
+    if args.out:
+      formats.save(args.out, engine)
+      print('Wrote %s' % args.out)
+
+    if args.view:
+      from life.viewer import Viewer
+      # The viewport zooms out over boards wider than VIEW_BOXES cells
+      boxes = min(size, VIEW_BOXES)
+      Viewer(sim, 800, 800, max(1, 768 // boxes), size, title="Conway's Life - %s" % args.pattern,
+             profile=args.profile, viewSize=boxes).mainloop()
+  finally:
+    if saver is not None:
+      saver.close()
+    if exporter is not None:
+      exporter.close()
+    sim.close()
+
+def print_profile ( profiler ):
+  report = profiler.report()
+  counters = report.pop('counters')
+  for phase, share in profiler.breakdown():
+    print('  %-10s %8.3f s %5.1f%% %10d calls' % (phase, report[phase]['seconds'], 100*share, report[phase]['calls']))
+  for name, value in sorted(counters.items()):
+    print('  %-14s %d' % (name, value))
+
+def soups ( args ):
+  from life.batch import SoupBatch
+  try:
+    batch = SoupBatch(args.count, 2**args.pow2, args.soup, args.density, args.seed, args.rule, args.boundary)
+  except ValueError as e:
+    raise SystemExit(str(e))
+  ttime = time.time()
+  result = batch.run(args.generations, args.window)
+  elapsed = time.time() - ttime
+
+  settled = result['settled']
+  done = settled >= 0
+  print('%d soups in %.3f s, %.1f soups/s' % (args.count, elapsed, args.count/elapsed))
+  print('%d stabilised' % done.sum(), end='')
+  if done.any():
+    print(', median at generation %d' % np.median(settled[done]), end='')
+    periods = np.bincount(result['periods'][done])
+    print(', periods ' + ', '.join('%d: %d' % (p, n) for p, n in enumerate(periods) if n), end='')
+  print()
+
+  if args.out:
+    np.savez_compressed(args.out, **result)
+    print('Wrote %s' % args.out)
+
+def serve ( args ):
+  from life import server
+  try:
+    engine = make_engine(args.engine, args.pow2, args.workers, rule=args.rule, boundary=args.boundary)
+  except ValueError as e:
+    raise SystemExit(str(e))
+  sim = Simulation(engine)
+  def ready ( address ):
+    print('Serving %s on %s' % (args.engine, address if isinstance(address, str) else '%s:%d' % address), flush=True)
+  try:
+    server.serve(sim, args.socket, port=args.port, ready=ready)
+  finally:
+    sim.close()
+
+def main ( argv=None ):
+  args = parser().parse_args(argv)
+  if args.command == 'run':
+    run(args)
+  elif args.command == 'soups':
+    soups(args)
+  elif args.command == 'serve':
+    serve(args)
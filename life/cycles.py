@@ -0,0 +1,112 @@
+import hashlib
+from collections import deque
+
+
+#### Cycle Detection ####
+#
+# A board that has settled into still lifes and oscillators repeats itself.
+# Each generation is reduced to a key that is equal for equal boards, and a
+# CycleDetector remembers the keys of the last `window` generations; the
+# first key seen twice gives the period.
+#
+# Keys never compare equal for different boards but may occasionally differ
+# for equal ones, which only delays detection:
+#
+#  hashgrid - The key update_grid already computed for the whole board
+#  hashlife - The root node and its position; nodes are interned, so equal
+#             roots at the same origin are equal universes
+#  others - A 128-bit digest of the stored cells
+#
+# Moving patterns such as gliders are not periodic on an unbounded board, as
+# their position is part of the key.
+
+# Return (generation, key) identifying the state of an engine's board
+def state_key ( engine ):
+  name = type(engine).__name__
+  if name == 'Universe':
+    return engine.generation, (engine.root, engine.originX, engine.originY)
+  if name == 'HashGrid':
+    # The key of the board the last step started from
+    key = engine.keys.memo.get((0, 0, engine.pow2))
+    if key is not None:
+      return engine.generation-1, key
+  if name == 'BitBoard':
+    data = engine.words
+  elif name == 'SparseLife':
+    data = engine.keys
+  else:
+    data = engine.life
+  return engine.generation, hashlib.blake2b(data.tobytes(), digest_size=16).digest()
+
+class CycleDetector():
+
+  # window - Generations remembered, the longest period that can be found
+  def __init__ ( self, window=64 ):
+    self.window = window
+    self.seen = {}
+    self.history = deque()
+
+    # Once found: generations per cycle, and the generation the repeated
+    #  state was first seen
+    self.period = None
+    self.start = None
+
+  # Record the key of a generation, returning the period once the board repeats
+  def observe ( self, generation, key ):
+    if self.period is not None:
+      return self.period
+    first = self.seen.get(key)
+    if first is not None and generation > first:
+      self.period = generation - first
+      self.start = first
+      return self.period
+
+    self.seen[key] = generation
+    self.history.append((generation, key))
+    while len(self.history) > self.window:
+      old, oldKey = self.history.popleft()
+      if self.seen.get(oldKey) == old:
+        del self.seen[oldKey]
+    return None
+
+  # Position of a generation within the cycle, 0 for the phase first repeated
+  def phase ( self, generation ):
+    return (generation - self.start) % self.period
+
+  def reset ( self ):
+    self.seen.clear()
+    self.history.clear()
+    self.period = None
+    self.start = None
+
+# Watches a Simulation for cycles, seeing every generation however run() or
+#  step() is called (see Simulation.subscribe).  Once one is found:
+#  action None - Only record it in self.detector
+#  action 'stop' - Stop the simulation's run()
+#  action 'skip' - Fast-forward the run by whole periods
+class CycleWatch():
+
+  def __init__ ( self, sim, window=64, action=None ):
+    self.sim = sim
+    self.action = action
+    self.detector = CycleDetector(window)
+    # Short periods are only found by seeing every generation
+    sim.subscribe(self.check, everyGeneration=True)
+
+  @property
+  def period ( self ):
+    return self.detector.period
+
+  def check ( self, sim ):
+    if self.detector.period is not None:
+      return
+    period = self.detector.observe(*state_key(sim.engine))
+    if period is None:
+      return
+    if self.action == 'stop':
+      sim.stop()
+    elif self.action == 'skip':
+      sim.fast_forward(period)
+
+  def close ( self ):
+    self.sim.unsubscribe(self.check)
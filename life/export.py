@@ -0,0 +1,274 @@
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+from life.render import PALETTE, pixels, png, shades
+
+
+#### Frame Export ####
+#
+# Streams a Simulation to disk as pictures, without a display.  Every `every`
+# generations the board is read at the resolution of the output rather than
+# cell by cell: the engine's density() gives the live fraction of each block
+# of 2^level cells, the level chosen so the region fits in size x size pixels,
+# so a frame of a huge board or a HashLife universe costs no more than one of
+# a small board.  Regions smaller than the output are scaled up by a whole
+# number of pixels per cell.  Frames are shaded as in the viewer (see
+# life.render) and encoded on a background thread; if it falls queueSize
+# frames behind, new frames are skipped rather than holding up the simulation.
+#
+# The format follows the path:
+#
+#  .gif - One animated GIF in the viewer's shades
+#  .npy - A (frames, height, width) uint8 stack of live fractions scaled to
+#         0-255, one per block and rows along y.  The header is kept up to
+#         date as frames are written, so the file can be opened with
+#         np.load(path, mmap_mode='r') while the export runs.
+#  anything else - A directory of PNGs, frame000000.png on
+#
+# Bounded boards are exported whole.  For the unbounded engines the region
+# defaults to a square twice the size of the pattern's bounding box when the
+# exporter starts, centred on it, leaving room for the pattern to grow.
+
+# Format of an export path
+def export_format ( path ):
+  return {'.gif': 'gif', '.npy': 'npy'}.get(os.path.splitext(path)[1].lower(), 'png')
+
+# (x, y, w, h) of the cells to export by default
+def default_region ( engine ):
+  if hasattr(engine, 'gridSize'):
+    return (0, 0, engine.gridSize, engine.gridSize)
+  box = engine.bounding_box()
+  if box is None:
+    return (-32, -32, 64, 64)
+  xmin, ymin, xmax, ymax = box
+  side = 2*max(xmax-xmin, ymax-ymin, 32)
+  return ((xmin+xmax-side)//2, (ymin+ymax-side)//2, side, side)
+
+# (level, x, y, w, h, scale) of the frames for a region: the blocks of 2^level
+#  cells read, as for density(), and the pixels per block
+def frame_layout ( region, size ):
+  x, y, w, h = region
+  level = 0
+  while -(-max(w, h) >> level) > size:
+    level += 1
+  s = 2**level
+  bx, by = x // s, y // s
+  bw, bh = -(-(x+w) // s) - bx, -(-(y+h) // s) - by
+  scale = max(1, size // max(bw, bh)) if level == 0 else 1
+  return level, bx, by, bw, bh, scale
+
+# GIF LZW compression of palette indices, with codes starting bits+1 bits
+#  wide, as the bytes of the image data
+def lzw ( indices, bits ):
+  clear = 1 << bits
+  end = clear + 1
+  out = bytearray()
+  # Codes are packed least significant bit first, starting with a clear
+  acc, used = clear, bits+1
+  width = bits+1
+  table = {}
+  nextCode = end+1
+  indices = iter(indices)
+  prefix = next(indices)
+  for k in indices:
+    key = prefix << 8 | k
+    code = table.get(key)
+    if code is not None:
+      prefix = code
+      continue
+    acc |= prefix << used
+    used += width
+    if nextCode < 4096:
+      table[key] = nextCode
+      nextCode += 1
+      if nextCode > 1 << width:
+        width += 1
+    else:
+      # The table is full: start a new one
+      acc |= clear << used
+      used += width
+      table = {}
+      nextCode = end+1
+      width = bits+1
+    while used >= 8:
+      out.append(acc & 255)
+      acc >>= 8
+      used -= 8
+    prefix = k
+  acc |= prefix << used
+  used += width
+  acc |= end << used
+  used += width
+  while used > 0:
+    out.append(acc & 255)
+    acc >>= 8
+    used -= 8
+  return bytes(out)
+
+#### Writers ####
+#
+# write(states, scale) adds a frame from an array of bools or live fractions
+# indexed [x, y]; close() finishes the output.
+
+class PngWriter():
+
+  def __init__ ( self, path ):
+    os.makedirs(path, exist_ok=True)
+    self.path = path
+    self.count = 0
+
+  def write ( self, states, scale ):
+    with open(os.path.join(self.path, 'frame%06d.png' % self.count), 'wb') as f:
+      f.write(png(pixels(states, scale)))
+    self.count += 1
+
+  def close ( self ):
+    pass
+
+class GifWriter():
+
+  # Bits per palette index, enough for the shades
+  BITS = max(2, (len(PALETTE)-1).bit_length())
+
+  # delay - Seconds each frame is shown
+  def __init__ ( self, path, delay ):
+    self.file = open(path, 'wb')
+    self.delay = delay
+    self.count = 0
+
+  def write ( self, states, scale ):
+    index = shades(states).T
+    if scale > 1:
+      index = index.repeat(scale, axis=0).repeat(scale, axis=1)
+    h, w = index.shape
+    f = self.file
+    bits = self.BITS
+    if self.count == 0:
+      colours = np.zeros((2**bits, 3), dtype=np.uint8)
+      colours[:len(PALETTE)] = PALETTE
+      # Screen descriptor with a global colour table, and loop forever
+      f.write(b'GIF89a' + struct.pack('<HHBBB', w, h, 0xf0 | (bits-1), 0, 0) + colours.tobytes())
+      f.write(b'!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')
+    f.write(b'!\xf9\x04\x00' + struct.pack('<H', int(round(self.delay*100))) + b'\x00\x00')
+    f.write(b',' + struct.pack('<HHHHB', 0, 0, w, h, 0))
+    data = lzw(index.ravel().tolist(), bits)
+    f.write(bytes([bits]) + b''.join(bytes([len(data[i:i+255])]) + data[i:i+255] for i in range(0, len(data), 255)) + b'\x00')
+    self.count += 1
+
+  def close ( self ):
+    if self.count:
+      self.file.write(b';')
+    self.file.close()
+
+class NpyWriter():
+
+  # Bytes reserved for the header, so it can be rewritten as the count grows
+  HEADER = 128
+
+  def __init__ ( self, path ):
+    self.file = open(path, 'wb')
+    self.shape = None
+    self.count = 0
+
+  # Frames are not scaled up: each value is one block
+  def write ( self, states, scale ):
+    frame = np.rint(np.asarray(states, dtype=np.float32).T * 255).astype(np.uint8)
+    f = self.file
+    if self.shape is None:
+      self.shape = frame.shape
+      f.write(self.header())
+    f.write(frame.tobytes())
+    self.count += 1
+    f.seek(0)
+    f.write(self.header())
+    f.seek(0, os.SEEK_END)
+
+  def header ( self ):
+    text = "{'descr': '|u1', 'fortran_order': False, 'shape': (%d, %d, %d), }" % ((self.count,) + self.shape)
+    text = text.ljust(self.HEADER - 11) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(text)) + text.encode('latin1')
+
+  def close ( self ):
+    self.file.close()
+
+#### Exporter ####
+
+class Exporter():
+
+  # sim - life.sim.Simulation to export
+  # path - .gif or .npy file, or a directory for PNGs
+  # every - Generations between frames
+  # size - Longest side of the frames, in pixels
+  # region - (x, y, w, h) of the cells to export, by default as above
+  # delay - Seconds each GIF frame is shown
+  # queueSize - Frames waiting to be written before new ones are skipped
+  # wait - Wait for room in the queue instead of skipping, for headless runs
+  #  that want every frame
+  def __init__ ( self, sim, path, every=1, size=512, region=None, delay=0.05, queueSize=32, wait=False ):
+    self.sim = sim
+    self.engine = sim.engine
+    self.path = path
+    self.every = every
+    self.wait = wait
+    self.format = export_format(path)
+    with sim.lock:
+      self.region = region or default_region(self.engine)
+    self.level, self.x, self.y, self.w, self.h, self.scale = frame_layout(self.region, size)
+    if self.format == 'gif':
+      self.writer = GifWriter(path, delay)
+    elif self.format == 'npy':
+      self.writer = NpyWriter(path)
+    else:
+      self.writer = PngWriter(path)
+
+    # Generation of each frame captured, and frames written and skipped
+    self.generations = []
+    self.written = 0
+    self.skipped = 0
+
+    self.pending = queue.Queue(queueSize)
+    self.thread = threading.Thread(target=self.loop, name='life-export', daemon=True)
+    self.thread.start()
+    with sim.lock:
+      self.capture()
+      self.due = sim.generation + every
+    sim.subscribe(self.check)
+
+  # Called by the simulation after each step
+  def check ( self, sim ):
+    if sim.generation < self.due:
+      return
+    self.due = sim.generation + self.every
+    self.capture()
+
+  # Read the board at the frame's resolution and queue it for writing
+  def capture ( self ):
+    if self.pending.full() and not self.wait:
+      self.skipped += 1
+      return
+    engine = self.engine
+    if self.level == 0:
+      states = engine.window(self.x, self.y, self.w, self.h)
+    else:
+      states = engine.density(self.x, self.y, self.w, self.h, self.level)
+    self.generations.append(engine.generation)
+    self.pending.put(states)
+
+  def loop ( self ):
+    while True:
+      states = self.pending.get()
+      if states is None:
+        self.writer.close()
+        return
+      self.writer.write(states, self.scale)
+      self.written += 1
+
+  # Write the frames still queued, then stop the thread
+  def close ( self ):
+    self.sim.unsubscribe(self.check)
+    self.pending.put(None)
+    self.thread.join()
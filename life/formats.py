@@ -0,0 +1,372 @@
+import contextlib
+import re
+
+import numpy as np
+
+from life import rules
+
+
+#### Pattern Files ####
+#
+# Readers and writers for the usual Life pattern formats.  Readers stream the
+# file line by line and hand the live cells to an engine's add_cells() in
+# chunks of at most CHUNK cells, so a large pattern is never held as a dense
+# array.  Writers work from the engine's live cells, or for Macrocell from the
+# quadtree itself.
+#
+#  RLE (.rle) - Run Length Encoded, as used by Golly and LifeWiki.  Rows of
+#               the file run along y, characters within a row along x; 'o'
+#               is a live cell, 'b' a dead one, '$' ends a row and '!' ends
+#               the pattern.
+#  Plaintext (.cells) - One line per row, '.' dead and 'O' alive, '!' comments.
+#  Macrocell (.mc) - Golly's quadtree format.  Each line after the header is
+#               a node: either an 8x8 leaf drawn with '.', '*' and '$', or
+#               'k nw ne sw se' giving a level k node's children as the line
+#               numbers of earlier nodes, 0 for an empty child.  The root is
+#               the last line and is centred on the load position.
+#
+# The rule in an RLE header or a Macrocell #R line is applied to the engine
+# the pattern is loaded into, unless the reader is given setRule=False, and
+# saving writes the engine's rule.
+
+LINE_LENGTH = 70
+CHUNK = 2**16
+
+# Yield an open file for a path, or the file itself if already open
+@contextlib.contextmanager
+def opened ( src, mode='r' ):
+  if isinstance(src, str):
+    with open(src, mode) as f:
+      yield f
+  else:
+    yield src
+
+# Format of a path from its extension: 'rle', 'plaintext' or 'macrocell'
+def file_format ( path ):
+  path = path.lower()
+  if path.endswith('.mc'):
+    return 'macrocell'
+  if path.endswith('.cells') or path.endswith('.txt'):
+    return 'plaintext'
+  return 'rle'
+
+# Load a pattern file into an engine, upper left corner at x, y (Macrocell: root centred at x, y)
+def load ( src, engine, x=0, y=0 ):
+  fmt = file_format(src if isinstance(src, str) else getattr(src, 'name', ''))
+  if fmt == 'macrocell':
+    return read_macrocell(src, engine, x, y)
+  if fmt == 'plaintext':
+    return read_plaintext(src, engine, x, y)
+  return read_rle(src, engine, x, y)
+
+# Save the live cells of an engine in the format given by the file extension
+def save ( out, engine ):
+  fmt = file_format(out if isinstance(out, str) else getattr(out, 'name', ''))
+  if fmt == 'macrocell':
+    return write_macrocell(out, engine)
+  if fmt == 'plaintext':
+    return write_plaintext(out, engine.cells())
+  return write_rle(out, engine.cells(), engine_rule(engine))
+
+# Rule of an engine in B/S notation
+def engine_rule ( engine ):
+  return str(getattr(engine, 'rule', rules.CONWAY))
+
+# Switch an engine to the rule named in a file.  Golly's bounded-grid suffix
+#  (':T100,100') is ignored, the board's own size applies.
+def apply_rule ( engine, rule ):
+  if hasattr(engine, 'set_rule'):
+    engine.set_rule(rule.split(':')[0])
+
+# Add a chunk of cells offset by x, y to an engine
+def place ( engine, cells, x, y ):
+  if len(cells) and not engine.add_cells(cells + (x, y)):
+    raise ValueError('Pattern does not fit the board')
+
+# Runs of consecutive live cells, as (y, x, length) arrays sorted by row then column
+def runs ( cells ):
+  cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+  order = np.lexsort((cells[:, 0], cells[:, 1]))
+  xs = cells[order, 0]
+  ys = cells[order, 1]
+  starts = np.flatnonzero(np.r_[True, (ys[1:] != ys[:-1]) | (xs[1:] != xs[:-1]+1)])
+  lengths = np.diff(np.r_[starts, len(xs)])
+  return ys[starts], xs[starts], lengths
+
+# The cells ((n, 2) array of x, y) covered by runs, the inverse of runs()
+def expand_runs ( ys, xs, lengths ):
+  ys = np.asarray(ys, dtype=np.int64)
+  xs = np.asarray(xs, dtype=np.int64)
+  lengths = np.asarray(lengths, dtype=np.int64)
+  offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths)-lengths, lengths)
+  return np.stack((np.repeat(xs, lengths)+offsets, np.repeat(ys, lengths)), axis=1)
+
+
+#### RLE ####
+
+HEADER = re.compile(r'x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*([^\s,]+))?', re.I)
+TOKEN = re.compile(r'(\d*)([^\d\s])')
+
+# Yield the live cells of an RLE file as (n, 2) arrays of at most about chunk cells.
+#  The first item yielded is the header as a dict of width, height and rule.
+def rle_chunks ( lines, chunk=CHUNK ):
+  header = {'width': 0, 'height': 0, 'rule': 'B3/S23'}
+  lines = iter(lines)
+  for line in lines:
+    line = line.strip()
+    if not line or line.startswith('#'):
+      continue
+    m = HEADER.match(line)
+    if m is None:
+      raise ValueError('Missing RLE header line')
+    header = {'width': int(m.group(1)), 'height': int(m.group(2)), 'rule': m.group(3) or 'B3/S23'}
+    break
+  yield header
+
+  x = y = 0
+  ys, xs, lengths = [], [], []
+  pending = ''
+  for line in lines:
+    line = pending + line.strip()
+    # A count at the end of a line belongs to the first tag on the next
+    body = line.rstrip('0123456789')
+    pending = line[len(body):]
+    for count, tag in TOKEN.findall(body):
+      n = int(count) if count else 1
+      if tag == '$':
+        y += n
+        x = 0
+      elif tag == 'b' or tag == '.':
+        x += n
+      elif tag == '!':
+        if xs:
+          yield expand_runs(ys, xs, lengths)
+        return
+      else:
+        ys.append(y)
+        xs.append(x)
+        lengths.append(n)
+        x += n
+    if len(xs) >= chunk:
+      yield expand_runs(ys, xs, lengths)
+      ys, xs, lengths = [], [], []
+  if xs:
+    yield expand_runs(ys, xs, lengths)
+
+# Read an RLE file into an engine with the pattern's upper left corner at x, y.
+#  Returns the header.
+# setRule - Switch the engine to the header's rule
+def read_rle ( src, engine, x=0, y=0, chunk=CHUNK, setRule=True ):
+  with opened(src) as f:
+    chunks = rle_chunks(f, chunk)
+    header = next(chunks)
+    size = getattr(engine, 'gridSize', None)
+    m = getattr(engine, 'margin', 1)
+    if size is not None and (x < m or y < m or x+header['width'] > size-m or y+header['height'] > size-m):
+      raise ValueError('Pattern does not fit the board')
+    if setRule:
+      apply_rule(engine, header['rule'])
+    for cells in chunks:
+      place(engine, cells, x, y)
+  return header
+
+# Yield the lines of an RLE file for the live cells ((n, 2) array of x, y)
+def rle_lines ( cells, rule='B3/S23' ):
+  ys, xs, lengths = runs(cells)
+  if len(xs) == 0:
+    yield 'x = 0, y = 0, rule = %s' % rule
+    yield '!'
+    return
+
+  xmin = int(xs.min())
+  ymin = int(ys[0])
+  yield 'x = %d, y = %d, rule = %s' % (int((xs+lengths).max())-xmin, int(ys[-1])-ymin+1, rule)
+
+  line = ''
+  row = ymin
+  col = xmin
+  for y, x, n in zip(ys.tolist(), xs.tolist(), lengths.tolist()):
+    tokens = []
+    if y > row:
+      tokens.append(run_token(y-row, '$'))
+      row = y
+      col = xmin
+    if x > col:
+      tokens.append(run_token(x-col, 'b'))
+    tokens.append(run_token(n, 'o'))
+    col = x + n
+    for token in tokens:
+      if len(line) + len(token) > LINE_LENGTH:
+        yield line
+        line = ''
+      line += token
+  if len(line) + 1 > LINE_LENGTH:
+    yield line
+    line = ''
+  yield line + '!'
+
+def run_token ( count, tag ):
+  return tag if count == 1 else '%d%s' % (count, tag)
+
+# Write the live cells ((n, 2) array of x, y) to an RLE file
+# out - Path or writable text file
+def write_rle ( out, cells, rule='B3/S23' ):
+  with opened(out, 'w') as f:
+    for line in rle_lines(cells, rule):
+      f.write(line + '\n')
+
+
+#### Plaintext ####
+
+# Read a plaintext file into an engine with the pattern's upper left corner at x, y.
+#  setRule is taken for the readers' sake; plaintext names no rule.
+def read_plaintext ( src, engine, x=0, y=0, chunk=CHUNK, setRule=True ):
+  ys, xs, lengths = [], [], []
+  size = 0
+  row = 0
+  with opened(src) as f:
+    for line in f:
+      line = line.rstrip('\r\n')
+      if line.startswith('!'):
+        continue
+      alive = np.frombuffer(line.encode(), dtype=np.uint8)
+      alive = (alive != ord('.')) & (alive != ord(' '))
+      cols = np.flatnonzero(alive)
+      ys.extend([row]*len(cols))
+      xs.extend(cols.tolist())
+      size += len(cols)
+      row += 1
+      if size >= chunk:
+        place(engine, expand_runs(ys, xs, np.ones(size, dtype=np.int64)), x, y)
+        ys, xs, size = [], [], 0
+  if size:
+    place(engine, expand_runs(ys, xs, np.ones(size, dtype=np.int64)), x, y)
+
+# Write the live cells ((n, 2) array of x, y) to a plaintext file, trimmed to their bounding box
+def write_plaintext ( out, cells ):
+  ys, xs, lengths = runs(cells)
+  with opened(out, 'w') as f:
+    if len(xs) == 0:
+      return
+    xmin = int(xs.min())
+    row = int(ys[0])
+    line = ''
+    for y, x, n in zip(ys.tolist(), xs.tolist(), lengths.tolist()):
+      if y > row:
+        f.write((line or '.') + '\n' + '.\n'*(y-row-1))
+        line = ''
+        row = y
+      line += '.'*(x-xmin-len(line)) + 'O'*n
+    f.write(line + '\n')
+
+
+#### Macrocell ####
+
+# Read a Macrocell file, centring its root on x, y.  Into a quadtree the nodes
+#  are joined directly; other engines are given the root's live cells.
+#  Returns the root node.
+# setRule - Switch the engine to the #R line's rule
+def read_macrocell ( src, engine, x=0, y=0, setRule=True ):
+  from life.quadtree import Universe
+  universe = engine if hasattr(engine, 'step_pow2') else Universe()
+  nodes = [None]
+  generation = None
+  with opened(src) as f:
+    for line in f:
+      line = line.strip()
+      if not line or line.startswith('['):
+        continue
+      if line.startswith('#'):
+        if line.startswith('#G'):
+          generation = int(line[2:])
+        elif line.startswith('#R') and setRule:
+          apply_rule(engine, line[2:].strip())
+        continue
+      if line[0] in '.*$':
+        nodes.append(universe.build(leaf_array(line)))
+        continue
+      level, nw, ne, sw, se = (int(v) for v in line.split())
+      if level < 4:
+        raise ValueError('Macrocell node of level %d, below the 8x8 leaves' % level)
+      for i in (nw, ne, sw, se):
+        if i < 0 or i >= len(nodes):
+          raise ValueError('Macrocell node refers to node %d, not yet defined' % i)
+        if i and nodes[i].level != level-1:
+          raise ValueError('Macrocell node of level %d has a child of level %d' % (level, nodes[i].level))
+      children = [nodes[i] if i else universe.empty(level-1) for i in (nw, ne, sw, se)]
+      nodes.append(universe.join(*children))
+  root = nodes[-1]
+  if root is None:
+    return None
+  half = 2**(root.level-1)
+
+  if universe is engine and engine.root.pop == 0:
+    engine.root = root
+    engine.originX = x - half
+    engine.originY = y - half
+    if generation is not None:
+      engine.generation = generation
+  else:
+    cells = universe.cells(root)
+    for i in range(0, len(cells), CHUNK):
+      place(engine, cells[i:i+CHUNK], x - half, y - half)
+  return root
+
+# 8x8 array of a leaf line, rows ending in '$' with trailing dead cells left out
+def leaf_array ( line ):
+  arr = np.zeros((8, 8), dtype=bool)
+  for y, row in enumerate(line.split('$')[:8]):
+    for x, c in enumerate(row[:8]):
+      arr[x, y] = c == '*'
+  return arr
+
+# Write a quadtree, or any engine's live cells, as a Macrocell file.  A bounded
+#  board is written as a root covering exactly the board, so it loads back in
+#  place when centred on the middle of the board.
+# rule - Rule for the #R line, the engine's by default
+def write_macrocell ( out, engine, rule=None ):
+  from life.quadtree import Universe
+  rule = rule or engine_rule(engine)
+  universe = engine
+  if not hasattr(engine, 'step_pow2'):
+    universe = Universe()
+    size = getattr(engine, 'gridSize', None)
+    if size is not None:
+      universe.root = universe.empty(max(3, size.bit_length()-1))
+    universe.add_cells(engine.cells())
+  # Leaves are not a root the reader accepts, so the root is grown about its
+  #  centre to at least level 4
+  root = universe.root
+  while root.level < 4:
+    root = universe.expand(root)
+
+  ids = {}
+  with opened(out, 'w') as f:
+    f.write('[M2] (life)\n')
+    f.write('#R %s\n' % rule)
+    f.write('#G %d\n' % engine.generation)
+    if root.pop == 0:
+      f.write('%d 0 0 0 0\n' % root.level)
+    else:
+      write_node(f, universe, root, ids)
+
+# Write node and any unwritten descendants, returning its line number
+def write_node ( f, universe, node, ids ):
+  if node.pop == 0:
+    return 0
+  i = ids.get(node)
+  if i is not None:
+    return i
+  if node.level == 3:
+    f.write(leaf_line(universe, node) + '\n')
+  else:
+    children = [write_node(f, universe, c, ids) for c in (node.nw, node.ne, node.sw, node.se)]
+    f.write('%d %d %d %d %d\n' % ((node.level,) + tuple(children)))
+  ids[node] = len(ids) + 1
+  return ids[node]
+
+def leaf_line ( universe, node ):
+  arr = np.zeros((8, 8), dtype=bool)
+  universe.fill(arr, node, 0, 0)
+  rows = [''.join('*' if arr[x, y] else '.' for x in range(8)).rstrip('.') for y in range(8)]
+  return '$'.join(rows) + '$'
@@ -0,0 +1,147 @@
+import numpy as np
+
+from life import vector
+from life.cache import MemoCache
+from life.keys import KEY_BYTES, WindowKeys
+from life.leaves import LEAF_PATTERNS, leaf_tables, tile_leaves
+
+
+#### Memoised Grid ####
+#
+# The engine behind HashLife.py: a fixed 2^pow2 board with a dead border,
+# advanced one generation at a time by recursively splitting it into
+# overlapping windows whose next interiors are looked up in, or added to, the
+# lifePatterns memo.
+
+class HashGrid(vector.Board):
+
+  # cacheBytes - Budget for the pattern memo, None for no limit
+  # rule - life.rules.Rule or B/S string, Conway's Life by default
+  def __init__ ( self, pow2, cacheBytes=2**28, rule=None ):
+    self.pow2 = pow2
+    self.cacheBytes = cacheBytes
+
+    # Hash maps for precomputed patterns, keyed by the structural window keys in self.keys.
+    #  Least recently used patterns are evicted once cacheBytes is exceeded, and the key
+    #  table is held to a similar number of entries.  Window keys describe only the cells,
+    #  so each rule has its own pattern map; self.lifePatterns is the current rule's.
+    #  The maps share the one budget, see set_rule.  By rule, least recently used first.
+    self.memos = {}
+    self.keys = WindowKeys(maxIds=cacheBytes//KEY_BYTES if cacheBytes else None)
+    vector.Board.__init__(self, 2**pow2, rule)
+
+  #### Game Logic ####
+
+  # Switch to another rule, given as a life.rules.Rule or B/S string.  The
+  #  patterns memoised under the previous rules are kept for switching back,
+  #  but together in at most half of cacheBytes, trimmed least recently used
+  #  rule first, and the current rule's memo has what they leave.
+  def set_rule ( self, rule ):
+    vector.Board.set_rule(self, rule)
+    self.leafTable = leaf_tables(self.rule)[0]
+    self.lifePatterns = self.memos.pop(self.rule, None)
+    if self.lifePatterns is None:
+      self.lifePatterns = MemoCache(maxBytes=self.cacheBytes)
+    if self.cacheBytes:
+      held = sum(memo.bytes for memo in self.memos.values())
+      for r, memo in list(self.memos.items()):
+        if held <= self.cacheBytes // 2:
+          break
+        before = memo.bytes
+        memo.set_max_bytes(max(0, before - (held - self.cacheBytes // 2)))
+        held -= before - memo.bytes
+        if not memo.entries:
+          del self.memos[r]
+      self.lifePatterns.set_max_bytes(self.cacheBytes - held)
+    self.memos[self.rule] = self.lifePatterns
+
+  # Solves a 4x4 grid and determines the new state of the inner 2x2 grid,
+  #  looked up in the rule's life.leaves table by the grid's leaf code
+  def solve_grid ( self, xmin, xmax, ymin, ymax ):
+    return LEAF_PATTERNS[self.leafTable[self.keys.codes[xmin, ymin]]]
+
+  # Return a key identifying the state of the 2^pow2 window with its upper left cell at x, y.
+  #  Equal keys mean equal windows; see life.keys for how they are built.
+  def hash_life ( self, x, y, pow2 ):
+    return self.keys.key(x, y, pow2)
+
+  # Update the life grid recursively
+  def update_grid ( self, startXY, pow2 ):
+    # Size of this layer
+    size = 2**pow2
+
+    # Leaf codes for every window are computed once per generation
+    if size == self.gridSize:
+      self.keys.reset(self.life)
+
+    xmin, xmax = startXY[0]+1, startXY[0]+size-1
+    ymin, ymax = startXY[1]+1, startXY[1]+size-1
+
+    # 4 is the smallest size block which fully determines the next state of an interior box.
+    #  Every 4x4 grid is already solved in the leaf table, so these skip the hash map.
+    if size == 4:
+      self.tlife[xmin:xmax, ymin:ymax] = self.solve_grid(startXY[0], startXY[0]+size, startXY[1], startXY[1]+size)
+      return
+
+    # Hash ID of this layer
+    hid = self.hash_life(startXY[0], startXY[1], pow2)
+
+    # If ID already exists copy the pattern onto the temporary grid
+    pattern = self.lifePatterns.get(hid)
+    if pattern is not None:
+      self.tlife[xmin:xmax, ymin:ymax] = pattern[:,:]
+
+    # An 8x8 interior is the 3x3 leaf results of its overlapping 4x4 grids, tiled
+    elif size == 8:
+      pattern = tile_leaves(self.keys.codes[startXY[0]:startXY[0]+5:2, startXY[1]:startXY[1]+5:2], self.leafTable)
+      self.lifePatterns.put(hid, pattern)
+      self.tlife[xmin:xmax, ymin:ymax] = pattern
+
+    # If the block size is greater than 8, break it into 9 inner boxes,
+    #  each with side_length = size/2 and offset from the previous by fourths = size/4.
+    # Each box is looked up or computed recursively, then the combined interior is saved.
+    else:
+      fourths = size//4
+      for i in range(0, 3*fourths, fourths):
+        for j in range(0, 3*fourths, fourths):
+          self.update_grid((startXY[0]+i, startXY[1]+j), pow2-1)
+      self.lifePatterns.put(hid, self.tlife[xmin:xmax, ymin:ymax].copy())
+
+  # Advance one generation, returning the mask of changed cells: the xor
+  #  between self.life and self.tlife, after which self.life takes the new state.
+  def step ( self ):
+    self.update_grid((0, 0), self.pow2)
+    np.logical_xor(self.life, self.tlife, out=self.changed)
+    self.life[:,:] = self.tlife[:,:]
+    self.generation += 1
+    return self.changed
+
+  #### Cell Access ####
+  #
+  # self.tlife mirrors self.life between generations, so edits go to both.
+
+  def set_cell ( self, x, y, alive ):
+    self.tlife[x, y] = self.life[x, y] = alive
+
+  def place_pattern ( self, pat, x, y ):
+    if not vector.Board.place_pattern(self, pat, x, y):
+      return False
+    self.tlife[x:x+pat.shape[0], y:y+pat.shape[1]] = pat[:,:]
+    return True
+
+  def add_cells ( self, cells ):
+    if not vector.Board.add_cells(self, cells):
+      return False
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    self.tlife[cells[:, 0], cells[:, 1]] = True
+    return True
+
+  def toggle ( self, x, y ):
+    alive = vector.Board.toggle(self, x, y)
+    if alive is not None:
+      self.tlife[x, y] = alive
+    return alive
+
+  def clear ( self ):
+    self.life[:,:] = False
+    self.tlife[:,:] = False
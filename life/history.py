@@ -0,0 +1,232 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from life.sim import engine_name
+
+
+#### Generation History ####
+#
+# Records the last generations of a Simulation so it can be rewound.  Every
+# keyframeEvery generations the whole state is kept; the generations between
+# are kept as the cells their step changed, which each engine already works
+# out, so recording costs little more than the step itself.  Changes are
+# stored as the flat indices of the changed cells, or as a bit mask when
+# that is smaller.  Seeking replays the changes since the keyframe before the
+# generation sought, so it costs at most keyframeEvery steps' changes.
+#
+#  dense, parallel, hashgrid - Keyframes are the cells bit-packed, changes
+#                              the changed-cell mask
+#  packed - Keyframes are a copy of the words, changes the changed words
+#  sparse - Keyframes are the live cell keys, changes the changed keys
+#  hashlife - Every generation is a keyframe: the root node, retained.  Nodes
+#             are immutable and shared, so a snapshot costs next to nothing;
+#             retained roots are pinned so garbage collection keeps them.
+#
+# Steps of several generations at once, and edits, start a new keyframe.
+# Seeking is itself an edit of the board (see Simulation.edit).  Stepping on
+# from a rewound generation records over the generations after it.
+
+class History():
+
+  # sim - life.sim.Simulation to record
+  # depth - Generations kept, counting a HashLife jump as one.  Older
+  #  generations are dropped a keyframe interval at a time, so up to
+  #  keyframeEvery more may be kept.
+  # keyframeEvery - Generations between keyframes
+  def __init__ ( self, sim, depth=1024, keyframeEvery=64 ):
+    self.sim = sim
+    self.engine = sim.engine
+    self.name = engine_name(self.engine)
+    self.depth = depth
+    self.keyframeEvery = keyframeEvery
+
+    # Recorded generations, oldest first, and for each (keyframe, data)
+    self.generations = []
+    self.frames = []
+    # Bytes held by the recorded frames
+    self.bytes = 0
+    # Generation of the latest keyframe, and the edit count when last recorded
+    self.lastKeyframe = None
+    self.edits = sim.edits
+
+    with sim.lock:
+      self.record(keyframe=True)
+    sim.subscribe(self.stepped)
+
+  def close ( self ):
+    self.sim.unsubscribe(self.stepped)
+    self.drop(len(self.frames))
+
+  # Oldest and newest recorded generations
+  @property
+  def first ( self ):
+    return self.generations[0]
+
+  @property
+  def last ( self ):
+    return self.generations[-1]
+
+  def __contains__ ( self, generation ):
+    i = bisect_right(self.generations, generation) - 1
+    return i >= 0 and self.generations[i] == generation
+
+  def stats ( self ):
+    return {'generations': len(self.generations), 'keyframes': sum(1 for key, _ in self.frames if key),
+            'bytes': self.bytes}
+
+
+  #### Recording ####
+
+  # Called by the simulation after each step
+  def stepped ( self, sim ):
+    generation = self.engine.generation
+    # Stepping on from a rewound generation replaces what came after it
+    i = bisect_right(self.generations, generation-1)
+    if i < len(self.generations):
+      self.truncate(i)
+    keyframe = (self.name == 'hashlife' or sim.edits != self.edits or not self.generations or
+                self.generations[-1] != generation-1 or generation - self.lastKeyframe >= self.keyframeEvery)
+    self.record(keyframe)
+
+  def record ( self, keyframe ):
+    engine = self.engine
+    data = self.snapshot() if keyframe else self.change()
+    self.generations.append(engine.generation)
+    self.frames.append((keyframe, data))
+    self.bytes += nbytes(data)
+    if keyframe:
+      self.lastKeyframe = engine.generation
+    self.edits = self.sim.edits
+
+    # Drop the oldest keyframe interval while the rest still covers depth
+    while True:
+      keys = [i for i, (key, _) in enumerate(self.frames[:self.keyframeEvery+1]) if key]
+      if len(keys) < 2 or len(self.frames) - keys[1] < self.depth:
+        break
+      self.drop(keys[1])
+
+  # Forget the oldest n frames
+  def drop ( self, n ):
+    for key, data in self.frames[:n]:
+      self.release(key, data)
+    del self.generations[:n]
+    del self.frames[:n]
+
+  # Forget the frames from index i on
+  def truncate ( self, i ):
+    for key, data in self.frames[i:]:
+      self.release(key, data)
+    del self.generations[i:]
+    del self.frames[i:]
+    self.lastKeyframe = max((g for g, (key, _) in zip(self.generations, self.frames) if key), default=None)
+
+  def release ( self, key, data ):
+    self.bytes -= nbytes(data)
+    if self.name == 'hashlife':
+      self.engine.unpin(data[0])
+
+  # The whole state of the engine
+  def snapshot ( self ):
+    engine = self.engine
+    if self.name in ('dense', 'parallel', 'hashgrid'):
+      return np.packbits(engine.life)
+    if self.name == 'packed':
+      return engine.words.copy()
+    if self.name == 'sparse':
+      # The keys array is replaced, not modified, by each step
+      return engine.keys
+    engine.pin(engine.root)
+    return (engine.root, engine.originX, engine.originY)
+
+  # The cells changed by the last step
+  def change ( self ):
+    changed = self.engine.changed
+    if self.name in ('dense', 'parallel', 'hashgrid'):
+      cells = np.flatnonzero(changed).astype(np.int32)
+      if 4*len(cells) > changed.size//8:
+        return np.packbits(changed)
+      return cells
+    if self.name == 'packed':
+      words = np.flatnonzero(changed)
+      return (words, changed.flat[words])
+    return changed
+
+
+  #### Seeking ####
+
+  # Put the board back to a recorded generation, returning False if it is
+  #  not in the history
+  def seek ( self, generation ):
+    with self.sim.lock:
+      i = bisect_right(self.generations, generation) - 1
+      if i < 0 or self.generations[i] != generation:
+        return False
+      state = self.replay(i)
+      self.sim.edit(self.load, state, generation)
+      self.edits = self.sim.edits
+      return True
+
+  # Step back n generations, or as far as the history goes
+  def back ( self, n=1 ):
+    target = max(self.engine.generation - n, self.first)
+    i = bisect_right(self.generations, target) - 1
+    return self.seek(self.generations[max(i, 0)])
+
+  # State of the engine at frame i, replayed from the keyframe before it
+  def replay ( self, i ):
+    frames = self.frames
+    start = i
+    while not frames[start][0]:
+      start -= 1
+    state = self.unpack(frames[start][1])
+    for k in range(start+1, i+1):
+      state = self.apply(state, frames[k][1])
+    return state
+
+  # A working copy of a keyframe
+  def unpack ( self, data ):
+    if self.name in ('dense', 'parallel', 'hashgrid'):
+      n = self.engine.gridSize
+      return np.unpackbits(data, count=n*n).view(bool).reshape(n, n)
+    if self.name == 'packed':
+      return data.copy()
+    return data
+
+  # Apply the changes of one step
+  def apply ( self, state, change ):
+    if self.name in ('dense', 'parallel', 'hashgrid'):
+      if change.dtype == np.uint8:
+        state ^= np.unpackbits(change, count=state.size).view(bool).reshape(state.shape)
+      else:
+        state.flat[change] ^= True
+    elif self.name == 'packed':
+      words, values = change
+      state.flat[words] ^= values
+    else:
+      state = np.setxor1d(state, change, assume_unique=True)
+    return state
+
+  # Write a replayed state into the engine
+  def load ( self, state, generation ):
+    engine = self.engine
+    if self.name in ('dense', 'parallel', 'hashgrid'):
+      engine.life[:, :] = state
+      if self.name == 'hashgrid':
+        engine.tlife[:, :] = state
+    elif self.name == 'packed':
+      engine.words[:, :] = state
+    elif self.name == 'sparse':
+      engine.keys = state
+    else:
+      engine.root, engine.originX, engine.originY = state
+    engine.generation = generation
+
+# Bytes held by a frame's data
+def nbytes ( data ):
+  if isinstance(data, np.ndarray):
+    return data.nbytes
+  if isinstance(data, tuple) and isinstance(data[0], np.ndarray):
+    return sum(a.nbytes for a in data)
+  # A retained root, whose nodes are shared with the universe
+  return 0
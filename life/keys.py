@@ -0,0 +1,71 @@
+import numpy as np
+
+from life.cache import MemoCache
+
+
+#### Structural Window Keys ####
+#
+# Keys for the square windows HashLife.Life.update_grid visits, without
+# hashing or copying the window contents:
+#
+#  - A 4x4 window is keyed by its 16 cells packed into an int, cell [x+a, y+b]
+#    at bit 4*a+b.  The codes of every 4x4 window on the board are computed in
+#    one vectorised pass per generation.
+#  - A larger window is keyed by the keys of its four quadrants.  Each
+#    distinct tuple of quadrant keys is interned to a small int numbered from
+#    2^16 so it never collides with a leaf code.  Tuples stay distinct however
+#    far the numbering goes.  Quadrants of equal keys have equal size, so the
+#    window size is implied.
+#
+# The intern table is an LRU cache; keys are never reused, so a tuple that
+# is evicted and seen again just gets a fresh key and misses in any cache
+# holding results under the old one.
+
+LEAF_KEYS = 2**16
+
+# Approximate bytes held by one entry of the intern table
+KEY_BYTES = 200
+
+# The 16-bit code of every 4x4 window, indexed by the window's upper left cell
+def leaf_codes ( life ):
+  n = life.shape[0] - 3
+  m = life.shape[1] - 3
+  codes = np.zeros((n, m), dtype=np.int64)
+  for a in range(4):
+    for b in range(4):
+      codes[life[a:a+n, b:b+m]] |= 1 << (4*a+b)
+  return codes
+
+class WindowKeys():
+
+  # maxIds - Maximum number of composite keys remembered, None for no limit
+  def __init__ ( self, maxIds=None ):
+    # Intern table mapping quadrant keys to composite keys
+    self.ids = MemoCache(maxEntries=maxIds)
+    self.nextId = LEAF_KEYS
+    self.codes = None
+    # Keys computed for the current generation, by (x, y, pow2)
+    self.memo = {}
+
+  # Prepare for keying windows of a new generation
+  def reset ( self, life ):
+    self.codes = leaf_codes(life)
+    self.memo = {}
+
+  # Return the key of the 2^pow2 window with its upper left cell at x, y
+  def key ( self, x, y, pow2 ):
+    if pow2 == 2:
+      return int(self.codes[x, y])
+
+    k = self.memo.get((x, y, pow2))
+    if k is None:
+      h = 2**(pow2-1)
+      quads = (self.key(x, y, pow2-1), self.key(x+h, y, pow2-1),
+               self.key(x, y+h, pow2-1), self.key(x+h, y+h, pow2-1))
+      k = self.ids.get(quads)
+      if k is None:
+        k = self.nextId
+        self.nextId += 1
+        self.ids.put(quads, k)
+      self.memo[(x, y, pow2)] = k
+    return k
@@ -0,0 +1,96 @@
+import numpy as np
+
+from life.rules import CONWAY
+
+
+#### Leaf Lookup Table ####
+#
+# The next state of the central 2x2 of a 4x4 block depends only on the block's
+# 16 cells, so all 65536 answers are computed once, vectorised, on first use.
+#
+# Blocks are coded as in life.keys: cell [a, b] of a 4x4 block is bit 4*a+b.
+# A 2x2 result is coded the same way with cell [a, b] at bit 2*a+b, so the
+# 2x2 code of the block's central cells [1+a, 1+b] indexes LEAF_PATTERNS.
+#
+# An 8x8 block advanced two generations to its central 4x4 is composed from
+# the table: nine overlapping 4x4 blocks give the central 6x6 one generation
+# on, and four overlapping 4x4 blocks of that give the central 4x4.
+#
+# Tables are built the first time an engine asks leaf_tables() for a rule,
+# Conway's included, and kept per rule, so importing the engines costs
+# nothing until one is made.
+
+# Codes of 4x4 blocks made of four 2x2 codes, by quadrant: block code =
+#  SPREAD[0][nw] | SPREAD[1][ne] | SPREAD[2][sw] | SPREAD[3][se]
+def spread_tables ():
+  tables = []
+  for qa, qb in ((0, 0), (1, 0), (0, 1), (1, 1)):
+    table = []
+    for code in range(16):
+      block = 0
+      for a in range(2):
+        for b in range(2):
+          if code >> (2*a+b) & 1:
+            block |= 1 << (4*(2*qa+a) + 2*qb+b)
+      table.append(block)
+    tables.append(table)
+  return tables
+
+# 2x2 result code of every 4x4 block code, as a uint8 array.  Neighbour
+#  counts are summed straight from the bits of the codes.
+# rule - life.rules.Rule, Conway's Life by default
+def leaf_table ( rule=CONWAY ):
+  codes = np.arange(2**16, dtype=np.int32)
+  table = np.zeros(len(codes), dtype=np.uint8)
+  for a in (1, 2):
+    for b in (1, 2):
+      counts = np.zeros(len(codes), dtype=np.int32)
+      for da in (-1, 0, 1):
+        for db in (-1, 0, 1):
+          if da or db:
+            counts += (codes >> (4*(a+da) + b+db)) & 1
+      alive = rule.next[(codes >> (4*a+b)) & 1, counts]
+      table |= alive.astype(np.uint8) << (2*(a-1) + b-1)
+  return table
+
+SPREAD = spread_tables()
+
+# (table, table as ints for scalar lookups from Python) for each rule
+LEAF_TABLES = {}
+
+def leaf_tables ( rule=CONWAY ):
+  tables = LEAF_TABLES.get(rule)
+  if tables is None:
+    table = leaf_table(rule)
+    tables = LEAF_TABLES[rule] = (table, table.tolist())
+  return tables
+
+# 2x2 bool pattern of each result code
+LEAF_PATTERNS = np.array([[[code >> (2*a+b) & 1 for b in range(2)] for a in range(2)] for code in range(16)], dtype=bool)
+
+# Code of the 4x4 block with the given 2x2 quadrant codes
+def block ( nw, ne, sw, se ):
+  return SPREAD[0][nw] | SPREAD[1][ne] | SPREAD[2][sw] | SPREAD[3][se]
+
+# Next states of the central cells of 4x4 blocks overlapping by two cells.
+#  codes[i, j] is the code of the block at [2*i, 2*j]; returns the
+#  (2*n, 2*m) bool array of their central 2x2s, tiled.
+# table - Leaf table of the rule, Conway's by default
+def tile_leaves ( codes, table=None ):
+  if table is None:
+    table = leaf_tables()[0]
+  n, m = codes.shape
+  return LEAF_PATTERNS[table[codes]].transpose(0, 2, 1, 3).reshape(2*n, 2*m)
+
+# Advance an 8x8 block two generations.  g[x][y] is the 4x4 grid of its 2x2
+#  codes; returns the 2x2 codes of the nw, ne, sw and se quarters of the
+#  central 4x4.
+# leaf - Leaf table of the rule as ints, Conway's by default
+def solve_8x8 ( g, leaf=None ):
+  if leaf is None:
+    leaf = leaf_tables()[1]
+  spread0, spread1, spread2, spread3 = SPREAD
+  r = [[leaf[spread0[g[x][y]] | spread1[g[x+1][y]] | spread2[g[x][y+1]] | spread3[g[x+1][y+1]]]
+        for y in range(3)] for x in range(3)]
+  return [leaf[spread0[r[x][y]] | spread1[r[x+1][y]] | spread2[r[x][y+1]] | spread3[r[x+1][y+1]]]
+          for x, y in ((0, 0), (1, 0), (0, 1), (1, 1))]
@@ -0,0 +1,125 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from life import rules, vector
+
+
+#### Multi-Core Board ####
+#
+# The board is split into bands of rows (x ranges) stepped in parallel by a
+# pool of worker processes.  The two generations and the changed-cell mask
+# live in multiprocessing.shared_memory, so nothing is pickled per step: each
+# worker reads its band plus the one-cell halo rows of its neighbours straight
+# from the current buffer and writes its band of the next one.  A barrier
+# separates generations, which is all the halo exchange needs.  The rule is
+# shared the same way, as a flag for B3/S23 followed by its box-sum table.
+
+# Split the evolving rows [margin, gridSize-margin) into n contiguous bands
+def bands ( gridSize, n, margin=1 ):
+  edges = np.linspace(margin, gridSize-margin, n+1).astype(int)
+  return [(int(edges[i]), int(edges[i+1])) for i in range(n)]
+
+# Boards over the shared buffers: two generations and the changed mask.
+#  The SharedMemory objects must outlive the arrays.
+def views ( shms, gridSize ):
+  return [np.ndarray((gridSize, gridSize), dtype=bool, buffer=shm.buf) for shm in shms]
+
+# Worker loop: step rows [x0, x1) each time the barrier releases it.
+#  command holds the index of the current buffer, or -1 to exit.
+def work ( names, gridSize, x0, x1, barrier, command, rule, boundary ):
+  shms = [shared_memory.SharedMemory(name=name) for name in names]
+  a, b, changed = views(shms, gridSize)
+  boards = (a, b)
+  rule = np.frombuffer(rule, dtype=np.uint8)
+  try:
+    while True:
+      barrier.wait()
+      cur = command.value
+      if cur < 0:
+        break
+      life = boards[cur]
+      nxt = boards[1-cur]
+      if x1 > x0:
+        sums = None if rule[0] else vector.table_sums(rule[1:].view(bool))
+        if boundary == 'dead':
+          vector.apply_rule(vector.box_sum(life[x0-1:x1+1]), life[x0:x1, 1:-1], nxt[x0:x1, 1:-1], sums)
+        else:
+          vector.apply_rule(vector.edge_box_sum(life, boundary, x0, x1), life[x0:x1], nxt[x0:x1], sums)
+        np.not_equal(life[x0:x1], nxt[x0:x1], out=changed[x0:x1])
+      barrier.wait()
+  finally:
+    del a, b, changed, boards
+    for shm in shms:
+      shm.close()
+
+# A vector.Board whose generations live in shared memory and are stepped by worker processes
+class ParallelBoard(vector.Board):
+
+  # workers - Number of worker processes, defaults to the number of CPUs
+  # rule - life.rules.Rule or B/S string, Conway's Life by default
+  # boundary - 'dead', 'torus' or 'reflect', see life.vector
+  def __init__ ( self, gridSize, workers=None, rule=None, boundary='dead' ):
+    self.gridSize = gridSize
+    self.boundary = boundary
+    self.margin = vector.margin(boundary)
+    self.workers = workers or mp.cpu_count()
+    self.generation = 0
+
+    nbytes = gridSize*gridSize
+    self.shms = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(3)]
+    names = [shm.name for shm in self.shms]
+    a, b, self.changed = views(self.shms, gridSize)
+    self.boards = (a, b)
+    for arr in (a, b, self.changed):
+      arr[:, :] = False
+    self.cur = 0
+
+    self.sharedRule = mp.Array('B', 21, lock=False)
+    self.set_rule(rule)
+
+    self.barrier = mp.Barrier(self.workers+1)
+    self.command = mp.Value('i', 0, lock=False)
+    self.procs = [mp.Process(target=work, args=(names, gridSize, x0, x1, self.barrier, self.command, self.sharedRule, boundary),
+                             daemon=True)
+                  for x0, x1 in bands(gridSize, self.workers, self.margin)]
+    for proc in self.procs:
+      proc.start()
+
+  # The current generation, a view of shared memory
+  @property
+  def life ( self ):
+    return self.boards[self.cur]
+
+  #### Game Logic ####
+
+  # Switch to another rule; the workers read it at their next step
+  def set_rule ( self, rule ):
+    self.rule = rules.rule_of(rule)
+    self.sharedRule[0] = self.rule.conway
+    self.sharedRule[1:] = vector.box_table(self.rule).astype(np.uint8).tolist()
+
+  # Advance one generation across all workers, returning the mask of changed cells
+  def step ( self ):
+    self.command.value = self.cur
+    self.barrier.wait()
+    self.barrier.wait()
+    self.cur = 1 - self.cur
+    self.generation += 1
+    return self.changed
+
+  # Stop the workers and release the shared memory
+  def close ( self ):
+    if not self.procs:
+      return
+    self.command.value = -1
+    self.barrier.wait()
+    for proc in self.procs:
+      proc.join()
+    self.procs = []
+    self.boards = self.changed = None
+    self.barrier = self.command = None
+    for shm in self.shms:
+      shm.close()
+      shm.unlink()
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+#### Patterns ####
+
+# ----- Blinker -----
+blinkerPattern = np.zeros((3,3), dtype=bool)
+blinkerPattern[1,:3] = True
+# -------------------
+
+# ---- Die Hard ----
+dieHardPattern = np.zeros((8,3), dtype=bool)
+dieHardPattern[0:2,1] = True
+dieHardPattern[1,2] = dieHardPattern[6][0] = True
+dieHardPattern[5:8,2] = True
+# ------------------
+
+# ----- Glider -----
+gliderPattern = np.zeros((3,3), dtype=bool)
+gliderPattern[0:3,2] = True
+gliderPattern[1][0] = gliderPattern[2][1] = True 
+# ------------------
+
+# --- Glider Gun Pattern ---
+gliderGunPattern = np.zeros((38,9), dtype=bool)
+gliderGunPattern[0:2,4:6] = True
+gliderGunPattern[34:36,2:4] = True
+gliderGunPattern[10,4:7] = True
+gliderGunPattern[11,3] = gliderGunPattern[11,7] = True
+gliderGunPattern[12:14,2] = gliderGunPattern[12:14,8] = True
+gliderGunPattern[14,5] = gliderGunPattern[17,5] = True
+gliderGunPattern[15,3] = gliderGunPattern[15,7] = True
+gliderGunPattern[16,4:7] = True
+gliderGunPattern[20:22,2:5] = True
+gliderGunPattern[22,1] = gliderGunPattern[22,5] = True
+gliderGunPattern[24,0:2] = gliderGunPattern[24,5:7] = True
+#gliderGunPattern
+# --------------------------
+
+# --- I-Beam Pattern ---
+iBeamPattern = np.zeros((3,12), dtype=bool)
+ibs = [0, 3, 8, 11]
+for i in ibs:
+  iBeamPattern[0:4, ibs] = True
+iBeamPattern[1,1:3] = True
+iBeamPattern[1,9:11] = True
+iBeamPattern[0:4,5:7] = True
+# ----------------------
+
+# ------ Pulsar -------
+pulsarPattern = np.zeros((13,13), dtype=bool)
+ps = [0, 5, 7, 12]
+for i in ps:
+  pulsarPattern[2:5, i] = pulsarPattern[8:11, i] = True
+  pulsarPattern[i, 2:5] = pulsarPattern[i, 8:11] = True
+# ---------------------
+
+# ----- Spaceship -----
+spaceshipPattern = np.zeros((4,5), dtype=bool)
+spaceshipPattern[0][0] = spaceshipPattern[0][3] = spaceshipPattern[2][0] = True
+spaceshipPattern[3,1:5] = spaceshipPattern[1:3,4] = True
+# ---------------------
+
+##################
+
+# Patterns by name, as used on the command line
+PATTERNS = {
+  'blinker': blinkerPattern,
+  'die_hard': dieHardPattern,
+  'glider': gliderPattern,
+  'glider_gun': gliderGunPattern,
+  'i_beam': iBeamPattern,
+  'pulsar': pulsarPattern,
+  'spaceship': spaceshipPattern,
+}
@@ -0,0 +1,139 @@
+import threading
+import time
+
+
+#### Profiling ####
+#
+# Per-phase timers and call counters for engines and renderers.  Attaching a
+# Profiler to an object replaces the chosen methods on that instance with
+# timing wrappers; detaching deletes the wrappers again.  Nothing is
+# instrumented until then, so a profiler that is not attached costs nothing.
+#
+# Times are exclusive: a phase called from inside another, such as solve_grid
+# inside update_grid, is subtracted from the outer phase.  Several methods may
+# share a phase.
+
+# Default phases by class name, {method: phase}
+#  hashgrid - hash: window keys, solve: 4x4 grids, update: memo lookups and
+#             copying results into tlife, copy: copying tlife back to life,
+#             keys: the per-generation leaf codes
+#  hashlife - successor: node results, solve: leaves, expand, collect
+#  window - copying out the visible cells or their block densities, for every engine
+#  draw - renderer updates
+PHASES = {
+  'HashGrid': {'hash_life': 'hash', 'solve_grid': 'solve', 'update_grid': 'update', 'step': 'copy', 'window': 'window', 'density': 'window'},
+  'WindowKeys': {'reset': 'keys'},
+  'Universe': {'successor': 'successor', 'solve_leaf': 'solve', 'solve_8x8': 'solve', 'expand': 'expand', 'collect': 'collect', 'window': 'window', 'density': 'window'},
+  'Board': {'step': 'step', 'window': 'window', 'density': 'window'},
+  'BitBoard': {'step': 'step', 'window': 'window', 'density': 'window'},
+  'SparseLife': {'step': 'step', 'window': 'window', 'density': 'window'},
+  'ParallelBoard': {'step': 'step', 'window': 'window', 'density': 'window'},
+  'CanvasRenderer': {'draw_array': 'draw', 'draw_region': 'draw'},
+  'ImageRenderer': {'draw_array': 'draw', 'draw_region': 'draw'},
+}
+
+class Profiler():
+
+  def __init__ ( self ):
+    # Seconds and calls per phase
+    self.times = {}
+    self.calls = {}
+    # Instrumented objects and the method names replaced on each
+    self.attached = []
+    # Phases in progress on each thread, as [phase, start, seconds in nested phases]
+    self.local = threading.local()
+
+  # Instrument methods of obj.  phases maps method names to phase names,
+  #  defaulting to PHASES for the object's class.
+  def attach ( self, obj, phases=None ):
+    if phases is None:
+      phases = PHASES.get(type(obj).__name__, {})
+    names = []
+    for name, phase in phases.items():
+      method = getattr(obj, name, None)
+      if method is None:
+        continue
+      setattr(obj, name, self.wrap(method, phase))
+      names.append(name)
+    self.attached.append((obj, names))
+    return obj
+
+  # Instrument an engine and the helpers it steps with
+  def attach_engine ( self, engine ):
+    self.attach(engine)
+    keys = getattr(engine, 'keys', None)
+    if type(keys).__name__ in PHASES:
+      self.attach(keys)
+    return engine
+
+  # Remove all instrumentation.  The objects' counters stay in report().
+  def detach ( self ):
+    for obj, names in self.attached:
+      for name in names:
+        delattr(obj, name)
+    self.attached = [(obj, []) for obj, _ in self.attached]
+
+  def wrap ( self, method, phase ):
+    times = self.times
+    calls = self.calls
+    times.setdefault(phase, 0.0)
+    calls.setdefault(phase, 0)
+    local = self.local
+
+    def timed ( *args, **kwargs ):
+      stack = getattr(local, 'stack', None)
+      if stack is None:
+        stack = local.stack = []
+      frame = [phase, time.perf_counter(), 0.0]
+      stack.append(frame)
+      try:
+        return method(*args, **kwargs)
+      finally:
+        elapsed = time.perf_counter() - frame[1]
+        stack.pop()
+        times[phase] += elapsed - frame[2]
+        calls[phase] += 1
+        if stack:
+          stack[-1][2] += elapsed
+    return timed
+
+  def reset ( self ):
+    for phase in self.times:
+      self.times[phase] = 0.0
+      self.calls[phase] = 0
+
+  # {phase: {'seconds': ..., 'calls': ...}}, plus the cache and drawing
+  #  counters of the attached objects under 'counters'
+  def report ( self ):
+    out = {phase: {'seconds': self.times[phase], 'calls': self.calls[phase]} for phase in self.times}
+    counters = {}
+    for obj, _ in self.attached:
+      counters.update(counters_of(obj))
+    out['counters'] = counters
+    return out
+
+  # Copy of the phase times, to pass to breakdown() later
+  def snapshot ( self ):
+    return dict(self.times)
+
+  # Share of the profiled time spent in each phase, largest first, as
+  #  [(phase, fraction)].  since - Only count time after this snapshot()
+  def breakdown ( self, since=None ):
+    since = since or {}
+    spent = {phase: t - since.get(phase, 0.0) for phase, t in self.times.items()}
+    total = sum(spent.values())
+    if total <= 0:
+      return []
+    return sorted(((phase, t/total) for phase, t in spent.items() if t > 0), key=lambda p: -p[1])
+
+# Cache hit/miss and redraw counters an object keeps anyway
+def counters_of ( obj ):
+  if hasattr(obj, 'lifePatterns'):
+    stats = obj.lifePatterns.stats()
+    return {'cache_hits': stats['hits'], 'cache_misses': stats['misses'], 'cache_entries': stats['entries']}
+  if hasattr(obj, 'stats'):
+    stats = obj.stats()
+    return {'cache_hits': stats['hits'], 'cache_misses': stats['misses'], 'cache_entries': stats['nodes']}
+  if hasattr(obj, 'drawn'):
+    return {'cells_drawn': obj.drawn}
+  return {}
@@ -0,0 +1,544 @@
+import sys
+
+import numpy as np
+
+from life import rules
+from life.leaves import block, leaf_tables, solve_8x8
+
+
+#### Quadtree Nodes ####
+#
+# A universe is a quadtree of square nodes.  A level-k node covers 2^k x 2^k
+# cells; level 0 nodes are single cells and every other node is made from four
+# level k-1 children.  Cells are addressed [x, y] as in the dense boards, so
+# 'east' is increasing x and 'south' is increasing y:
+#
+#   nw | ne
+#   -------
+#   sw | se
+#
+# Nodes are immutable and interned per Universe: two nodes with the same
+# children are the same object, so identity is a complete structural key for
+# memoising results.
+#
+# The intern table only grows, so a Universe can be given a node budget: once
+# it is exceeded after a step, collect() keeps the nodes reachable from the
+# current root and forgets everything else, cached results included.
+
+class Node():
+  __slots__ = ('level', 'nw', 'ne', 'sw', 'se', 'pop', 'result')
+
+  def __init__ ( self, level, nw, ne, sw, se, pop ):
+    self.level = level
+    self.nw = nw
+    self.ne = ne
+    self.sw = sw
+    self.se = se
+    # Number of live cells below this node
+    self.pop = pop
+    # Centre level k-1 node advanced 2^(k-2) generations, filled in lazily
+    self.result = None
+
+
+# Approximate bytes held per interned node: the node, its key tuple and dict slot
+NODE_BYTES = sys.getsizeof(Node(0, None, None, None, None, 0)) + sys.getsizeof((0, 0, 0, 0)) + 100
+
+
+#### HashLife Universe ####
+
+class Universe():
+
+  # maxNodes - Number of interned nodes that triggers garbage collection, None for no limit
+  # rule - life.rules.Rule or B/S string, Conway's Life by default
+  def __init__ ( self, maxNodes=None, rule=None ):
+    # Intern table mapping (nw, ne, sw, se) to the canonical node
+    self.nodes = {}
+    # Results of advancing a node by fewer than 2^(k-2) generations, keyed (node, j)
+    self.steps = {}
+    self.maxNodes = maxNodes
+
+    # Cache statistics: successor lookups answered from or missing the cache,
+    #  nodes dropped by garbage collection, and the number of collections
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.collections = 0
+
+    self.off = Node(0, None, None, None, None, 0)
+    self.on = Node(0, None, None, None, None, 1)
+    self.empties = [self.off]
+    self.intern_leaves()
+
+    # Cached results of the rules switched away from, see set_rule
+    self.ruleMemos = {}
+    # Bounding box of the live cells of each node seen by bounding_box(),
+    #  relative to the node's corner
+    self.boxes = {}
+    # Roots kept through garbage collection besides the current one, with
+    #  the number of holders of each, see life.history
+    self.pinned = {}
+    self.rule = rules.rule_of(rule)
+    rules.require_bounded(self.rule, 'hashlife')
+    self.leaf = leaf_tables(self.rule)[1]
+
+    # The root covers [originX, originX + 2^level) x [originY, originY + 2^level)
+    self.root = self.empty(3)
+    self.originX = 0
+    self.originY = 0
+    self.generation = 0
+
+  #### Node Construction ####
+
+  # Return the canonical node with the given children
+  def join ( self, nw, ne, sw, se ):
+    key = (nw, ne, sw, se)
+    node = self.nodes.get(key)
+    if node is None:
+      node = Node(nw.level+1, nw, ne, sw, se, nw.pop+ne.pop+sw.pop+se.pop)
+      self.nodes[key] = node
+    return node
+
+  # Intern the 16 level 1 nodes, indexed by their life.leaves 2x2 code
+  #  (cell [a, b] at bit 2*a+b).  They are never collected.
+  def intern_leaves ( self ):
+    cell = (self.off, self.on)
+    self.leaves = [self.join(cell[c & 1], cell[c >> 2 & 1], cell[c >> 1 & 1], cell[c >> 3 & 1]) for c in range(16)]
+    self.leafCodes = {node: c for c, node in enumerate(self.leaves)}
+
+  # Forget every interned node and cached result
+  def reset_nodes ( self ):
+    self.nodes = {}
+    self.steps = {}
+    self.empties = [self.off]
+    self.intern_leaves()
+    self.ruleMemos = {}
+    self.boxes = {}
+    self.pinned = {}
+
+  # Return the empty node of the given level
+  def empty ( self, level ):
+    while len(self.empties) <= level:
+      e = self.empties[-1]
+      self.empties.append(self.join(e, e, e, e))
+    return self.empties[level]
+
+  # Build a node from a 2^k x 2^k array of bools
+  def build ( self, arr ):
+    size = arr.shape[0]
+    if size == 1:
+      return self.on if arr[0, 0] else self.off
+    if not arr.any():
+      return self.empty(size.bit_length()-1)
+    h = size//2
+    return self.join(self.build(arr[:h, :h]), self.build(arr[h:, :h]),
+                     self.build(arr[:h, h:]), self.build(arr[h:, h:]))
+
+  # Return a node one level higher with this node at its centre
+  def expand ( self, node ):
+    e = self.empty(node.level-1)
+    return self.join(self.join(e, e, e, node.nw), self.join(e, e, node.ne, e),
+                     self.join(e, node.sw, e, e), self.join(node.se, e, e, e))
+
+  # The central level k-1 node of a level-k node
+  def centre ( self, node ):
+    return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+  #### Evolution ####
+
+  # Switch to another rule, given as a life.rules.Rule or B/S string.  Node
+  #  results belong to the rule they were computed under, so the current
+  #  rule's are set aside and any kept for the new rule are put back, as long
+  #  as the nodes involved are still interned.
+  def set_rule ( self, rule ):
+    rule = rules.rule_of(rule)
+    rules.require_bounded(rule, 'hashlife')
+    if rule == self.rule:
+      return
+    results = {}
+    for node in self.nodes.values():
+      if node.result is not None:
+        results[node] = node.result
+        node.result = None
+    self.ruleMemos[self.rule] = (results, self.steps)
+
+    results, steps = self.ruleMemos.pop(rule, ({}, {}))
+    for node, result in results.items():
+      if self.interned(node) and self.interned(result):
+        node.result = result
+    self.steps = {key: result for key, result in steps.items() if self.interned(key[0]) and self.interned(result)}
+    self.rule = rule
+    self.leaf = leaf_tables(rule)[1]
+
+  # Whether node is the canonical node for its children
+  def interned ( self, node ):
+    return node.level == 0 or self.nodes.get((node.nw, node.ne, node.sw, node.se)) is node
+
+  # Solve a 4x4 (level 2) node one generation, returning its 2x2 (level 1)
+  #  centre from the rule's life.leaves table.
+  def solve_leaf ( self, node ):
+    codes = self.leafCodes
+    return self.leaves[self.leaf[block(codes[node.nw], codes[node.ne], codes[node.sw], codes[node.se])]]
+
+  # Advance an 8x8 (level 3) node two generations, returning its 4x4 centre,
+  #  by composing leaf table lookups.
+  def solve_8x8 ( self, node ):
+    codes = self.leafCodes
+    g = [[None]*4 for _ in range(4)]
+    for i, q in enumerate((node.nw, node.ne, node.sw, node.se)):
+      x = 2*(i % 2)
+      y = 2*(i // 2)
+      g[x][y], g[x+1][y], g[x][y+1], g[x+1][y+1] = codes[q.nw], codes[q.ne], codes[q.sw], codes[q.se]
+    leaves = self.leaves
+    return self.join(*[leaves[c] for c in solve_8x8(g, self.leaf)])
+
+  # Advance a level-k node by 2^j generations (j <= k-2), returning its
+  #  central level k-1 node.  j = k-2 is the full HashLife step and is cached
+  #  on the node itself; smaller steps are cached in self.steps.
+  def successor ( self, node, j ):
+    k = node.level
+    if node.pop == 0:
+      return self.empty(k-1)
+    if j == k-2:
+      if node.result is not None:
+        self.hits += 1
+        return node.result
+    else:
+      cached = self.steps.get((node, j))
+      if cached is not None:
+        self.hits += 1
+        return cached
+    self.misses += 1
+
+    if k == 2:
+      result = self.solve_leaf(node)
+    elif k == 3 and j == 1:
+      result = self.solve_8x8(node)
+    else:
+      # 4x4 grid of grandchildren, g[x][y]
+      g = [[None]*4 for _ in range(4)]
+      for i, q in enumerate((node.nw, node.ne, node.sw, node.se)):
+        x = 2*(i % 2)
+        y = 2*(i // 2)
+        g[x][y], g[x+1][y], g[x][y+1], g[x+1][y+1] = q.nw, q.ne, q.sw, q.se
+
+      # Advance the 9 overlapping level k-1 sub-nodes, by half the full step
+      #  or by all of a smaller one
+      sj = min(j, k-3)
+      r = [[self.successor(self.join(g[x][y], g[x+1][y], g[x][y+1], g[x+1][y+1]), sj)
+            for y in range(3)] for x in range(3)]
+
+      quads = []
+      for x, y in ((0, 0), (1, 0), (0, 1), (1, 1)):
+        if j == k-2:
+          # Second half of the full step: advance the combined quarters again
+          quads.append(self.successor(self.join(r[x][y], r[x+1][y], r[x][y+1], r[x+1][y+1]), sj))
+        else:
+          # Already advanced 2^j generations, only the centres are needed
+          quads.append(self.join(r[x][y].se, r[x+1][y].sw, r[x][y+1].ne, r[x+1][y+1].nw))
+      result = self.join(*quads)
+
+    if j == k-2:
+      node.result = result
+    else:
+      self.steps[(node, j)] = result
+    return result
+
+  # Advance the universe by 2^j generations
+  def step_pow2 ( self, j ):
+    # Grow the root until it is large enough and all live cells lie in its
+    #  central quarter; patterns grow at most one cell per generation so the
+    #  result, the root's centre, then cannot lose any cells.
+    root = self.root
+    while root.level < j+3 or self.centre(self.centre(root)).pop != root.pop:
+      self.originX -= 2**(root.level-1)
+      self.originY -= 2**(root.level-1)
+      root = self.expand(root)
+
+    self.originX += 2**(root.level-2)
+    self.originY += 2**(root.level-2)
+    self.root = self.successor(root, j)
+    self.generation += 2**j
+
+    if self.maxNodes is not None and len(self.nodes) > self.maxNodes:
+      self.collect()
+
+  # Advance the universe by n generations.  n may be arbitrarily large, each
+  #  set bit costs one memoised successor call.
+  def step ( self, n=1 ):
+    n = int(n)
+    j = 0
+    while n:
+      if n & 1:
+        self.step_pow2(j)
+      n >>= 1
+      j += 1
+
+  #### Memory Management ####
+
+  # Keep a node, and everything below it, through garbage collection
+  def pin ( self, node ):
+    self.pinned[node] = self.pinned.get(node, 0) + 1
+
+  def unpin ( self, node ):
+    count = self.pinned.get(node, 0) - 1
+    if count > 0:
+      self.pinned[node] = count
+    else:
+      self.pinned.pop(node, None)
+
+  # Garbage collect the intern table, keeping only the nodes reachable from the
+  #  root and any pinned nodes, the empty nodes and the level 1 leaves.
+  #  Cached results pointing outside the kept set are dropped so that every
+  #  node that remains is still canonical.
+  def collect ( self ):
+    keep = set(self.empties)
+    keep.update(self.leaves)
+    stack = [self.root]
+    stack.extend(self.pinned)
+    while stack:
+      node = stack.pop()
+      if node in keep:
+        continue
+      keep.add(node)
+      if node.level > 0:
+        stack.extend((node.nw, node.ne, node.sw, node.se))
+
+    before = len(self.nodes)
+    self.nodes = {key: node for key, node in self.nodes.items() if node in keep}
+    for node in self.nodes.values():
+      if node.result is not None and node.result not in keep:
+        node.result = None
+    self.steps = {key: node for key, node in self.steps.items() if key[0] in keep and node in keep}
+    for rule, (results, steps) in self.ruleMemos.items():
+      self.ruleMemos[rule] = ({node: result for node, result in results.items() if node in keep and result in keep},
+                              {key: node for key, node in steps.items() if key[0] in keep and node in keep})
+    self.boxes = {node: box for node, box in self.boxes.items() if node in keep}
+
+    self.evictions += before - len(self.nodes)
+    self.collections += 1
+
+  # Cache counters as a dict, for printing or logging
+  def stats ( self ):
+    return {'nodes': len(self.nodes), 'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'collections': self.collections,
+            'bytes': len(self.nodes)*NODE_BYTES}
+
+  #### Cell Access ####
+
+  @property
+  def population ( self ):
+    return self.root.pop
+
+  # Return (xmin, ymin, xmax, ymax) enclosing every live cell, or None if
+  #  there are none.  Boxes are cached per node, so after a step only the
+  #  nodes new since the last call are visited.
+  def bounding_box ( self ):
+    box = self.box(self.root)
+    if box is None:
+      return None
+    return (self.originX+box[0], self.originY+box[1], self.originX+box[2], self.originY+box[3])
+
+  # Bounding box of the live cells of a node, relative to its corner
+  def box ( self, node ):
+    if node.pop == 0:
+      return None
+    box = self.boxes.get(node)
+    if box is not None:
+      return box
+    if node.level == 0:
+      box = (0, 0, 1, 1)
+    else:
+      h = 2**(node.level-1)
+      parts = [(b[0]+dx, b[1]+dy, b[2]+dx, b[3]+dy) for b, dx, dy in
+               ((self.box(node.nw), 0, 0), (self.box(node.ne), h, 0), (self.box(node.sw), 0, h), (self.box(node.se), h, h))
+               if b is not None]
+      box = (min(b[0] for b in parts), min(b[1] for b in parts), max(b[2] for b in parts), max(b[3] for b in parts))
+    self.boxes[node] = box
+    return box
+
+  # Number of live cells in the rectangle [x, x+w) x [y, y+h), from the
+  #  populations of the nodes inside it; only nodes crossing its edges are
+  #  opened
+  def count ( self, x, y, w, h ):
+    total = 0
+    stack = [(self.root, self.originX, self.originY)]
+    while stack:
+      node, nx, ny = stack.pop()
+      span = 2**node.level
+      if node.pop == 0 or nx+span <= x or ny+span <= y or nx >= x+w or ny >= y+h:
+        continue
+      if nx >= x and ny >= y and nx+span <= x+w and ny+span <= y+h:
+        total += node.pop
+        continue
+      half = span//2
+      stack.extend(((node.nw, nx, ny), (node.ne, nx+half, ny), (node.sw, nx, ny+half), (node.se, nx+half, ny+half)))
+    return total
+
+  # Grow the root until it covers the rectangle [x, xmax) x [y, ymax)
+  def cover ( self, x, y, xmax, ymax ):
+    while (x < self.originX or y < self.originY or
+           xmax > self.originX + 2**self.root.level or ymax > self.originY + 2**self.root.level):
+      self.originX -= 2**(self.root.level-1)
+      self.originY -= 2**(self.root.level-1)
+      self.root = self.expand(self.root)
+
+  # Place a pattern with its upper left corner at x, y, overwriting the cells beneath it.
+  #  The universe is unbounded so this always succeeds.
+  # pat - 2D Numpy array of bools specifying pattern
+  def place_pattern ( self, pat, x, y ):
+    pat = np.asarray(pat, dtype=bool)
+    self.cover(x, y, x+pat.shape[0], y+pat.shape[1])
+    self.root = self.paint(self.root, self.originX, self.originY, pat, x, y)
+    return True
+
+  # Turn on the cells at coordinates cells ((n, 2) array of x, y) without
+  #  building a dense array covering them
+  def add_cells ( self, cells ):
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    if len(cells) == 0:
+      return True
+    lo = cells.min(axis=0)
+    hi = cells.max(axis=0)
+    self.cover(int(lo[0]), int(lo[1]), int(hi[0])+1, int(hi[1])+1)
+    node = self.from_cells(cells - (self.originX, self.originY), self.root.level)
+    self.root = self.merge(self.root, node)
+    return True
+
+  # Build a level node from the coordinates of its live cells, relative to its corner
+  def from_cells ( self, cells, level ):
+    if len(cells) == 0:
+      return self.empty(level)
+    if level <= 3:
+      arr = np.zeros((2**level, 2**level), dtype=bool)
+      arr[cells[:, 0], cells[:, 1]] = True
+      return self.build(arr)
+    h = 2**(level-1)
+    east = cells[:, 0] >= h
+    south = cells[:, 1] >= h
+    return self.join(self.from_cells(cells[~east & ~south], level-1),
+                     self.from_cells(cells[east & ~south] - (h, 0), level-1),
+                     self.from_cells(cells[~east & south] - (0, h), level-1),
+                     self.from_cells(cells[east & south] - (h, h), level-1))
+
+  # Union of the live cells of two nodes of the same level
+  def merge ( self, a, b ):
+    if b.pop == 0 or a is b:
+      return a
+    if a.pop == 0:
+      return b
+    if a.level == 0:
+      return self.on
+    return self.join(self.merge(a.nw, b.nw), self.merge(a.ne, b.ne),
+                     self.merge(a.sw, b.sw), self.merge(a.se, b.se))
+
+  # Return node with the rectangle of pat at px, py painted over it
+  def paint ( self, node, nx, ny, pat, px, py ):
+    size = 2**node.level
+    pxmax = px + pat.shape[0]
+    pymax = py + pat.shape[1]
+    if nx >= pxmax or ny >= pymax or nx+size <= px or ny+size <= py:
+      return node
+    if nx >= px and ny >= py and nx+size <= pxmax and ny+size <= pymax:
+      return self.build(pat[nx-px:nx-px+size, ny-py:ny-py+size])
+
+    h = size//2
+    return self.join(self.paint(node.nw, nx, ny, pat, px, py),
+                     self.paint(node.ne, nx+h, ny, pat, px, py),
+                     self.paint(node.sw, nx, ny+h, pat, px, py),
+                     self.paint(node.se, nx+h, ny+h, pat, px, py))
+
+  # Set a single cell
+  def set_cell ( self, x, y, alive ):
+    self.place_pattern(np.array([[alive]]), x, y)
+
+  # Toggle a cell, returning its new state
+  def toggle ( self, x, y ):
+    alive = not self.get_cell(x, y)
+    self.set_cell(x, y, alive)
+    return alive
+
+  def clear ( self ):
+    self.root = self.empty(3)
+    self.originX = 0
+    self.originY = 0
+
+  # Return the state of a single cell
+  def get_cell ( self, x, y ):
+    node = self.root
+    x -= self.originX
+    y -= self.originY
+    if x < 0 or y < 0 or x >= 2**node.level or y >= 2**node.level:
+      return False
+    while node.level > 0 and node.pop:
+      h = 2**(node.level-1)
+      if x < h:
+        node = node.nw if y < h else node.sw
+      else:
+        node = node.ne if y < h else node.se
+      x %= h
+      y %= h
+    return node.pop == 1
+
+  # Return the cells in the rectangle [x, x+w) x [y, y+h) as an array of bools
+  def window ( self, x, y, w, h ):
+    out = np.zeros((w, h), dtype=bool)
+    self.fill(out, self.root, self.originX-x, self.originY-y)
+    return out
+
+  # Write the live cells of node, whose corner is at nx, ny in out, into out
+  def fill ( self, out, node, nx, ny ):
+    size = 2**node.level
+    if node.pop == 0 or nx >= out.shape[0] or ny >= out.shape[1] or nx+size <= 0 or ny+size <= 0:
+      return
+    if node.level == 0:
+      out[nx, ny] = True
+      return
+    h = size//2
+    self.fill(out, node.nw, nx, ny)
+    self.fill(out, node.ne, nx+h, ny)
+    self.fill(out, node.sw, nx, ny+h)
+    self.fill(out, node.se, nx+h, ny+h)
+
+  # Live fraction of each 2^level x 2^level block in the w x h blocks whose
+  #  upper left block is block x, y, read from the populations of the nodes
+  #  at that level, so the cost depends on the blocks in view rather than the
+  #  cells.  Nodes of a level sit on a grid offset from the blocks by the
+  #  root's origin, so a node is only counted whole once it lies inside one
+  #  block; one straddling block edges is opened further, down to single
+  #  cells if need be.
+  def density ( self, x, y, w, h, level ):
+    out = np.zeros((w, h), dtype=np.float32)
+    stack = [(self.root, self.originX, self.originY)]
+    size = 2**level
+    while stack:
+      node, nx, ny = stack.pop()
+      span = 2**node.level
+      if (node.pop == 0 or nx+span <= x*size or ny+span <= y*size or
+          nx >= (x+w)*size or ny >= (y+h)*size):
+        continue
+      bx, by = nx >> level, ny >> level
+      if span <= size and (nx+span-1) >> level == bx and (ny+span-1) >> level == by:
+        out[bx-x, by-y] += node.pop
+        continue
+      h2 = span//2
+      stack.extend(((node.nw, nx, ny), (node.ne, nx+h2, ny), (node.sw, nx, ny+h2), (node.se, nx+h2, ny+h2)))
+    out /= 4**level
+    return out
+
+  # Return the coordinates of every live cell as an (n, 2) array
+  # node - Node to list instead of the root, with its corner at x, y
+  def cells ( self, node=None, x=0, y=0 ):
+    if node is None:
+      node, x, y = self.root, self.originX, self.originY
+    found = []
+    stack = [(node, x, y)]
+    while stack:
+      node, x, y = stack.pop()
+      if node.pop == 0:
+        continue
+      if node.level == 0:
+        found.append((x, y))
+        continue
+      h = 2**(node.level-1)
+      stack.extend(((node.nw, x, y), (node.ne, x+h, y), (node.sw, x, y+h), (node.se, x+h, y+h)))
+    return np.array(found, dtype=np.int64).reshape(-1, 2)
@@ -0,0 +1,203 @@
+import struct
+import zlib
+
+import numpy as np
+
+
+#### Board Rendering ####
+#
+# Renderers keep a copy of the states they have drawn (self.shown) and only
+# touch the canvas where that differs from what they are asked to draw, so a
+# generation in which nothing changed costs no canvas calls at all.
+#
+#  CanvasRenderer - One rectangle per cell, created once and recoloured with
+#                   itemconfig afterwards.
+#  ImageRenderer - A single PhotoImage.  Changes are grouped into tiles and
+#                  only the bounding box of the changes in each dirty tile is
+#                  blitted.
+#
+# Cells are addressed [x, y] as on the boards.
+#
+# What is shown is a shade per cell, from 0 (dead) to LIVE_SHADE (alive).
+# Boards of bools are drawn in the two extremes; arrays of floats are live
+# fractions, such as a zoomed-out viewer's block densities, and are drawn in
+# the grey between, any live cell at all giving at least the lightest grey.
+#
+# pixels() turns states into an RGB image, and ppm() and png() encode it;
+# ImageRenderer and the frame exporter (life.export) both draw through them.
+
+LIVE_RGB = (0, 0, 0)
+DEAD_RGB = (255, 255, 255)
+
+# Number of shades, dead and alive included
+SHADES = 8
+LIVE_SHADE = SHADES - 1
+PALETTE = np.linspace(DEAD_RGB, LIVE_RGB, SHADES).round().astype(np.uint8)
+COLOURS = ['#%02x%02x%02x' % tuple(rgb) for rgb in PALETTE]
+
+# Shades of an array of bools, live fractions or shades
+def shades ( states ):
+  states = np.asarray(states)
+  if states.dtype == bool:
+    return states.astype(np.uint8) * np.uint8(LIVE_SHADE)
+  if states.dtype.kind == 'f':
+    return np.ceil(states * LIVE_SHADE).astype(np.uint8)
+  return states.astype(np.uint8, copy=False)
+
+# Image pixels for a 2D array of bools or shades, each cell a scale x scale
+#  block.  Returns a (height, width, 3) uint8 array, rows running along y.
+def pixels ( states, scale=1 ):
+  if states.dtype == bool:
+    img = np.where(states.T[:, :, np.newaxis], np.uint8(LIVE_RGB), np.uint8(DEAD_RGB)).astype(np.uint8)
+  else:
+    img = PALETTE[shades(states).T]
+  if scale > 1:
+    img = img.repeat(scale, axis=0).repeat(scale, axis=1)
+  return img
+
+# Binary PPM (P6) encoding of a (height, width, 3) uint8 array
+def ppm ( img ):
+  header = b'P6 %d %d 255\n' % (img.shape[1], img.shape[0])
+  return header + np.ascontiguousarray(img).tobytes()
+
+# PNG encoding of a (height, width, 3) uint8 array, 8-bit RGB with no row filters
+def png ( img, level=6 ):
+  h, w = img.shape[:2]
+  rows = np.zeros((h, 1 + 3*w), dtype=np.uint8)
+  rows[:, 1:] = img.reshape(h, 3*w)
+  def chunk ( tag, data ):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+  return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0)) +
+          chunk(b'IDAT', zlib.compress(rows.tobytes(), level)) + chunk(b'IEND', b''))
+
+# Group changed cells into tiles, returning the (xmin, ymin, xmax, ymax)
+#  bounding box of the cells inside each dirty tile
+def dirty_boxes ( cells, tile ):
+  if len(cells) == 0:
+    return []
+  tx = cells[:, 0] // tile
+  ty = cells[:, 1] // tile
+  tid = tx * (int(ty.max())+1) + ty
+  order = np.argsort(tid, kind='stable')
+  tid = tid[order]
+  xs = cells[order, 0]
+  ys = cells[order, 1]
+  starts = np.flatnonzero(np.r_[True, tid[1:] != tid[:-1]])
+  return zip(np.minimum.reduceat(xs, starts), np.minimum.reduceat(ys, starts),
+             np.maximum.reduceat(xs, starts)+1, np.maximum.reduceat(ys, starts)+1)
+
+class CanvasRenderer():
+
+  def __init__ ( self, canvas, gridSize, xpad, ypad, boxWidth ):
+    self.canvas = canvas
+    self.gridSize = gridSize
+    self.xpad = xpad
+    self.ypad = ypad
+    self.boxWidth = boxWidth
+
+    # Canvas item of each cell, created the first time it is drawn
+    self.items = [[None for _ in range(gridSize)] for _ in range(gridSize)]
+    self.shown = np.zeros((gridSize, gridSize), dtype=np.uint8)
+    # Number of cells recoloured or created, for instrumentation
+    self.drawn = 0
+
+  # Draw one cell in the given shade, creating its rectangle if needed
+  def draw_cell ( self, i, j, shade ):
+    fillColor = COLOURS[shade]
+    item = self.items[i][j]
+    if item is None:
+      x = self.xpad + i*self.boxWidth
+      y = self.ypad + j*self.boxWidth
+      self.items[i][j] = self.canvas.create_rectangle(x, y, x+self.boxWidth, y+self.boxWidth, fill=fillColor)
+    else:
+      self.canvas.itemconfig(item, fill=fillColor)
+    self.shown[i, j] = shade
+    self.drawn += 1
+
+  # Draw cells at coordinates cells ((n, 2) array) in the given shades,
+  #  skipping any that already show that shade
+  def draw_cells ( self, cells, states ):
+    for (i, j), shade in zip(cells, states):
+      if self.shown[i, j] != shade or self.items[i][j] is None:
+        self.draw_cell(i, j, shade)
+
+  # Draw live cells already known to show dead and vice versa
+  def toggle_cells ( self, cells ):
+    for i, j in cells:
+      self.draw_cell(i, j, LIVE_SHADE - self.shown[i, j])
+
+  # Draw the rectangle of cells whose upper left corner is at x, y
+  # states - 2D Numpy array of bools, live fractions or shades for the region
+  def draw_region ( self, x, y, states ):
+    states = shades(states)
+    for i in range(states.shape[0]):
+      for j in range(states.shape[1]):
+        if self.items[x+i][y+j] is None or self.shown[x+i, y+j] != states[i, j]:
+          self.draw_cell(x+i, y+j, states[i, j])
+
+  # Draw a whole board, touching only the cells that differ from what is shown
+  def draw_array ( self, life ):
+    life = shades(life)
+    cells = np.argwhere(life != self.shown)
+    self.draw_cells(cells, life[cells[:, 0], cells[:, 1]])
+
+class ImageRenderer():
+
+  # tile - Side of the tiles changes are grouped into before blitting
+  def __init__ ( self, canvas, gridSize, xpad, ypad, boxWidth, tile=16 ):
+    from tkinter import PhotoImage
+    self.PhotoImage = PhotoImage
+
+    self.canvas = canvas
+    self.gridSize = gridSize
+    self.boxWidth = boxWidth
+    self.tile = tile
+
+    self.photo = PhotoImage(width=gridSize*boxWidth, height=gridSize*boxWidth)
+    self.image = canvas.create_image(xpad, ypad, image=self.photo, anchor='nw')
+    self.shown = np.zeros((gridSize, gridSize), dtype=np.uint8)
+    self.drawn = 0
+    self.blit(0, 0, gridSize, gridSize)
+
+  # Copy the shown states of [xmin, xmax) x [ymin, ymax) into the image
+  def blit ( self, xmin, ymin, xmax, ymax ):
+    if xmax <= xmin or ymax <= ymin:
+      return
+    block = self.PhotoImage(data=ppm(pixels(self.shown[xmin:xmax, ymin:ymax], self.boxWidth)), format='PPM')
+    self.photo.tk.call(self.photo.name, 'copy', block.name, '-to', int(xmin)*self.boxWidth, int(ymin)*self.boxWidth)
+    self.drawn += (xmax-xmin)*(ymax-ymin)
+
+  def draw_cell ( self, i, j, shade ):
+    self.shown[i, j] = shade
+    self.blit(i, j, i+1, j+1)
+
+  # Draw cells at coordinates cells ((n, 2) array) in the given shades,
+  #  blitting the bounding box of the changes in each dirty tile
+  def draw_cells ( self, cells, states ):
+    cells = np.asarray(cells).reshape(-1, 2)
+    states = shades(states)
+    differ = self.shown[cells[:, 0], cells[:, 1]] != states
+    if not differ.any():
+      return
+    cells = cells[differ]
+    self.shown[cells[:, 0], cells[:, 1]] = states[differ]
+    for xmin, ymin, xmax, ymax in dirty_boxes(cells, self.tile):
+      self.blit(xmin, ymin, xmax, ymax)
+
+  # Draw live cells already known to show dead and vice versa
+  def toggle_cells ( self, cells ):
+    cells = np.asarray(cells).reshape(-1, 2)
+    self.draw_cells(cells, LIVE_SHADE - self.shown[cells[:, 0], cells[:, 1]])
+
+  # Draw the rectangle of cells whose upper left corner is at x, y
+  # states - 2D Numpy array of bools, live fractions or shades for the region
+  def draw_region ( self, x, y, states ):
+    states = shades(states)
+    self.shown[x:x+states.shape[0], y:y+states.shape[1]] = states
+    self.blit(x, y, x+states.shape[0], y+states.shape[1])
+
+  # Draw a whole board, touching only the tiles that differ from what is shown
+  def draw_array ( self, life ):
+    life = shades(life)
+    cells = np.argwhere(life != self.shown)
+    self.draw_cells(cells, life[cells[:, 0], cells[:, 1]])
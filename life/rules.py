@@ -0,0 +1,95 @@
+import re
+
+import numpy as np
+
+
+#### Life-like Rules ####
+#
+# A rule is the set of neighbour counts that bring a dead cell to life
+# (birth) and the set that keep a live cell alive (survival), written in B/S
+# notation: B3/S23 is Conway's Life, B36/S23 HighLife, B3678/S34678 Day &
+# Night.  The older S/B form '23/3' is accepted too.
+#
+# A Rule only describes the rule.  Each engine compiles it into its own fast
+# form (a box-sum table for the vectorised boards, word logic for the packed
+# board, a leaf table for the HashLife engines) and caches that per rule.
+#
+# Rules with B0 turn every empty region on each step, which only a bounded
+# board can represent; the unbounded engines refuse them.
+
+# Well-known rules by name
+NAMED = {
+  'life': 'B3/S23',
+  'highlife': 'B36/S23',
+  'daynight': 'B3678/S34678',
+  'seeds': 'B2/S',
+  'replicator': 'B1357/S1357',
+  'maze': 'B3/S12345',
+  '2x2': 'B36/S125',
+}
+
+BS = re.compile(r'^B([0-8]*)/?S([0-8]*)$', re.I)
+SB = re.compile(r'^S([0-8]*)/?B([0-8]*)$', re.I)
+PLAIN = re.compile(r'^([0-8]*)/([0-8]*)$')
+
+class Rule():
+
+  # birth, survive - Neighbour counts, 0 to 8
+  def __init__ ( self, birth, survive ):
+    self.birth = frozenset(birth)
+    self.survive = frozenset(survive)
+    self.name = 'B%s/S%s' % (''.join(map(str, sorted(self.birth))), ''.join(map(str, sorted(self.survive))))
+
+    # Next state by [alive, neighbour count]
+    self.next = np.zeros((2, 9), dtype=bool)
+    self.next[0, list(self.birth)] = True
+    self.next[1, list(self.survive)] = True
+
+  def __eq__ ( self, other ):
+    return isinstance(other, Rule) and self.name == other.name
+
+  def __hash__ ( self ):
+    return hash(self.name)
+
+  def __repr__ ( self ):
+    return 'Rule(%r)' % self.name
+
+  def __str__ ( self ):
+    return self.name
+
+  # Whether this is B3/S23, which several engines have hand-written paths for
+  @property
+  def conway ( self ):
+    return self.name == 'B3/S23'
+
+  # Whether empty space comes alive
+  @property
+  def births_from_nothing ( self ):
+    return 0 in self.birth
+
+# Parse a rule in B/S or S/B notation, or by name.  Rule objects are passed through.
+def parse ( text ):
+  if isinstance(text, Rule):
+    return text
+  key = text.strip()
+  key = NAMED.get(key.lower(), key)
+  m = BS.match(key)
+  if m:
+    birth, survive = m.group(1), m.group(2)
+  else:
+    m = SB.match(key) or PLAIN.match(key)
+    if not m:
+      raise ValueError('Unrecognised rule %r, expected B/S notation such as B3/S23' % text)
+    survive, birth = m.group(1), m.group(2)
+  return Rule(map(int, birth), map(int, survive))
+
+CONWAY = parse('B3/S23')
+
+# The rule for an engine constructor argument, Conway's Life for None
+def rule_of ( rule ):
+  return CONWAY if rule is None else parse(rule)
+
+# Raise ValueError for rules an unbounded engine cannot run
+def require_bounded ( rule, engine ):
+  if rule.births_from_nothing:
+    raise ValueError('%s births cells from nothing, which the unbounded %s engine cannot represent' % (rule.name, engine))
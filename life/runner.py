@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+
+
+#### Background Runner ####
+#
+# Steps a Simulation on its own thread and hands frames to a consumer through
+# a bounded queue.  A frame is (generation, snapshot) where snapshot is
+# whatever the snapshot callable returns for the simulation, typically the
+# visible window as an array.  When the consumer falls behind, the oldest
+# queued frame is dropped to make room, and the consumer only ever shows the
+# newest frame it finds, so neither side waits on the other.
+#
+# rate is the target in generations per second, None to run at full speed.
+
+class Runner():
+
+  # sim - life.sim.Simulation to step
+  # snapshot - Called with the simulation after each step, under sim.lock
+  # depth - Frames held before the oldest is dropped
+  # ptime - Print the duration of each step
+  def __init__ ( self, sim, snapshot, rate=None, depth=2, ptime=False ):
+    self.sim = sim
+    self.snapshot = snapshot
+    self.rate = rate
+    self.frames = queue.Queue(maxsize=depth)
+    self.ptime = ptime
+
+    # Frames dropped by the producer or skipped by the consumer
+    self.dropped = 0
+
+    self.running = threading.Event()
+    self.stopped = threading.Event()
+    self.thread = threading.Thread(target=self.loop, name='life-runner', daemon=True)
+
+    sim.subscribe(self.publish)
+
+  def start ( self ):
+    self.thread.start()
+
+  # Stop the thread and wait for its current step to finish
+  def stop ( self ):
+    self.stopped.set()
+    self.running.set()
+    if self.thread.is_alive():
+      self.thread.join()
+    self.sim.unsubscribe(self.publish)
+
+  def pause ( self ):
+    self.running.clear()
+
+  def resume ( self ):
+    self.running.set()
+
+  def is_running ( self ):
+    return self.running.is_set()
+
+  def loop ( self ):
+    deadline = time.perf_counter()
+    while True:
+      self.running.wait()
+      if self.stopped.is_set():
+        return
+      ttime = time.perf_counter()
+      self.sim.step()
+      if self.ptime:
+        print(time.perf_counter() - ttime)
+      # A subscriber such as a CycleWatch asked for the simulation to stop
+      if self.sim.halted:
+        self.sim.halted = False
+        self.pause()
+
+      # Sleep until the next generation is due.  After a stall the schedule
+      #  restarts from now rather than bursting to catch up.
+      rate = self.rate
+      if rate:
+        deadline = max(deadline + 1./rate, time.perf_counter() - 1./rate)
+        wait = deadline - time.perf_counter()
+        if wait > 0:
+          self.stopped.wait(wait)
+      else:
+        deadline = time.perf_counter()
+
+  # Queue a snapshot of the simulation, dropping the oldest queued frame if full.
+  #  Subscribed to the simulation, so it runs after every step.
+  def publish ( self, sim ):
+    frame = (sim.generation, self.snapshot(sim))
+    while True:
+      try:
+        self.frames.put_nowait(frame)
+        return
+      except queue.Full:
+        try:
+          self.frames.get_nowait()
+          self.dropped += 1
+        except queue.Empty:
+          pass
+
+  # The newest queued frame, or None if nothing arrived since the last call.
+  #  Older queued frames are discarded.
+  def latest ( self ):
+    frame = None
+    while True:
+      try:
+        newer = self.frames.get_nowait()
+      except queue.Empty:
+        return frame
+      if frame is not None:
+        self.dropped += 1
+      frame = newer
+
+  # Discard queued frames, e.g. after the board was edited
+  def flush ( self ):
+    self.latest()
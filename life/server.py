@@ -0,0 +1,435 @@
+import asyncio
+import io
+import json
+import os
+import socket
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from life import formats
+from life.sim import engine_name
+
+
+#### Simulation Server ####
+#
+# Serves one Simulation to any number of local clients, so tools can share a
+# warm engine (a HashLife memo in particular) rather than each building its
+# own.  The server listens on a Unix socket or a localhost TCP port.
+#
+# Requests from every connection go into one queue.  A single worker thread
+# takes everything queued at once as a batch and runs it under the
+# simulation's lock, while the next batch queues behind it.  Within a batch
+# requests keep their order, except that:
+#
+#  - Consecutive advances are made as one step of their total, which HashLife
+#    jumps in one go; each is answered with the generation reached.
+#  - The same region asked for twice of the same board is read once.
+#
+# Engines other than HashLife step one generation at a time, so a batch
+# advances them at most MAX_STEPS generations.  The rest of a longer step, and
+# the requests after it, are carried over to the next batch, where requests
+# newly queued on other connections run first.  One client's long step then
+# holds up the others by no more than MAX_STEPS generations at a time.
+#
+# Messages are frames: a u32 length, then that many bytes.  All integers are
+# little-endian.  A request is
+#
+#   u32 id, u8 op, arguments
+#
+# and its reply is
+#
+#   u32 id, u8 status (OK or ERROR), result, or a UTF-8 message for ERROR
+#
+#  LOAD - i64 x, i64 y, u8 kind, data.  kind 0 is the live cells as int32
+#         (x, y) pairs relative to x, y; 1 to 3 are RLE, plaintext and
+#         Macrocell text.  The served rule is kept unless SET_RULE is added
+#         to kind, when a rule named by the text replaces it.  Returns u64
+#         generation, u64 population.
+#  STEP - u64 generations.  Returns u64 generation, u64 population.
+#  REGION - i64 x, i64 y, u32 w, u32 h, u8 level: w x h blocks of 2^level
+#           cells from block x, y, as for density().  Returns u64 generation,
+#           then at level 0 the cells bit-packed (np.packbits, [x, y] order),
+#           otherwise one u8 per block, its live fraction scaled to 0-255.
+#  INFO - Returns JSON with the engine, rule, generation and population.
+#  CLEAR - Returns u64 generation, u64 population.
+#
+# Replies on a connection are sent as they are ready and matched to their
+# requests by id, so a client may send several requests before reading.
+
+LOAD, STEP, REGION, INFO, CLEAR = 1, 2, 3, 4, 5
+OK, ERROR = 0, 1
+
+# Kinds of LOAD data, and readers of pattern text by kind
+CELLS, RLE, PLAINTEXT, MACROCELL = 0, 1, 2, 3
+SET_RULE = 0x80
+READERS = {RLE: formats.read_rle, PLAINTEXT: formats.read_plaintext, MACROCELL: formats.read_macrocell}
+KINDS = {'rle': RLE, 'plaintext': PLAINTEXT, 'macrocell': MACROCELL}
+
+# Longest frame accepted, most blocks in a region, and most generations a
+#  batch steps an engine without step_pow2
+MAX_FRAME = 2**28
+MAX_REGION = 2**26
+MAX_STEPS = 128
+
+COUNTS = struct.Struct('<QQ')
+
+def frame ( body ):
+  return struct.pack('<I', len(body)) + body
+
+# Arguments of a request, raising ValueError for a malformed one
+def decode_request ( op, data ):
+  try:
+    if op == LOAD:
+      x, y, kind = struct.unpack_from('<qqB', data)
+      setRule = bool(kind & SET_RULE)
+      kind &= ~SET_RULE
+      data = data[17:]
+      if kind == CELLS:
+        return x, y, kind, np.frombuffer(data, dtype='<i4').reshape(-1, 2).astype(np.int64), setRule
+      if kind not in READERS:
+        raise ValueError('Unknown pattern kind %d' % kind)
+      return x, y, kind, data.decode('utf-8'), setRule
+    if op == STEP:
+      return struct.unpack('<Q', data)
+    if op == REGION:
+      x, y, w, h, level = struct.unpack('<qqIIB', data)
+      if w*h > MAX_REGION:
+        raise ValueError('Region of %d blocks is larger than %d' % (w*h, MAX_REGION))
+      return x, y, w, h, level
+    if op in (INFO, CLEAR):
+      return ()
+  except (struct.error, UnicodeDecodeError) as e:
+    raise ValueError('Malformed request: %s' % e)
+  raise ValueError('Unknown request %d' % op)
+
+class Server():
+
+  # sim - life.sim.Simulation to serve
+  def __init__ ( self, sim ):
+    self.sim = sim
+    self.requests = None
+    self.server = None
+    self.batcher = None
+    self.path = None
+    # Writers of the open connections
+    self.writers = set()
+    self.executor = ThreadPoolExecutor(1, thread_name_prefix='life-server')
+
+    # Batches run and requests answered
+    self.batches = 0
+    self.served = 0
+
+  # Listen on the Unix socket path, or else on host and port (0 for any free
+  #  port).  Returns the address clients connect to.
+  async def start ( self, path=None, host='127.0.0.1', port=0 ):
+    self.requests = asyncio.Queue()
+    if path is not None:
+      self.path = path
+      self.server = await asyncio.start_unix_server(self.connection, path)
+    else:
+      self.server = await asyncio.start_server(self.connection, host, port)
+    self.batcher = asyncio.ensure_future(self.batch_loop())
+    return self.address
+
+  @property
+  def address ( self ):
+    if self.path is not None:
+      return self.path
+    return self.server.sockets[0].getsockname()[:2]
+
+  async def close ( self ):
+    self.server.close()
+    for writer in list(self.writers):
+      writer.close()
+    await self.server.wait_closed()
+    self.batcher.cancel()
+    self.executor.shutdown()
+    if self.path is not None and os.path.exists(self.path):
+      os.unlink(self.path)
+
+  # Serve until cancelled
+  async def serve_forever ( self ):
+    await self.server.serve_forever()
+
+  # Read a connection's requests into the queue, replying to each when done
+  async def connection ( self, reader, writer ):
+    loop = asyncio.get_running_loop()
+    replies = set()
+    self.writers.add(writer)
+    try:
+      while True:
+        try:
+          n, = struct.unpack('<I', await reader.readexactly(4))
+          if n < 5 or n > MAX_FRAME:
+            break
+          body = await reader.readexactly(n)
+        except asyncio.IncompleteReadError:
+          break
+        rid, op = struct.unpack_from('<IB', body)
+        future = loop.create_future()
+        try:
+          await self.requests.put((op, decode_request(op, body[5:]), future, writer))
+        except ValueError as e:
+          future.set_result((ERROR, str(e).encode('utf-8')))
+        task = asyncio.ensure_future(self.reply(writer, rid, future))
+        replies.add(task)
+        task.add_done_callback(replies.discard)
+      if replies:
+        await asyncio.gather(*replies)
+    except ConnectionError:
+      pass
+    finally:
+      self.writers.discard(writer)
+      writer.close()
+
+  async def reply ( self, writer, rid, future ):
+    status, result = await future
+    try:
+      writer.write(frame(struct.pack('<IB', rid, status) + result))
+      await writer.drain()
+    except ConnectionError:
+      pass
+
+  # Run whatever has queued up as one batch, repeatedly.  Queued requests
+  #  are (op, args, future, writer of the connection).
+  async def batch_loop ( self ):
+    loop = asyncio.get_running_loop()
+    # Requests carried over from the last batch, see above
+    carried = []
+    while True:
+      if carried:
+        # Let the connections queue what they have read
+        await asyncio.sleep(0)
+        fresh = []
+      else:
+        fresh = [await self.requests.get()]
+      while not self.requests.empty():
+        fresh.append(self.requests.get_nowait())
+      # Requests on a connection with some carried over stay behind them
+      waiting = {request[3] for request in carried}
+      batch = ([request for request in fresh if request[3] not in waiting] + carried +
+               [request for request in fresh if request[3] in waiting])
+      try:
+        results, rest = await loop.run_in_executor(self.executor, self.run_batch, [(op, args) for op, args, _, _ in batch])
+      except Exception as e:
+        results, rest = [(ERROR, (str(e) or type(e).__name__).encode('utf-8'))] * len(batch), []
+      for (_, _, future, _), result in zip(batch, results):
+        if not future.cancelled():
+          future.set_result(result)
+      carried = [(op, args, future, writer) for (op, args), (_, _, future, writer) in zip(rest, batch[len(results):])]
+      self.batches += 1
+      self.served += len(results)
+
+
+  #### Requests ####
+  #
+  # Run on the worker thread.
+
+  # Run a batch of (op, args), returning (status, result) for each of the
+  #  requests run and the (op, args) of those carried over to the next batch
+  def run_batch ( self, requests ):
+    results = []
+    regions = {}
+    with self.sim.lock:
+      i = 0
+      while i < len(requests):
+        op, args = requests[i]
+        if op == STEP:
+          j = i
+          while j < len(requests) and requests[j][0] == STEP:
+            j += 1
+          steps = [n for _, (n,) in requests[i:j]]
+          limited = not hasattr(self.sim.engine, 'step_pow2') and sum(steps) > MAX_STEPS
+          try:
+            self.sim.step(MAX_STEPS if limited else sum(steps))
+          except Exception as e:
+            results.extend([(ERROR, (str(e) or type(e).__name__).encode('utf-8'))] * (j-i))
+            i = j
+            continue
+          if not limited:
+            results.extend([(OK, self.counts())] * (j-i))
+            i = j
+            continue
+          # Answer the steps that are done, and carry over the rest of the
+          #  one under way along with everything after it
+          done = MAX_STEPS
+          while steps[0] <= done:
+            done -= steps.pop(0)
+            results.append((OK, self.counts()))
+            i += 1
+          return results, [(STEP, (steps[0] - done,))] + requests[i+1:]
+        # A request that fails for any reason is refused on its own, the
+        #  server carries on
+        try:
+          results.append((OK, self.handle(op, args, regions)))
+        except Exception as e:
+          results.append((ERROR, (str(e) or type(e).__name__).encode('utf-8')))
+        i += 1
+    return results, []
+
+  def handle ( self, op, args, regions ):
+    engine = self.sim.engine
+    if op == LOAD:
+      self.sim.edit(self.load, *args)
+      return self.counts()
+    if op == REGION:
+      key = (args, engine.generation, self.sim.edits)
+      if key not in regions:
+        regions[key] = struct.pack('<Q', engine.generation) + self.region(*args)
+      return regions[key]
+    if op == INFO:
+      return json.dumps({'engine': engine_name(engine), 'rule': formats.engine_rule(engine), 'generation': engine.generation,
+                         'population': int(engine.population)}).encode('utf-8')
+    self.sim.edit(engine.clear)
+    return self.counts()
+
+  def counts ( self ):
+    return COUNTS.pack(self.sim.engine.generation, int(self.sim.engine.population))
+
+  def load ( self, x, y, kind, data, setRule ):
+    engine = self.sim.engine
+    if kind == CELLS:
+      formats.place(engine, data, x, y)
+    else:
+      READERS[kind](io.StringIO(data), engine, x, y, setRule=setRule)
+
+  def region ( self, x, y, w, h, level ):
+    engine = self.sim.engine
+    if level == 0:
+      return np.packbits(engine.window(x, y, w, h)).tobytes()
+    return np.rint(engine.density(x, y, w, h, level) * 255).astype(np.uint8).tobytes()
+
+# Run a server for sim until interrupted, on the Unix socket path or else on
+#  host and port.  ready(address) is called once it is listening.
+def serve ( sim, path=None, host='127.0.0.1', port=0, ready=None ):
+  async def main ():
+    server = Server(sim)
+    address = await server.start(path, host, port)
+    if ready is not None:
+      ready(address)
+    try:
+      await server.serve_forever()
+    finally:
+      await server.close()
+  try:
+    asyncio.run(main())
+  except KeyboardInterrupt:
+    pass
+
+#### Client ####
+#
+# A blocking client for scripts and tools.  Each method sends its request
+# and waits for the reply; send() and wait() split the two, so several
+# requests can be in flight at once:
+#
+#  tickets = [client.send('step', 100), client.send('region', 0, 0, 64, 64)]
+#  results = [client.wait(t) for t in tickets]
+#
+# Requests the server refuses raise ValueError with its message.
+
+class Client():
+
+  # address - Path of a Unix socket, or (host, port)
+  def __init__ ( self, address, timeout=None ):
+    if isinstance(address, str):
+      self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      self.sock.settimeout(timeout)
+      self.sock.connect(address)
+    else:
+      self.sock = socket.create_connection(address, timeout)
+    self.file = self.sock.makefile('rb')
+    self.nextId = 0
+    # Replies read while waiting for another, by id
+    self.replies = {}
+
+  def close ( self ):
+    self.file.close()
+    self.sock.close()
+
+  # Turn on cells, given as an (n, 2) array of coordinates, a 2D bool array,
+  #  or pattern text, with its upper left corner at x, y (Macrocell: centred).
+  #  Returns (generation, population).
+  # fmt - Format of pattern text: 'rle', 'plaintext' or 'macrocell'
+  # setRule - Switch the served rule to the one the text names
+  def load ( self, pattern, x=0, y=0, fmt='rle', setRule=False ):
+    return self.call('load', pattern, x, y, fmt, setRule)
+
+  # Advance n generations, returning (generation, population)
+  def step ( self, n=1 ):
+    return self.call('step', n)
+
+  # (generation, states) for the w x h blocks of 2^level cells from block x, y:
+  #  a bool array at level 0, live fractions above it
+  def region ( self, x, y, w, h, level=0 ):
+    return self.call('region', x, y, w, h, level)
+
+  def info ( self ):
+    return self.call('info')
+
+  def clear ( self ):
+    return self.call('clear')
+
+  def call ( self, name, *args ):
+    return self.wait(self.send(name, *args))
+
+  # Send a request without waiting for the reply, returning a ticket for wait()
+  def send ( self, name, *args ):
+    op, body = getattr(self, 'encode_' + name)(*args)
+    rid = self.nextId
+    self.nextId = (rid + 1) % 2**32
+    self.sock.sendall(frame(struct.pack('<IB', rid, op) + body))
+    return rid, name, args
+
+  # Wait for the reply to a ticket from send() and decode it
+  def wait ( self, ticket ):
+    rid, name, args = ticket
+    while rid not in self.replies:
+      n, = struct.unpack('<I', self.read(4))
+      body = self.read(n)
+      other, status = struct.unpack_from('<IB', body)
+      self.replies[other] = (status, body[5:])
+    status, result = self.replies.pop(rid)
+    if status != OK:
+      raise ValueError(result.decode('utf-8'))
+    if name == 'region':
+      return self.decode_region(result, *args)
+    if name == 'info':
+      return json.loads(result.decode('utf-8'))
+    return COUNTS.unpack(result)
+
+  def read ( self, n ):
+    data = self.file.read(n)
+    if len(data) < n:
+      raise ConnectionError('Server closed the connection')
+    return data
+
+  def encode_load ( self, pattern, x=0, y=0, fmt='rle', setRule=False ):
+    if isinstance(pattern, str):
+      if fmt not in KINDS:
+        raise ValueError('Unknown pattern format %r, expected one of %s' % (fmt, ', '.join(sorted(KINDS))))
+      kind = KINDS[fmt] | (SET_RULE if setRule else 0)
+      return LOAD, struct.pack('<qqB', x, y, kind) + pattern.encode('utf-8')
+    pattern = np.asarray(pattern)
+    cells = np.argwhere(pattern) if pattern.dtype == bool else pattern.reshape(-1, 2)
+    return LOAD, struct.pack('<qqB', x, y, CELLS) + cells.astype('<i4').tobytes()
+
+  def encode_step ( self, n=1 ):
+    return STEP, struct.pack('<Q', int(n))
+
+  def encode_region ( self, x, y, w, h, level=0 ):
+    return REGION, struct.pack('<qqIIB', x, y, w, h, level)
+
+  def encode_info ( self ):
+    return INFO, b''
+
+  def encode_clear ( self ):
+    return CLEAR, b''
+
+  def decode_region ( self, result, x, y, w, h, level=0 ):
+    generation, = struct.unpack_from('<Q', result)
+    data = np.frombuffer(result, dtype=np.uint8, offset=8)
+    if level == 0:
+      return generation, np.unpackbits(data, count=w*h).view(bool).reshape(w, h)
+    return generation, (data.reshape(w, h) / np.float32(255)).astype(np.float32)
@@ -0,0 +1,158 @@
+import threading
+
+
+#### Simulation Core ####
+#
+# A Simulation drives one engine and tells its subscribers after every step.
+# Engines share a small interface: step(), generation, population, cells(),
+# window(), density() (live fractions of blocks, for zoomed-out views),
+# place_pattern(), toggle(), get_cell(), clear(), and rule with set_rule()
+# (see life.rules).  Viewers, writers and batch jobs subscribe to a
+# Simulation instead of owning the stepping loop, so none of them needs Tk.
+#
+# A Simulation may be stepped from a worker thread (see life.runner); anything
+# else touching the engine meanwhile should hold sim.lock.  Edits between
+# steps go through edit(), which counts them so observers caching anything
+# about the board (see life.analytics) know to look again.
+
+# Engine names accepted by make_engine
+ENGINES = ('dense', 'packed', 'sparse', 'parallel', 'hashgrid', 'hashlife')
+
+# Build an engine by name
+# pow2 - Bounded engines are 2^pow2 cells per side
+# workers - Worker processes for the 'parallel' engine
+# cacheBytes - Memo budget for the 'hashgrid' engine
+# rule - life.rules.Rule or B/S string, Conway's Life by default
+# boundary - Edges of the dense, packed and parallel boards: 'dead' (a dead
+#  one-cell border), 'torus' or 'reflect', see life.vector.  The other engines
+#  only have dead borders or no edges at all.
+def make_engine ( name, pow2=8, workers=None, cacheBytes=2**28, rule=None, boundary='dead' ):
+  if boundary != 'dead' and name not in ('dense', 'packed', 'parallel'):
+    raise ValueError('The %s engine only supports a dead boundary' % name)
+  if name == 'dense':
+    from life.vector import Board
+    return Board(2**pow2, rule, boundary)
+  if name == 'packed':
+    from life.bitboard import BitBoard
+    return BitBoard(2**pow2, rule, boundary)
+  if name == 'sparse':
+    from life.sparse import SparseLife
+    return SparseLife(rule)
+  if name == 'parallel':
+    from life.parallel import ParallelBoard
+    return ParallelBoard(2**pow2, workers, rule, boundary)
+  if name == 'hashgrid':
+    from life.hashgrid import HashGrid
+    return HashGrid(pow2, cacheBytes, rule)
+  if name == 'hashlife':
+    from life.quadtree import Universe
+    return Universe(rule=rule)
+  raise ValueError('Unknown engine %r, expected one of %s' % (name, ', '.join(ENGINES)))
+
+# Engine classes by name, the inverse of make_engine
+CLASS_ENGINES = {'Board': 'dense', 'BitBoard': 'packed', 'SparseLife': 'sparse',
+                 'ParallelBoard': 'parallel', 'HashGrid': 'hashgrid', 'Universe': 'hashlife'}
+
+# Name make_engine knows an engine by
+def engine_name ( engine ):
+  return CLASS_ENGINES[type(engine).__name__]
+
+class Simulation():
+
+  def __init__ ( self, engine ):
+    self.engine = engine
+    self.subscribers = []
+    # Subscribers that see every generation, see subscribe
+    self.everyGeneration = []
+    self.lock = threading.RLock()
+
+    # Generation the current run() is heading for, and whether it was told to stop
+    self.target = None
+    self.halted = False
+    # Number of edits made through edit()
+    self.edits = 0
+
+  @property
+  def generation ( self ):
+    return self.engine.generation
+
+  # Call callback(simulation) after every step
+  # everyGeneration - Call it after every generation instead.  While such a
+  #  subscriber is attached, step(n) advances one generation at a time, HashLife
+  #  included, and notifies after each.
+  def subscribe ( self, callback, everyGeneration=False ):
+    self.subscribers.append(callback)
+    if everyGeneration:
+      self.everyGeneration.append(callback)
+    return callback
+
+  def unsubscribe ( self, callback ):
+    self.subscribers.remove(callback)
+    if callback in self.everyGeneration:
+      self.everyGeneration.remove(callback)
+
+  def notify ( self ):
+    for callback in list(self.subscribers):
+      callback(self)
+
+  # Apply change(*args) to the board between steps, returning its result
+  def edit ( self, change, *args ):
+    with self.lock:
+      self.edits += 1
+      return change(*args)
+
+  # Advance n generations, then notify subscribers once.  The quadtree engine
+  #  jumps all n at once, the others step one generation at a time.  With a
+  #  subscriber that sees every generation, every engine steps one at a time
+  #  and subscribers are notified after each.
+  def step ( self, n=1 ):
+    n = int(n)
+    if n <= 0:
+      return
+    with self.lock:
+      if self.everyGeneration:
+        end = self.generation + n
+        # A subscriber may stop the step, or fast-forward a run past its end.
+        #  Outside run() a stop only ends the step it was asked in.
+        if self.target is None:
+          self.halted = False
+        while not self.halted and self.generation < end:
+          if hasattr(self.engine, 'step_pow2'):
+            self.engine.step(1)
+          else:
+            self.engine.step()
+          self.notify()
+        return
+      if hasattr(self.engine, 'step_pow2'):
+        self.engine.step(n)
+      else:
+        for _ in range(n):
+          self.engine.step()
+      self.notify()
+
+  # Advance the given number of generations in steps of at most chunk
+  #  generations, notifying subscribers after each.  Ends early if a
+  #  subscriber calls stop().
+  def run ( self, generations, chunk=None ):
+    self.target = self.generation + int(generations)
+    self.halted = False
+    while not self.halted and self.generation < self.target:
+      n = self.target - self.generation
+      self.step(n if chunk is None else min(chunk, n))
+    self.target = None
+
+  # Ask run() to return after the current step
+  def stop ( self ):
+    self.halted = True
+
+  # The board repeats every period generations: move the generation counter
+  #  forward by as many whole periods as fit before the end of the current run
+  def fast_forward ( self, period ):
+    if self.target is not None:
+      self.engine.generation += (self.target - self.generation) // period * period
+
+  # Stop any worker processes the engine holds
+  def close ( self ):
+    close = getattr(self.engine, 'close', None)
+    if close is not None:
+      close()
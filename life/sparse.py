@@ -0,0 +1,161 @@
+import numpy as np
+
+from life import rules
+
+
+#### Sparse Unbounded Universe ####
+#
+# Only live cells are stored, as a sorted array of int64 keys packing the
+# x and y coordinates.  A generation only looks at live cells and their
+# neighbours, taking the dead-neighbourhood skipping of ConwayLife's old
+# update_grid to its limit: cost scales with population rather than area and
+# there is no border, so patterns can travel indefinitely.
+#
+# Coordinates may be anywhere in [-2^31, 2^31).
+
+OFFSET = 2**31
+MASK = 2**32 - 1
+
+# Key of each (x, y) pair
+def encode ( xs, ys ):
+  return ((np.asarray(xs, dtype=np.int64) + OFFSET) << 32) | (np.asarray(ys, dtype=np.int64) + OFFSET)
+
+# (n, 2) array of the coordinates of each key.  Keys for x >= 0 wrap around
+#  to negative int64s, which is harmless as they stay unique.
+def decode ( keys ):
+  return np.stack((((keys >> 32) & MASK) - OFFSET, (keys & MASK) - OFFSET), axis=1)
+
+# Key differences to the 8 neighbours of a cell
+NEIGHBORS = np.array([(dx << 32) + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy], dtype=np.int64)
+
+# Neighbour counts at which a cell lives under a rule, as masks indexed by
+#  count: (either state, dead only, alive only), for each life.rules.Rule
+COUNT_RULES = {}
+
+def count_rule ( rule ):
+  compiled = COUNT_RULES.get(rule)
+  if compiled is None:
+    born, kept = rule.next
+    compiled = (born & kept, born & ~kept, kept & ~born)
+    COUNT_RULES[rule] = compiled
+  return compiled
+
+class SparseLife():
+
+  # rule - life.rules.Rule or B/S string, Conway's Life by default
+  def __init__ ( self, rule=None ):
+    self.keys = np.zeros(0, dtype=np.int64)
+    self.changed = np.zeros(0, dtype=np.int64)
+    self.generation = 0
+    self.set_rule(rule)
+
+  #### Game Logic ####
+
+  # Switch to another rule, given as a life.rules.Rule or B/S string
+  def set_rule ( self, rule ):
+    rule = rules.rule_of(rule)
+    rules.require_bounded(rule, 'sparse')
+    self.rule = rule
+    self.counts = count_rule(rule)
+
+  # Advance one generation, returning the keys of changed cells
+  def step ( self ):
+    counts = (self.keys[:, np.newaxis] + NEIGHBORS).ravel()
+    cells, counts = np.unique(counts, return_counts=True)
+
+    # Cells with a neighbour count in both the birth and survival sets live
+    #  whatever their current state, the rest only if dead or alive now
+    #  (for B3/S23, three neighbours and two if alive).
+    either, dead, alive = self.counts
+    parts = [cells[either[counts]]]
+    if dead.any():
+      born = cells[dead[counts]]
+      parts.append(born[~np.isin(born, self.keys, assume_unique=True)])
+    if alive.any():
+      kept = cells[alive[counts]]
+      parts.append(kept[np.isin(kept, self.keys, assume_unique=True)])
+    if alive[0]:
+      # Live cells with no neighbours are not among the counted cells
+      parts.append(self.keys[~np.isin(self.keys, cells, assume_unique=True)])
+    new = np.sort(np.concatenate(parts))
+
+    self.changed = np.setxor1d(self.keys, new, assume_unique=True)
+    self.keys = new
+    self.generation += 1
+    return self.changed
+
+  # Coordinates of the cells changed by the last step as an (n, 2) array
+  def changed_cells ( self ):
+    return decode(self.changed)
+
+  #### Cell Access ####
+
+  @property
+  def population ( self ):
+    return len(self.keys)
+
+  def get_cell ( self, x, y ):
+    key = encode(x, y)
+    i = np.searchsorted(self.keys, key)
+    return bool(i < len(self.keys) and self.keys[i] == key)
+
+  def set_cell ( self, x, y, alive ):
+    key = encode([x], [y])
+    if alive:
+      self.keys = np.union1d(self.keys, key)
+    else:
+      self.keys = np.setdiff1d(self.keys, key, assume_unique=True)
+
+  # Place a pattern with its upper left corner at x, y, overwriting the cells beneath it.
+  #  The universe is unbounded so this always succeeds.
+  # pat - 2D Numpy array of bools specifying pattern
+  def place_pattern ( self, pat, x, y ):
+    pat = np.asarray(pat, dtype=bool)
+    xs, ys = np.nonzero(pat)
+    cells = self.cells()
+    inside = ((cells[:, 0] >= x) & (cells[:, 0] < x+pat.shape[0]) &
+              (cells[:, 1] >= y) & (cells[:, 1] < y+pat.shape[1]))
+    self.keys = np.union1d(self.keys[~inside], encode(xs+x, ys+y))
+    return True
+
+  # Turn on the cells at coordinates cells ((n, 2) array of x, y)
+  def add_cells ( self, cells ):
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    self.keys = np.union1d(self.keys, encode(cells[:, 0], cells[:, 1]))
+    return True
+
+  # Toggle a cell, returning its new state
+  def toggle ( self, x, y ):
+    alive = not self.get_cell(x, y)
+    self.set_cell(x, y, alive)
+    return alive
+
+  def clear ( self ):
+    self.keys = np.zeros(0, dtype=np.int64)
+
+  # Coordinates of every live cell as an (n, 2) array
+  def cells ( self ):
+    return decode(self.keys)
+
+  # Return (xmin, ymin, xmax, ymax) enclosing every live cell, or None if there are none
+  def bounding_box ( self ):
+    if len(self.keys) == 0:
+      return None
+    cells = self.cells()
+    return (int(cells[:, 0].min()), int(cells[:, 1].min()), int(cells[:, 0].max())+1, int(cells[:, 1].max())+1)
+
+  # Return the cells in the rectangle [x, x+w) x [y, y+h) as an array of bools
+  def window ( self, x, y, w, h ):
+    out = np.zeros((w, h), dtype=bool)
+    cells = self.cells() - (x, y)
+    inside = (cells[:, 0] >= 0) & (cells[:, 0] < w) & (cells[:, 1] >= 0) & (cells[:, 1] < h)
+    out[cells[inside, 0], cells[inside, 1]] = True
+    return out
+
+  # Live fraction of each 2^level x 2^level block in the w x h blocks whose
+  #  upper left block is block x, y, that is cell x*2^level, y*2^level
+  def density ( self, x, y, w, h, level ):
+    blocks = (self.cells() >> level) - (x, y)
+    inside = (blocks[:, 0] >= 0) & (blocks[:, 0] < w) & (blocks[:, 1] >= 0) & (blocks[:, 1] < h)
+    counts = np.bincount(blocks[inside, 0]*h + blocks[inside, 1], minlength=w*h)
+    return (counts / float(4**level)).astype(np.float32).reshape(w, h)
@@ -0,0 +1,325 @@
+import numpy as np
+
+from life import rules
+
+
+#### Vectorised Stepping ####
+#
+# Boards are 2D numpy arrays of bools indexed [x, y], as ConwayLife draws them.
+# What lies beyond the edges is set by the boundary:
+#
+#  dead - The outermost ring of cells is a permanently dead border, so only
+#         the interior [1:-1, 1:-1] is ever evolved.
+#  torus - The board wraps around: the neighbours off one edge are the cells
+#          along the opposite edge.
+#  reflect - The board is mirrored at its edges: the neighbour off an edge is
+#            the edge cell itself.
+#
+# With torus and reflect every cell evolves.  Their edge rows and columns are
+# summed from the cells across the board, never from a padded copy, so a
+# generation costs the same as with a dead border.
+
+BOUNDARIES = ('dead', 'torus', 'reflect')
+
+# Cells at each edge of a board that are not evolved
+def margin ( boundary ):
+  if boundary not in BOUNDARIES:
+    raise ValueError('Unknown boundary %r, expected one of %s' % (boundary, ', '.join(BOUNDARIES)))
+  return 1 if boundary == 'dead' else 0
+
+# Sum of each cell and its 8 neighbours for every interior cell.
+#  The 3x3 box is built from shifted slices: first the three cells of each
+#  column triple, then three of those rows.  No padded copy of the board is made.
+def box_sum ( life ):
+  cells = life.view(np.uint8)
+  rows = cells[:, :-2] + cells[:, 1:-1]
+  rows += cells[:, 2:]
+  box = rows[:-2] + rows[1:-1]
+  box += rows[2:]
+  return box
+
+# Sums of each cell and its two y neighbours for contiguous 2D uint8 cells,
+#  with the neighbours off the ends of each row at indices lo and hi.  The
+#  rows are summed as one flat run, then the two end columns, which that
+#  mixes with the adjacent rows, are redone.
+def row_sums ( cells, lo, hi ):
+  rows = np.empty_like(cells)
+  flat = cells.reshape(-1)
+  out = rows.reshape(-1)
+  np.add(flat[:-2], flat[1:-1], out=out[1:-1])
+  out[1:-1] += flat[2:]
+  rows[:, 0] = cells[:, lo] + cells[:, 0] + cells[:, 1]
+  rows[:, -1] = cells[:, -2] + cells[:, -1] + cells[:, hi]
+  return rows
+
+# Box sums, as box_sum, of every cell in rows [x0, x1) of a torus or reflect board
+def edge_box_sum ( life, boundary, x0=0, x1=None ):
+  cells = life.view(np.uint8)
+  n = cells.shape[0]
+  x1 = n if x1 is None else x1
+  torus = boundary == 'torus'
+  lo, hi = (-1, 0) if torus else (0, -1)
+
+  # The rows either side of the band, wrapped or mirrored at the edges
+  above = x0-1 if x0 > 0 else (n-1 if torus else 0)
+  below = x1 if x1 < n else (0 if torus else n-1)
+  band = row_sums(cells[x0:x1], lo, hi)
+  halo = row_sums(cells[[above, below]], lo, hi)
+
+  box = np.empty_like(band)
+  if len(band) == 1:
+    np.add(halo[0], band[0], out=box[0])
+    box[0] += halo[1]
+    return box
+  np.add(band[:-2], band[1:-1], out=box[1:-1])
+  box[1:-1] += band[2:]
+  box[0] = halo[0] + band[0] + band[1]
+  box[-1] = band[-2] + band[-1] + halo[1]
+  return box
+
+# Number of live neighbours of every interior cell
+def neighbor_count ( life ):
+  counts = box_sum(life)
+  counts -= life[1:-1, 1:-1]
+  return counts
+
+# Next state of a cell indexed by its 3x3 box sum, plus 10 if it is alive,
+#  for each life.rules.Rule.  This is the rule as life.parallel shares it.
+BOX_TABLES = {}
+
+def box_table ( rule ):
+  table = BOX_TABLES.get(rule)
+  if table is None:
+    table = np.zeros(20, dtype=bool)
+    table[0:9] = rule.next[0]
+    table[11:20] = rule.next[1]
+    BOX_TABLES[rule] = table
+  return table
+
+# Runs of consecutive values as (first, last) pairs
+def value_runs ( values ):
+  runs = []
+  for v in values:
+    if runs and runs[-1][1] == v-1:
+      runs[-1] = (runs[-1][0], v)
+    else:
+      runs.append((v, v))
+  return runs
+
+# Box sums at which a cell lives, split as life.bitboard.word_rule into
+#  (either state, dead only, alive only) and each given as value_runs(), from
+#  a box_table()
+def table_sums ( table ):
+  either, dead, kept = [], [], []
+  for s in range(10):
+    born, alive = bool(table[s]), bool(table[s+10])
+    if born and alive:
+      either.append(s)
+    elif born:
+      dead.append(s)
+    elif alive:
+      kept.append(s)
+  return value_runs(either), value_runs(dead), value_runs(kept)
+
+# table_sums() of each life.rules.Rule.  B3/S23 does not need them, see apply_rule.
+BOX_SUMS = {}
+
+def box_sums ( rule ):
+  sums = BOX_SUMS.get(rule)
+  if sums is None:
+    sums = BOX_SUMS[rule] = table_sums(box_table(rule))
+  return sums
+
+# OR into out the mask of box sums in [lo, hi], using term as scratch
+def match_sums ( box, lo, hi, out, term ):
+  if lo == hi:
+    np.equal(box, lo, out=term)
+  else:
+    # One unsigned comparison: box - lo wraps around below lo
+    code = term.view(np.uint8)
+    np.subtract(box, np.uint8(lo), out=code)
+    np.less_equal(code, hi-lo, out=term)
+  out |= term
+
+# Write the next state of cells with 3x3 box sums box and current states alive into out.
+#  box is overwritten.
+# sums - box_sums() of the rule, None for Conway's rules (B3/S23): with the
+#  box sum s including the cell itself, a cell is alive in the next generation
+#  when s == 3, or when it is alive and s == 4.  Other rules OR together the
+#  masks of the runs of box sums at which a cell lives; for those at which
+#  only a dead or only a live cell does, 16 is first added to the box sums of
+#  live cells, so each run is still matched on the box sums alone.
+def apply_rule ( box, alive, out, sums=None ):
+  if sums is None:
+    np.equal(box, 4, out=out)
+    out &= alive
+    out |= (box == 3)
+    return out
+  either, dead, kept = sums
+  out[...] = False
+  term = np.empty_like(out)
+  for lo, hi in either:
+    match_sums(box, lo, hi, out, term)
+  if dead or kept:
+    code = term.view(np.uint8)
+    np.multiply(alive.view(np.uint8), np.uint8(16), out=code)
+    box += code
+    for lo, hi in dead:
+      match_sums(box, lo, hi, out, term)
+    for lo, hi in kept:
+      match_sums(box, lo+16, hi+16, out, term)
+  return out
+
+# Apply the rule to the whole board at once.
+# life - 2D Numpy array of bools holding the current generation
+# out - Optional array to receive the next generation
+# sums - box_sums() of the rule, None for B3/S23
+# boundary - 'dead', 'torus' or 'reflect'
+# Returns the next generation and a mask of the cells that changed.
+def step ( life, out=None, sums=None, boundary='dead' ):
+  if out is None:
+    out = np.zeros_like(life)
+  if boundary == 'dead':
+    apply_rule(box_sum(life), life[1:-1, 1:-1], out[1:-1, 1:-1], sums)
+    out[0, :] = out[-1, :] = False
+    out[:, 0] = out[:, -1] = False
+  else:
+    apply_rule(edge_box_sum(life, boundary), life, out, sums)
+
+  changed = np.logical_xor(life, out)
+  return out, changed
+
+# Return the cells of life in the rectangle [x, x+w) x [y, y+h), dead outside the board
+def window ( life, x, y, w, h ):
+  out = np.zeros((w, h), dtype=bool)
+  x0, y0 = max(x, 0), max(y, 0)
+  x1, y1 = min(x+w, life.shape[0]), min(y+h, life.shape[1])
+  if x1 > x0 and y1 > y0:
+    out[x0-x:x1-x, y0-y:y1-y] = life[x0:x1, y0:y1]
+  return out
+
+# Live fraction of each 2^level x 2^level block of life in the w x h blocks
+#  whose upper left block is block x, y, that is cell x*2^level, y*2^level.
+#  Cells outside the board count as dead.  Returns a (w, h) float32 array.
+def density ( life, x, y, w, h, level ):
+  s = 2**level
+  out = np.zeros((w, h), dtype=np.float32)
+  x0, y0 = max(x*s, 0), max(y*s, 0)
+  x1, y1 = min((x+w)*s, life.shape[0]), min((y+h)*s, life.shape[1])
+  if x1 <= x0 or y1 <= y0:
+    return out
+  # x0 and y0 fall on block edges, so blocks start every s cells from them
+  counts = np.add.reduceat(life[x0:x1, y0:y1], np.arange(0, x1-x0, s), axis=0, dtype=np.int32)
+  counts = np.add.reduceat(counts, np.arange(0, y1-y0, s), axis=1)
+  out[x0//s-x:x0//s-x+counts.shape[0], y0//s-y:y0//s-y+counts.shape[1]] = counts
+  out /= s*s
+  return out
+
+# Advance a board n generations, returning the final board
+def run ( life, n, sums=None, boundary='dead' ):
+  cur = life.copy()
+  nxt = np.zeros_like(life)
+  for _ in range(n):
+    nxt, _ = step(cur, nxt, sums, boundary)
+    cur, nxt = nxt, cur
+  return cur
+
+
+#### Dense Board ####
+
+# A board of gridSize x gridSize bools stepped with step().  It offers the same
+#  interface as life.bitboard.BitBoard so the two can be swapped.
+class Board():
+
+  # rule - life.rules.Rule or B/S string, Conway's Life by default
+  # boundary - 'dead', 'torus' or 'reflect', see above
+  def __init__ ( self, gridSize, rule=None, boundary='dead' ):
+    self.gridSize = gridSize
+    self.boundary = boundary
+    # Width of the dead border, 0 unless the boundary is dead
+    self.margin = margin(boundary)
+    self.life = np.zeros((gridSize, gridSize), dtype=bool)
+    self.tlife = np.zeros_like(self.life)
+    self.changed = np.zeros_like(self.life)
+    self.generation = 0
+    self.set_rule(rule)
+
+  #### Game Logic ####
+
+  # Switch to another rule, given as a life.rules.Rule or B/S string
+  def set_rule ( self, rule ):
+    self.rule = rules.rule_of(rule)
+    self.sums = None if self.rule.conway else box_sums(self.rule)
+
+  # Advance one generation, returning the mask of changed cells
+  def step ( self ):
+    self.tlife, self.changed = step(self.life, self.tlife, self.sums, self.boundary)
+    self.life, self.tlife = self.tlife, self.life
+    self.generation += 1
+    return self.changed
+
+  # Coordinates of the cells changed by the last step as an (n, 2) array
+  def changed_cells ( self ):
+    return np.argwhere(self.changed)
+
+  #### Cell Access ####
+
+  @property
+  def population ( self ):
+    return int(np.count_nonzero(self.life))
+
+  def get_cell ( self, x, y ):
+    return bool(self.life[x, y])
+
+  def set_cell ( self, x, y, alive ):
+    self.life[x, y] = alive
+
+  # Place a pattern with its upper left corner at x, y, as draw_pattern does.
+  #  Returns False without changing the board if it would touch a dead
+  #  border or leave the board.
+  # pat - 2D Numpy array of bools specifying pattern
+  def place_pattern ( self, pat, x, y ):
+    xmax = x + pat.shape[0]
+    ymax = y + pat.shape[1]
+    m = self.margin
+    if x < m or y < m or xmax > self.gridSize-m or ymax > self.gridSize-m:
+      return False
+    self.life[x:xmax, y:ymax] = pat[:,:]
+    return True
+
+  # Turn on the cells at coordinates cells ((n, 2) array of x, y).
+  #  Returns False without changing the board if any would touch a dead
+  #  border or lie outside the board.
+  def add_cells ( self, cells ):
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    if len(cells) and (cells.min() < self.margin or cells.max() > self.gridSize-1-self.margin):
+      return False
+    self.life[cells[:, 0], cells[:, 1]] = True
+    return True
+
+  # Toggle a cell as a click does, returning its new state, or None if the
+  #  cell is on a dead border or outside the board
+  def toggle ( self, x, y ):
+    m = self.margin
+    if x < self.gridSize-m and y < self.gridSize-m and x >= m and y >= m:
+      self.life[x, y] = not self.life[x, y]
+      return bool(self.life[x, y])
+    return None
+
+  def clear ( self ):
+    self.life[:, :] = False
+
+  # Coordinates of every live cell as an (n, 2) array
+  def cells ( self ):
+    return np.argwhere(self.life)
+
+  # Return the cells in the rectangle [x, x+w) x [y, y+h) as an array of bools
+  def window ( self, x, y, w, h ):
+    return window(self.life, x, y, w, h)
+
+  # Live fraction of each 2^level x 2^level block in the w x h blocks from block x, y
+  def density ( self, x, y, w, h, level ):
+    return density(self.life, x, y, w, h, level)
+
+  def to_array ( self ):
+    return self.life.copy()
@@ -0,0 +1,504 @@
+import time
+
+import numpy as np
+
+from life.render import CanvasRenderer, ImageRenderer
+from life.runner import Runner
+
+
+#### Tk Viewer ####
+#
+# Shows a Simulation in a Tk window.  The simulation is stepped on a
+# life.runner.Runner thread, which queues a snapshot of the visible cells
+# after each generation.  Every self.speed ms the viewer draws the newest
+# queued frame and drops any older ones, so a slow generation no longer
+# blocks input and a fast engine is not held back by drawing.  Nothing runs
+# until mainloop() is called.  Tk itself is only imported when a Viewer is
+# made, so importing this module, or the front ends built on it, is cheap.
+#
+# The window is a viewport of viewSize x viewSize boxes, bWidth pixels each,
+# that pans and zooms over the engine.  At level 0 a box is a cell; at level
+# k it is a 2^k x 2^k block of cells shaded by its live fraction, read with
+# the engine's density() (node populations for the HashLife universe), so a
+# frame costs about the same however large the universe is.  Shift+arrow
+# keys or dragging with the right button pan, +/- and the mouse wheel zoom
+# and Home shows the whole board again.  A click toggles the cell under the
+# pointer at any zoom.  With history > 0 the last generations are recorded
+# (see life.history) and 'b' pauses and steps back through them.
+#
+# The Up/Down keys change either the frame rate ('frame') or the target
+# generations per second ('sim'); 's' switches between the two.
+#
+# With profile=True the engine and renderer are instrumented with a
+# life.profile.Profiler and the header above the board shows the generation,
+# population, generations per second, the time each frame takes to draw and
+# where the profiled time went since the last refresh.
+
+# Fastest target rate in generations per second before switching to full speed
+MAX_RATE = 2**12
+
+# Milliseconds between refreshes of the profiling overlay
+STATS_INTERVAL = 500
+
+# Furthest zoom out for the unbounded engines, 2^MAX_LEVEL cells per box
+MAX_LEVEL = 32
+
+class Viewer():
+
+  # sim - life.sim.Simulation to show
+  # gridSize - Cells per side of the board, or of the region first shown for
+  #  the unbounded engines
+  # viewSize - Boxes per side of the viewport, by default as many of gridSize
+  #  as fit the window
+  # running - Start stepping as soon as mainloop() is entered
+  # renderer - 'canvas' to draw a rectangle per cell, 'image' to blit the board into one image
+  # rate - Target generations per second, None to run at full speed
+  # speedKeys - What the Up/Down keys control, 'sim' or 'frame'
+  # stopStable - Pause once the board settles into still lifes and oscillators
+  # ptime - Print the time each step takes
+  # profile - Time the engine and renderer and show the results above the board
+  # history - Generations to keep for stepping back through, 0 for none
+  def __init__ ( self, sim, wHeight=400, wWidth=400, bWidth=15, gridSize=16, running=False, renderer='canvas', title="Conway's Life", rate=10, speedKeys='sim', stopStable=False, ptime=False, profile=False, viewSize=None, history=0 ):
+    self.sim = sim
+    self.board = sim.engine
+    self.gridSize = gridSize
+    self.viewSize = viewSize or max(1, min(gridSize, int(min(wWidth, wHeight) // bWidth)))
+
+    # Viewport as (left, top, level): its upper left box is the 2^level
+    #  block at block coordinates left, top
+    self.view = self.home_view()
+    self.dragStart = None
+
+    self.windowHeight = wHeight
+    self.windowWidth = wWidth
+    self.xpad = (wWidth - self.viewSize*bWidth)/2
+    self.ypad = (wHeight - self.viewSize*bWidth)/2
+    self.boxWidth = bWidth
+    self.title = title
+
+    # Duration between frame updates
+    self.speed = 100
+    self.speedKeys = speedKeys
+
+    # Flag for printing step times
+    self.ptime = ptime
+
+    # Steps the simulation in the background, queueing the visible cells
+    self.runner = Runner(sim, self.snapshot, rate)
+    self.running = running
+    self.watch = None
+    if stopStable:
+      from life.cycles import CycleWatch
+      self.watch = CycleWatch(sim, action='stop')
+    self.history = None
+    if history:
+      from life.history import History
+      self.history = History(sim, history)
+
+    # Phase timings, None when not profiling
+    self.profiler = None
+    if profile:
+      from life.profile import Profiler
+      self.profiler = Profiler()
+
+    # Flag determining weather the frame should be drawn
+    self.uframe = profile
+    if self.uframe:
+      self.ypad = wHeight / 10
+
+    self.setup_tkinter_window()
+
+    # Draws boxes, only touching those that differ from what is already shown
+    if renderer == 'image':
+      self.renderer = ImageRenderer(self.canvas, self.viewSize, self.xpad, self.ypad, self.boxWidth)
+    else:
+      self.renderer = CanvasRenderer(self.canvas, self.viewSize, self.xpad, self.ypad, self.boxWidth)
+
+    if self.profiler is not None:
+      self.profiler.attach_engine(self.board)
+      self.profiler.attach(self.renderer)
+      self.drawTime = 0.0
+      self.frames = 0
+      self.lastStats = None
+      self.population = 0
+
+    # Draw the game board
+    if self.uframe:
+      self.draw_frame()
+    self.draw_view()
+
+  # Whether the simulation is stepping
+  @property
+  def running ( self ):
+    return self.runner.is_running()
+
+  @running.setter
+  def running ( self, running ):
+    if running:
+      self.runner.resume()
+    else:
+      self.runner.pause()
+
+  # Run the Tk event loop, drawing the newest frame every self.speed ms
+  def mainloop ( self ):
+    self.runner.ptime = self.ptime
+    self.runner.start()
+    self.root.after(self.speed, self.tick)
+    if self.profiler is not None:
+      self.root.after(STATS_INTERVAL, self.draw_stats)
+    try:
+      self.root.mainloop()
+    finally:
+      self.runner.stop()
+      if self.profiler is not None:
+        self.profiler.detach()
+      self.sim.close()
+
+  def tick ( self ):
+    if self.profiler is None:
+      self.draw_modified_cells()
+    else:
+      ttime = time.perf_counter()
+      self.draw_modified_cells()
+      self.drawTime += time.perf_counter() - ttime
+      self.frames += 1
+    self.root.after(self.speed, self.tick)
+
+  # Viewport and what it shows, taken by the runner after each step
+  def snapshot ( self, sim ):
+    view = self.view
+    return view, self.view_states(view, 0, 0, self.viewSize, self.viewSize)
+
+  # The w x h boxes from box bx, by of a viewport: cells at level 0, live
+  #  fractions of blocks beyond
+  def view_states ( self, view, bx, by, w, h ):
+    left, top, level = view
+    if level == 0:
+      return self.board.window(left+bx, top+by, w, h)
+    return self.board.density(left+bx, top+by, w, h, level)
+
+  # Apply an edit to the board between generations, discarding frames
+  #  queued before it
+  def edit ( self, change, *args ):
+    with self.sim.lock:
+      result = self.sim.edit(change, *args)
+      self.runner.flush()
+      if self.watch is not None:
+        self.watch.detector.reset()
+    return result
+
+
+  #### Drawing Functions ####
+
+  # Draw the newest frame from the runner, touching only the boxes that
+  #  differ from what is shown.  Frames of an earlier viewport are skipped.
+  def draw_modified_cells ( self ):
+    frame = self.runner.latest()
+    if frame is not None and frame[1][0] == self.view:
+      self.renderer.draw_array(frame[1][1])
+
+  # Redraw the box holding a single cell
+  def draw_cell ( self, i, j ):
+    self.draw_cells(i, i+1, j, j+1)
+
+  # Redraw the boxes holding the cells [xmin, xmax) x [ymin, ymax)
+  def draw_cells ( self, xmin, xmax, ymin, ymax ):
+    view = self.view
+    left, top, level = view
+    bx0 = max((xmin >> level) - left, 0)
+    by0 = max((ymin >> level) - top, 0)
+    bx1 = min(((xmax-1) >> level) + 1 - left, self.viewSize)
+    by1 = min(((ymax-1) >> level) + 1 - top, self.viewSize)
+    if bx1 <= bx0 or by1 <= by0:
+      return
+    with self.sim.lock:
+      states = self.view_states(view, bx0, by0, bx1-bx0, by1-by0)
+    self.renderer.draw_region(bx0, by0, states)
+
+  # Draw a portion of the grid
+  def draw_grid ( self, xmin, xmax, ymin, ymax ):
+    self.draw_cells(xmin, xmax, ymin, ymax)
+    self.canvas.update()
+
+  # Redraw the whole viewport
+  def draw_view ( self ):
+    with self.sim.lock:
+      states = self.view_states(self.view, 0, 0, self.viewSize, self.viewSize)
+    self.renderer.draw_region(0, 0, states)
+    self.canvas.update()
+
+  # Draw a pattern
+  # pat - 2D Numpy array of bools specifying pattern
+  # x - Column of the pattern's upper left corner
+  # y - Row of pattern's the upper left corner
+  def draw_pattern ( self, pat, x, y ):
+    if not self.edit(self.board.place_pattern, pat, x, y):
+      print('Pattern out of bounds')
+      return
+
+    else:
+      self.draw_grid(x, x + pat.shape[0], y, y + pat.shape[1])
+
+  # Width of the board's dead border, none for wrapped or mirrored edges
+  @property
+  def margin ( self ):
+    return getattr(self.board, 'margin', 1)
+
+
+  #### Viewport ####
+
+  # Whether the engine is a bounded board, which the viewport is kept over
+  @property
+  def bounded ( self ):
+    return hasattr(self.board, 'gridSize')
+
+  # Blocks per side of the board at a level
+  def blocks ( self, level ):
+    return -(-self.gridSize >> level)
+
+  # Most zoomed-out level: the whole board for bounded engines
+  def max_level ( self ):
+    return self.home_view()[2] if self.bounded else MAX_LEVEL
+
+  # Viewport showing the whole of gridSize, at the closest zoom that fits
+  def home_view ( self ):
+    level = 0
+    while self.blocks(level) > self.viewSize:
+      level += 1
+    return self.clamp_view(0, 0, level)
+
+  # Keep a viewport over a bounded board, centring boards smaller than it
+  def clamp_view ( self, left, top, level ):
+    if self.bounded:
+      n = self.blocks(level)
+      if n <= self.viewSize:
+        left = top = (n - self.viewSize)//2
+      else:
+        left = min(max(left, 0), n - self.viewSize)
+        top = min(max(top, 0), n - self.viewSize)
+    return (left, top, level)
+
+  # Move to a viewport, dropping frames of the old one, and redraw
+  def set_view ( self, left, top, level ):
+    view = self.clamp_view(left, top, level)
+    if view == self.view:
+      return
+    with self.sim.lock:
+      self.view = view
+      self.runner.flush()
+    self.draw_view()
+
+  # Pan by whole boxes
+  def pan ( self, dx, dy ):
+    left, top, level = self.view
+    self.set_view(left+dx, top+dy, level)
+
+  # Zoom out by levels (in if negative), keeping the point at box
+  #  coordinates px, py of the viewport where it is
+  def zoom ( self, levels, px=None, py=None ):
+    left, top, level = self.view
+    new = min(max(level+levels, 0), self.max_level())
+    if new == level:
+      return
+    if px is None:
+      px = py = self.viewSize/2.
+    x = (left << level) + int(px * 2**level)
+    y = (top << level) + int(py * 2**level)
+    self.set_view((x >> new) - int(px), (y >> new) - int(py), new)
+
+  # Box coordinates in the viewport of a point on the canvas, as floats
+  def box_at ( self, event ):
+    return (event.x-self.xpad)/self.boxWidth, (event.y-self.ypad)/self.boxWidth
+
+  # Draw a red border around the board and display text at the top
+  def draw_frame ( self ):
+    self.uframe = False
+    self.canvas.delete(self.tlifeBorder)
+    self.canvas.delete(self.titleText)
+    self.canvas.delete(self.speedText)
+
+    twid = self.xpad+self.boxWidth*self.viewSize+1
+    yo10 = self.ypad/10.
+    xm1 = self.xpad-1
+    self.topBorder = self.canvas.create_rectangle(xm1, self.ypad-1, twid, self.ypad+self.boxWidth*self.viewSize+1, outline='red')
+
+    self.tlifeBorder = self.canvas.create_rectangle(xm1, yo10, self.windowWidth-self.xpad+1, self.ypad-yo10, outline='red', fill='white')
+    self.titleText = self.canvas.create_text(self.windowWidth/3., 5.*yo10, text='Conway\'s Game of Life', font=self.font1)
+    self.speedText = self.canvas.create_text(5*self.windowWidth/6., 5.*yo10, text='Speed = %.3f'%(1./self.speed), font=self.font2)
+
+    # The profiling overlay uses the title and speed text as its two lines
+    if self.profiler is not None:
+      self.canvas.coords(self.titleText, self.windowWidth/2., 3.5*yo10)
+      self.canvas.coords(self.speedText, self.windowWidth/2., 6.5*yo10)
+      self.canvas.itemconfig(self.titleText, text='', font=self.font3)
+      self.canvas.itemconfig(self.speedText, text='', font=self.font3)
+
+  # Refresh the profiling overlay with the rates and timings since the last refresh
+  def draw_stats ( self ):
+    now = time.perf_counter()
+    generation = self.sim.generation
+    # Keep the last population rather than wait out a long step
+    if self.sim.lock.acquire(timeout=0.05):
+      try:
+        self.population = self.board.population
+      finally:
+        self.sim.lock.release()
+
+    if self.lastStats is not None:
+      then, lastGeneration, since = self.lastStats
+      rate = (generation - lastGeneration)/(now - then)
+      frame = 1000.*self.drawTime/self.frames if self.frames else 0.
+      shares = '  '.join('%s %d%%' % (phase, 100*share) for phase, share in self.profiler.breakdown(since)[:4])
+      self.canvas.itemconfig(self.titleText, text='Gen %d   Pop %d   %.1f gens/s' % (generation, self.population, rate))
+      self.canvas.itemconfig(self.speedText, text='Frame %.1f ms   %s' % (frame, shares))
+    self.lastStats = (now, generation, self.profiler.snapshot())
+    self.drawTime = 0.0
+    self.frames = 0
+    self.root.after(STATS_INTERVAL, self.draw_stats)
+
+  # Build application window, canvas, and create keybindings
+  def setup_tkinter_window ( self ):
+    import tkinter.font as tkFont
+    from tkinter import Canvas, Tk
+    self.root = Tk()
+    self.root.wm_title(self.title)
+    self.font1 = tkFont.Font(family='Helvetica', size=20, weight='bold')
+    self.font2 = tkFont.Font(family='Helvetica', size=14)
+    self.font3 = tkFont.Font(family='Helvetica', size=10)
+    self.topBorder = None
+    self.tlifeBorder = None
+    self.titleText = None
+    self.speedText = None
+
+    self.canvas = Canvas(self.root, width=self.windowWidth, height=self.windowHeight)
+    self.canvas.pack()
+
+    # Bind keys to functions
+    self.canvas.bind_all('<p>', self.pause)
+    self.canvas.bind_all('<r>', self.random_life)
+    self.canvas.bind_all('<c>', self.no_life)
+    self.canvas.bind_all('<q>', self.quit_key)
+    self.canvas.bind_all('<Up>', self.speed_up)
+    self.canvas.bind_all('<Down>', self.speed_down)
+    self.canvas.bind_all('<s>', self.speed_target)
+    self.canvas.bind_all('<b>', self.step_back)
+    self.canvas.bind_all('<Button-1>', self.click)
+    for key in ('Left', 'Right', 'Up', 'Down'):
+      self.canvas.bind_all('<Shift-%s>' % key, self.pan_key)
+    self.canvas.bind_all('<ButtonPress-3>', self.drag_start)
+    self.canvas.bind_all('<B3-Motion>', self.drag)
+    for key in ('plus', 'equal', 'minus'):
+      self.canvas.bind_all('<%s>' % key, self.zoom_key)
+    for button in ('MouseWheel', 'Button-4', 'Button-5'):
+      self.canvas.bind_all('<%s>' % button, self.wheel)
+    self.canvas.bind_all('<Home>', self.home)
+
+
+  #### Keybound Functions ####
+
+  # - Click - Toggle the cell under the pointer.  Zoomed out, the pointer's
+  #  position within its box picks the cell of the block.
+  def click ( self, event ):
+    px, py = self.box_at(event)
+    if px < 0 or py < 0 or px >= self.viewSize or py >= self.viewSize:
+      return
+    left, top, level = self.view
+    x = (left << level) + int(px * 2**level)
+    y = (top << level) + int(py * 2**level)
+    if self.edit(self.board.toggle, x, y) is not None:
+      self.draw_cell(x, y)
+      self.canvas.update()
+
+  # - Shift+Arrows - Pan a quarter of the viewport
+  def pan_key ( self, event ):
+    step = max(1, self.viewSize//4)
+    dx, dy = {'Left': (-step, 0), 'Right': (step, 0), 'Up': (0, -step), 'Down': (0, step)}[event.keysym]
+    self.pan(dx, dy)
+
+  # - Right Drag - Pan the viewport with the pointer
+  def drag_start ( self, event ):
+    self.dragStart = self.box_at(event)
+
+  def drag ( self, event ):
+    if self.dragStart is None:
+      return
+    px, py = self.box_at(event)
+    dx = int(self.dragStart[0] - px)
+    dy = int(self.dragStart[1] - py)
+    if dx or dy:
+      self.dragStart = (self.dragStart[0] - dx, self.dragStart[1] - dy)
+      self.pan(dx, dy)
+
+  # - Mouse Wheel - Zoom about the pointer
+  def wheel ( self, event ):
+    px, py = self.box_at(event)
+    self.zoom(-1 if event.num == 4 or getattr(event, 'delta', 0) > 0 else 1, px, py)
+
+  # '+' / '-' - Zoom in or out about the centre of the viewport
+  def zoom_key ( self, event ):
+    self.zoom(1 if event.keysym == 'minus' else -1)
+
+  # Home - Show the whole board again
+  def home ( self, event ):
+    self.set_view(*self.home_view())
+
+  # 'c' - Remove all life from the game grid
+  def no_life ( self, event ):
+    self.edit(self.board.clear)
+    self.draw_view()
+
+  # 'r' - Create life randomly on the board. 50/50 : dead/alive
+  def random_life ( self, event ):
+    m = self.margin
+    rlife = np.random.rand(self.gridSize-2*m, self.gridSize-2*m) < 0.5
+    self.edit(self.board.place_pattern, rlife, m, m)
+    self.draw_view()
+
+  # - Up Arrow - Speed up the simulation or the display
+  def speed_up ( self, event ):
+    self.uframe = False
+    if self.speedKeys == 'sim':
+      if self.runner.rate is not None:
+        self.runner.rate *= 2
+        if self.runner.rate > MAX_RATE:
+          self.runner.rate = None
+    elif self.speed > 100:
+      self.speed -= 100
+    elif self.speed > 10:
+      self.speed -= 10
+    if self.uframe:
+      self.draw_frame()
+
+  # - Down Arrow - Slow down the simulation or the display
+  def speed_down ( self, event ):
+    self.uframe = False
+    if self.speedKeys == 'sim':
+      if self.runner.rate is None:
+        self.runner.rate = MAX_RATE
+      elif self.runner.rate > 1:
+        self.runner.rate /= 2
+    elif self.speed < 100:
+      self.speed += 10
+    elif self.speed < 1200:
+      self.speed += 100
+      if self.uframe:
+        self.draw_frame()
+
+  # 's' - Switch the Up/Down keys between the simulation rate and the frame rate
+  def speed_target ( self, event ):
+    self.speedKeys = 'frame' if self.speedKeys == 'sim' else 'sim'
+
+  # 'b' - Pause and go back a generation, if the history is being recorded
+  def step_back ( self, event ):
+    if self.history is None:
+      return
+    self.running = False
+    if self.edit(self.history.back):
+      self.draw_view()
+
+  def pause ( self, event ):
+    self.running = not self.running
+  def quit ( self ):
+    self.root.destroy()
+  def quit_key ( self, event ):
+    self.quit()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from life.cycles import CycleWatch
+from life.sim import Simulation, make_engine
+
+
+def blinker ( name ):
+  sim = Simulation(make_engine(name, 5))
+  sim.engine.place_pattern(np.ones((3, 1), dtype=bool), 10, 10)
+  return sim
+
+# run() without a chunk steps in one go, yet the watch sees every generation
+@pytest.mark.parametrize('name', ['dense', 'packed', 'sparse', 'hashgrid', 'hashlife'])
+def test_watch_finds_period_through_run ( name ):
+  sim = blinker(name)
+  watch = CycleWatch(sim)
+  sim.run(500)
+  assert watch.period == 2
+  assert sim.generation == 500
+
+def test_watch_stops_run ( ):
+  sim = blinker('dense')
+  watch = CycleWatch(sim, action='stop')
+  sim.run(500)
+  assert watch.period == 2
+  assert sim.generation < 10
+
+def test_watch_skips_run ( ):
+  sim = blinker('dense')
+  watch = CycleWatch(sim, action='skip')
+  sim.run(501)
+  assert watch.period == 2
+  assert sim.generation == 501
+  assert sim.engine.population == 3
+
+def test_steps_after_stop_are_whole ( ):
+  sim = blinker('dense')
+  CycleWatch(sim, action='stop')
+  sim.step(10)
+  generation = sim.generation
+  sim.step(10)
+  assert sim.generation == generation + 10
+
+def test_unwatched_step_notifies_once ( ):
+  sim = blinker('dense')
+  calls = []
+  sim.subscribe(calls.append)
+  sim.run(500)
+  assert len(calls) == 1
@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+import pytest
+
+from life import formats
+from life.quadtree import Universe
+from life.sim import make_engine
+
+
+# Round trip an engine through a Macrocell file, returning the loaded universe
+def macrocell_round_trip ( engine ):
+  out = io.StringIO()
+  formats.write_macrocell(out, engine)
+  loaded = Universe()
+  formats.read_macrocell(io.StringIO(out.getvalue()), loaded)
+  return out.getvalue(), loaded
+
+def test_macrocell_empty_universe ( ):
+  text, loaded = macrocell_round_trip(Universe())
+  assert text.splitlines()[-1] == '4 0 0 0 0'
+  assert loaded.population == 0
+
+def test_macrocell_pattern_within_a_leaf ( ):
+  universe = Universe()
+  universe.add_cells(np.array([(0, 0), (1, 0), (2, 0)]))
+  _, loaded = macrocell_round_trip(universe)
+  assert loaded.population == 3
+  assert loaded.root.level >= 4
+
+def test_macrocell_empty_bounded_board ( ):
+  _, loaded = macrocell_round_trip(make_engine('dense', 3))
+  assert loaded.population == 0
+
+def test_macrocell_rejects_child_of_wrong_level ( ):
+  with pytest.raises(ValueError):
+    formats.read_macrocell(io.StringIO('[M2]\n*$\n5 1 0 0 0\n'), Universe())
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from life.patterns import gliderGunPattern
+from life.quadtree import Universe
+from life.sim import make_engine
+
+
+# The glider gun after 1000 generations, on the quadtree and on a dense board
+def glider_gun ( ):
+  universe = Universe()
+  board = make_engine('dense', 9)
+  for engine in (universe, board):
+    engine.place_pattern(gliderGunPattern, 21, 19)
+  universe.step(1000)
+  for _ in range(1000):
+    board.step()
+  return universe, board
+
+@pytest.mark.parametrize('level', [0, 1, 2, 3, 5])
+def test_density_matches_dense_board ( level ):
+  universe, board = glider_gun()
+  n = 512 >> level
+  expected = board.density(0, 0, n, n, level)
+  found = universe.density(0, 0, n, n, level)
+  assert np.allclose(found, expected)
+  assert found.max() <= 1
+
+def test_density_of_offset_region ( ):
+  universe, board = glider_gun()
+  assert np.allclose(universe.density(3, 5, 40, 30, 2), board.density(3, 5, 40, 30, 2))